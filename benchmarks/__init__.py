@@ -0,0 +1,14 @@
+"""
+Benchmarks of the service, run as `python -m benchmarks.<name>`.
+
+Importing the package sets Django up with the project settings, so each
+benchmark imports the modules of the project at its top like the rest of
+the code.
+"""
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "playlistmover.settings")
+os.environ.setdefault("PLAYLISTMOVER_SECRET_KEY", "bench_secret_key")
+django.setup()
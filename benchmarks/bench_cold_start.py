@@ -0,0 +1,152 @@
+"""
+Cold-start benchmark of the WSGI and ASGI applications.
+
+Every run starts a fresh interpreter that imports `playlistmover.wsgi` or
+`playlistmover.asgi`, serves a single `/api/auth` request through the
+application callable and reports the response status. The time from
+spawning the process to reading that status is reported for the `full` and
+`api` settings profiles, along with the modules the process has loaded,
+next to the start-up time of a bare interpreter.
+
+    python -m benchmarks.bench_cold_start --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+QUERY = "platform=SPOTIFY&redirect_uri=http://localhost"
+
+WSGI_SCRIPT = """
+import json, sys
+from wsgiref.util import setup_testing_defaults
+from playlistmover.wsgi import application
+environ = {"PATH_INFO": "/api/auth", "QUERY_STRING": sys.argv[1], "HTTP_HOST": "localhost"}
+setup_testing_defaults(environ)
+statuses = []
+b"".join(application(environ, lambda status, headers: statuses.append(status)))
+status = int(statuses[0].split()[0])
+print(json.dumps({"status": status, "modules": len(sys.modules)}), flush=True)
+"""
+
+ASGI_SCRIPT = """
+import asyncio, json, sys
+from asgiref.testing import ApplicationCommunicator
+from playlistmover.asgi import application
+scope = {
+    "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+    "method": "GET", "scheme": "http", "path": "/api/auth",
+    "raw_path": b"/api/auth", "query_string": sys.argv[1].encode(),
+    "headers": [(b"host", b"localhost")],
+    "server": ("localhost", 80), "client": ("127.0.0.1", 50000),
+}
+async def serve():
+    communicator = ApplicationCommunicator(application, scope)
+    await communicator.send_input({"type": "http.request", "body": b""})
+    start = await communicator.receive_output(10)
+    message = {"more_body": True}
+    while message.get("more_body"):
+        message = await communicator.receive_output(10)
+    return start["status"]
+status = asyncio.run(serve())
+print(json.dumps({"status": status, "modules": len(sys.modules)}), flush=True)
+"""
+
+SCRIPTS = {"wsgi": WSGI_SCRIPT, "asgi": ASGI_SCRIPT}
+PROFILES = ("full", "api")
+
+
+def parse_args() -> argparse.Namespace:
+    """Command line arguments"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument(
+        "--servers", nargs="+", choices=sorted(SCRIPTS), default=["wsgi", "asgi"]
+    )
+    return parser.parse_args()
+
+
+def get_environment(profile: str) -> Dict[str, str]:
+    """Environment of a fresh process serving with the profile"""
+    environment = dict(os.environ)
+    environment.pop("PLAYLISTMOVER_ASYNC_VIEWS", None)
+    environment.update(
+        PYTHONPATH=str(ROOT),
+        DJANGO_SETTINGS_MODULE="playlistmover.settings",
+        PLAYLISTMOVER_PROFILE=profile,
+        PLAYLISTMOVER_ALLOWED_HOSTS="localhost",
+    )
+    environment.setdefault("PLAYLISTMOVER_SECRET_KEY", "bench_secret_key")
+    return environment
+
+
+def run(script: str, environment: Dict[str, str]) -> Tuple[float, Dict[str, int]]:
+    """Seconds until a fresh process running the script reports, and its report"""
+    started = time.perf_counter()
+    with subprocess.Popen(
+        [sys.executable, "-c", script, QUERY],
+        cwd=ROOT,
+        env=environment,
+        stdout=subprocess.PIPE,
+        text=True,
+    ) as process:
+        line = process.stdout.readline()
+        elapsed = time.perf_counter() - started
+        process.communicate()
+    assert process.returncode == 0, "the process failed"
+    report = json.loads(line)
+    assert report["status"] == 200, report
+    return elapsed, report
+
+
+def summarize(timings: List[float]) -> str:
+    """Median and minimum of timings in milliseconds"""
+    return "{:>10.0f}{:>9.0f}".format(
+        statistics.median(timings) * 1000, min(timings) * 1000
+    )
+
+
+def main():
+    """Run the benchmark"""
+    args = parse_args()
+    print(
+        "{:>12}{:>10}{:>9}{:>9}{:>11}".format(
+            "", "median ms", "min ms", "modules", "api saves"
+        )
+    )
+    environment = get_environment("full")
+    baseline = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], env=environment, check=True)
+        baseline.append(time.perf_counter() - started)
+    print("{:>12}{}{:>9}".format("interpreter", summarize(baseline), "-"))
+
+    for server in args.servers:
+        medians = {}
+        for profile in PROFILES:
+            environment = get_environment(profile)
+            timings, modules = [], 0
+            for _ in range(args.runs):
+                elapsed, report = run(SCRIPTS[server], environment)
+                timings.append(elapsed)
+                modules = report["modules"]
+            medians[profile] = statistics.median(timings)
+            saved = ""
+            if profile == "api":
+                saved = "{:.1f}%".format((1 - medians["api"] / medians["full"]) * 100)
+            print(
+                "{:>12}{}{:>9}{:>11}".format(
+                    "{} {}".format(server, profile), summarize(timings), modules, saved
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+End-to-end benchmark of the API against a local Spotify stand-in.
+
+Synthetic accounts of increasing size are served over HTTP by
+`FakeSpotifyServer`, with the given latency, page size and 429 throttling,
+and the Django app is pointed to it. For every account `/api/auth` is
+requested, then `/api/playlists` with an authorization code (cold: tokens,
+profile and every playlist are fetched) and again with the session it
+returned in its header (warm: stored tokens and cached playlists). The latency and
+upstream calls of each request are reported, along with the peak memory
+allocated by a cold request traced on a fresh account.
+
+    python -m benchmarks.bench_e2e --playlists 10 100 1000 5000 --latency 0.02
+    python -m benchmarks.bench_e2e --asgi
+"""
+import argparse
+import contextlib
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Tuple
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings, setup_test_environment
+
+from playlistmover.playlistmover.logic.ratelimit import RequestScheduler
+from playlistmover.playlistmover.tests.fake_spotify import (
+    FakeSpotify,
+    FakeSpotifyServer,
+)
+
+CODE = "bench_code"
+QUERY = {"platform": "SPOTIFY", "redirect_uri": "http://localhost"}
+CREDENTIALS = {"code": CODE, "state": "123456789abcdefg"}
+
+Requester = Callable[..., Tuple[float, Any]]
+
+
+def parse_args() -> argparse.Namespace:
+    """Command line arguments"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--playlists", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--tracks", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--throttle-every", type=int, default=0)
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0,
+        help="outbound requests per second, unlimited when 0",
+    )
+    parser.add_argument("--asgi", action="store_true", help="serve the async views")
+    return parser.parse_args()
+
+
+def get_requester(asgi: bool) -> Requester:
+    """
+    Function timing a successful GET request to the app, sent with the given
+    headers, and returning its response too
+    """
+    if asgi:
+        client = AsyncClient()
+
+        def get(path: str, data: Dict[str, str], **headers: str):
+            # the async test client takes header names without the WSGI prefix
+            headers = {name[len("HTTP_") :]: value for name, value in headers.items()}
+
+            async def send():
+                return await client.get(path, data, **headers)
+
+            return async_to_sync(send)()
+
+    else:
+        get = Client().get
+
+    def request(path: str, data: Dict[str, str], **headers: str):
+        started = time.perf_counter()
+        response = get(path, data, **headers)
+        assert response.status_code == 200, response.content
+        return time.perf_counter() - started, response
+
+    return request
+
+
+def make_account(args: argparse.Namespace, playlists: int) -> FakeSpotify:
+    """Synthetic account with the given number of playlists"""
+    return FakeSpotify(
+        playlists=playlists,
+        tracks=args.tracks,
+        page_size=args.page_size,
+        latency=args.latency,
+        throttle_every=args.throttle_every,
+        code=CODE,
+    )
+
+
+@contextlib.contextmanager
+def serving(fake_spotify: FakeSpotify):
+    """Serve the account over HTTP and point the clients of the app to it"""
+    with FakeSpotifyServer(fake_spotify) as server, override_settings(
+        SPOTIFY_API_URL=server.url, SPOTIFY_ACCOUNTS_URL=server.url
+    ):
+        yield
+
+
+def measure_requests(request: Requester, fake_spotify: FakeSpotify) -> Tuple:
+    """
+    Latency of the auth request, latency and upstream calls of the cold and
+    warm playlists requests, and the cold response
+    """
+    with serving(fake_spotify):
+        auth, _ = request("/api/auth", QUERY)
+        cold, response = request("/api/playlists", {**QUERY, **CREDENTIALS})
+        cold_calls = fake_spotify.requests
+        warm, _ = request(
+            "/api/playlists",
+            QUERY,
+            HTTP_X_PLAYLISTMOVER_SESSION=response.json()["session"],
+        )
+        warm_calls = fake_spotify.requests - cold_calls
+    return auth, cold, cold_calls, warm, warm_calls, response
+
+
+def measure_peak_memory(request: Requester, fake_spotify: FakeSpotify) -> int:
+    """Peak bytes allocated by a cold playlists request"""
+    with serving(fake_spotify):
+        tracemalloc.start()
+        request("/api/playlists", {**QUERY, **CREDENTIALS})
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return peak
+
+
+def main():
+    """Run the benchmark"""
+    args = parse_args()
+    # before the test database is migrated, whose checks load the URLs
+    settings.ASYNC_VIEWS = args.asgi
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    scheduler = RequestScheduler(args.rate or None, max(1, int(args.rate)))
+    request = get_requester(args.asgi)
+
+    print(
+        "{} views, {} tracks per playlist, {:.0f}ms upstream latency".format(
+            "async" if args.asgi else "sync", args.tracks, args.latency * 1000
+        )
+    )
+    print(
+        "{:>10}{:>9}{:>10}{:>7}{:>10}{:>7}{:>8}{:>10}{:>10}".format(
+            "playlists",
+            "auth",
+            "cold",
+            "calls",
+            "warm",
+            "calls",
+            "429s",
+            "MiB out",
+            "peak MiB",
+        )
+    )
+    with mock.patch(
+        "playlistmover.playlistmover.logic.clients.get_scheduler",
+        return_value=scheduler,
+    ):
+        for playlists in args.playlists:
+            fake_spotify = make_account(args, playlists)
+            auth, cold, cold_calls, warm, warm_calls, response = measure_requests(
+                request, fake_spotify
+            )
+            peak = measure_peak_memory(request, make_account(args, playlists))
+            print(
+                "{:>10}{:>8.3f}s{:>9.3f}s{:>7}{:>9.3f}s{:>7}{:>8}{:>10.2f}{:>10.1f}".format(
+                    playlists,
+                    auth,
+                    cold,
+                    cold_calls,
+                    warm,
+                    warm_calls,
+                    fake_spotify.throttled,
+                    len(response.content) / 2**20,
+                    peak / 2**20,
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
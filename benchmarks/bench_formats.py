@@ -0,0 +1,102 @@
+"""
+Benchmark of the response formats of a large library.
+
+A synthetic library is rendered as JSON and as MessagePack, in the nested
+and normalized layouts, each uncompressed and gzipped like GZipMiddleware
+does. For every format the body size, the time to encode and to decode it,
+and the latency of the response over a link of the given bandwidth are
+reported. Every format must decode to the same data.
+
+    python -m benchmarks.bench_formats --playlists 50 --songs 1000 --mbps 10
+"""
+import argparse
+import gzip
+import io
+import json
+
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+
+from benchmarks.bench_serialization import make_library, timed
+from playlistmover.playlistmover.compiled_serializers import encode_playlists
+from playlistmover.playlistmover.normalized import normalize_playlists
+from playlistmover.playlistmover.parsers import MessagePackParser
+from playlistmover.playlistmover.renderers import MessagePackRenderer
+
+FORMATS = {
+    "json": (JSONRenderer().render, json.loads),
+    "msgpack": (
+        MessagePackRenderer().render,
+        lambda body: MessagePackParser().parse(io.BytesIO(body)),
+    ),
+}
+
+
+def measure(encode, codec, gzipped: bool, repeat: int):
+    """
+    Seconds to render and to parse the encoded payload in a format, with the
+    body rendered and the data parsed from it
+    """
+    render, parse = codec
+    if gzipped:
+        encoded, body = timed(lambda: compress_string(render(encode())), repeat)
+        decoded, data = timed(lambda: parse(gzip.decompress(body)), repeat)
+    else:
+        encoded, body = timed(lambda: render(encode()), repeat)
+        decoded, data = timed(lambda: parse(body), repeat)
+    return encoded, decoded, body, data
+
+
+def parse_args() -> argparse.Namespace:
+    """Command line arguments"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--playlists", type=int, default=50)
+    parser.add_argument("--songs", type=int, default=1000)
+    parser.add_argument("--mbps", type=float, default=10.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    return parser.parse_args()
+
+
+def main():
+    """Run the benchmark"""
+    args = parse_args()
+
+    library = make_library(args.playlists, args.songs)
+    layouts = {
+        "nested": lambda: {"playlists": encode_playlists(library)},
+        "normalized": lambda: normalize_playlists(library),
+    }
+
+    print("songs: {}, link: {} Mbit/s".format(args.playlists * args.songs, args.mbps))
+    print(
+        "{:<28}{:>10}{:>10}{:>10}{:>10}".format(
+            "format", "MiB", "encode", "decode", "latency"
+        )
+    )
+    baseline = None
+    for layout, encode in layouts.items():
+        expected = None
+        for name, codec in FORMATS.items():
+            for gzipped in (False, True):
+                encoded, decoded, body, data = measure(
+                    encode, codec, gzipped, args.repeat
+                )
+                if expected is None:
+                    expected = data
+                assert data == expected, "{} decodes to different data".format(name)
+                latency = encoded + len(body) * 8 / (args.mbps * 10**6) + decoded
+                baseline = baseline or latency
+                print(
+                    "{:<28}{:>10.2f}{:>9.3f}s{:>9.3f}s{:>9.3f}s  {:.1f}x".format(
+                        "{} {}{}".format(layout, name, " + gzip" if gzipped else ""),
+                        len(body) / 2**20,
+                        encoded,
+                        decoded,
+                        latency,
+                        baseline / latency,
+                    )
+                )
+
+
+if __name__ == "__main__":
+    main()
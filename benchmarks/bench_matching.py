@@ -0,0 +1,136 @@
+"""
+Benchmark of the batched fuzzy matching engine on a synthetic library.
+
+Every song gets one perturbed copy of itself (typos, casing, a remaster note,
+a featured artist) and several decoy tracks among the candidates, the way a
+playlist's pooled search results look. The batched engine is compared with
+scoring every song against every candidate on a sample of the songs.
+
+    python -m benchmarks.bench_matching --songs 20000
+"""
+import argparse
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+from playlistmover.playlistmover.logic.matching import MatchEngine
+
+SYLLABLES = [
+    onset + vowel + coda
+    for onset in [
+        "",
+        "b",
+        "br",
+        "d",
+        "f",
+        "g",
+        "k",
+        "l",
+        "m",
+        "n",
+        "p",
+        "r",
+        "s",
+        "st",
+        "t",
+        "v",
+    ]
+    for vowel in ["a", "e", "i", "o", "u", "ay", "ou"]
+    for coda in ["", "n", "r", "s", "l"]
+]
+
+
+def make_word(rng: random.Random) -> str:
+    """Random pronounceable word"""
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def perturb(rng: random.Random, title: str) -> str:
+    """Title as another platform might spell it"""
+    choice = rng.random()
+    if choice < 0.25:
+        return title.upper()
+    if choice < 0.5:
+        return "{} - Remastered {}".format(title, rng.randint(1990, 2020))
+    if choice < 0.75:
+        index = rng.randrange(len(title))
+        return title[:index] + rng.choice("aeiou") + title[index + 1 :]
+    return "{} (feat. {})".format(title, make_word(rng).title())
+
+
+def make_library(
+    songs: int, decoys: int, seed: int
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[int]]:
+    """Songs, pooled candidates and the index of each song's true candidate"""
+    rng = random.Random(seed)
+    vocabulary = [make_word(rng) for _ in range(5000)]
+    artists = [make_word(rng).title() for _ in range(max(songs // 20, 1))]
+    library = [
+        {
+            "title": " ".join(rng.sample(vocabulary, rng.randint(1, 4))).title(),
+            "artists": rng.sample(artists, rng.randint(1, 2)),
+        }
+        for _ in range(songs)
+    ]
+    candidates: List[Dict[str, Any]] = []
+    expected: List[int] = []
+    for song in library:
+        expected.append(len(candidates))
+        candidates.append(
+            {"title": perturb(rng, song["title"]), "artists": song["artists"]}
+        )
+        for _ in range(decoys):
+            decoy = rng.choice(library)
+            candidates.append(
+                {"title": decoy["title"], "artists": rng.sample(artists, 1)}
+            )
+    return library, candidates, expected
+
+
+def pairwise_match(engine: MatchEngine, songs, candidates) -> List[Any]:
+    """Reference implementation scoring every song against every candidate"""
+    features = [engine._get_features(candidate) for candidate in candidates]
+    return [
+        engine._get_best_match(
+            engine._get_features(song), range(len(features)), features
+        )
+        for song in songs
+    ]
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--songs", type=int, default=20000)
+    parser.add_argument("--decoys", type=int, default=4)
+    parser.add_argument("--pairwise-sample", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    songs, candidates, expected = make_library(args.songs, args.decoys, args.seed)
+    engine = MatchEngine()
+
+    started = time.perf_counter()
+    matches = engine.match(songs, candidates)
+    batched = time.perf_counter() - started
+    correct = sum(
+        1 for match, index in zip(matches, expected) if match and match[0] == index
+    )
+
+    sample = songs[: args.pairwise_sample]
+    started = time.perf_counter()
+    reference = pairwise_match(engine, sample, candidates)
+    pairwise = (time.perf_counter() - started) / len(sample) * len(songs)
+    assert reference == matches[: len(sample)], "batched and pairwise matches differ"
+
+    print("songs:              {}".format(len(songs)))
+    print("candidates:         {}".format(len(candidates)))
+    print("batched:            {:.2f}s".format(batched))
+    print("pairwise (est.):    {:.2f}s".format(pairwise))
+    print("speedup:            {:.0f}x".format(pairwise / batched))
+    print("correct matches:    {:.1%}".format(correct / len(songs)))
+    print("unmatched:          {:.1%}".format(matches.count(None) / len(songs)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark of the memory held by a parsed library.
+
+Pages of playlist tracks are generated as the JSON the Spotify API returns,
+decoded and parsed one at a time, and the memory still allocated once every
+song is parsed is compared between the previous representation (dict-based
+dataclasses holding the decoded artists and album images of each track) and
+the slotted models with shared artists and images.
+
+    python -m benchmarks.bench_memory --songs 60000
+"""
+import argparse
+import dataclasses
+import gc
+import json
+import random
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from playlistmover.playlistmover.logic.clients import SpotifyClient
+
+PAGE_SIZE = 100
+
+
+@dataclasses.dataclass
+class LegacySong:
+    """Song as it was stored before: no slots, artists and images per song"""
+
+    title: str
+    artists: list
+    images: list
+    uri: Optional[str] = None
+    isrc: Optional[str] = None
+
+
+def parse_legacy_song(item: Dict[str, Any]) -> LegacySong:
+    """Previous parsing of a playlist track item"""
+    track = item["track"]
+    return LegacySong(
+        track["name"],
+        [artist.get("name", "") for artist in track.get("artists", [])],
+        track.get("album", {}).get("images", []),
+        track.get("uri"),
+        track.get("external_ids", {}).get("isrc"),
+    )
+
+
+def iter_pages(songs: int, albums: int, artists: int, seed: int) -> Iterator[str]:
+    """JSON pages of playlist tracks spread over albums and artists"""
+    rng = random.Random(seed)
+    for offset in range(0, songs, PAGE_SIZE):
+        items = []
+        for index in range(offset, min(offset + PAGE_SIZE, songs)):
+            album = rng.randrange(albums)
+            items.append(
+                {
+                    "track": {
+                        "name": "Song {}".format(index),
+                        "uri": "spotify:track:{:022d}".format(index),
+                        "external_ids": {"isrc": "USRC1{:07d}".format(index)},
+                        "artists": [
+                            {"name": "Artist {}".format(album % artists)},
+                            *(
+                                [{"name": "Artist {}".format(rng.randrange(artists))}]
+                                if rng.random() < 0.3
+                                else []
+                            ),
+                        ],
+                        "album": {
+                            "images": [
+                                {
+                                    "url": "https://i.scdn.co/image/{}-{}".format(
+                                        album, size
+                                    ),
+                                    "height": size,
+                                    "width": size,
+                                }
+                                for size in (640, 300, 64)
+                            ]
+                        },
+                    }
+                }
+            )
+        yield json.dumps({"items": items, "next": None})
+
+
+def measure(parse: Callable[[Dict[str, Any]], List[Any]], pages: List[str]) -> int:
+    """Bytes still allocated for the songs after every page was parsed"""
+    gc.collect()
+    tracemalloc.start()
+    songs = []
+    for page in pages:
+        songs.extend(parse(json.loads(page)))
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del songs
+    return size
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--songs", type=int, default=60000)
+    parser.add_argument("--albums", type=int, default=5000)
+    parser.add_argument("--artists", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    pages = list(iter_pages(args.songs, args.albums, args.artists, args.seed))
+    legacy = measure(
+        lambda page: [parse_legacy_song(item) for item in page["items"]], pages
+    )
+    compact = measure(SpotifyClient()._parse_songs, pages)
+
+    print("songs:              {}".format(args.songs))
+    print("albums:             {}".format(args.albums))
+    print("previous models:    {:.1f} MiB".format(legacy / 2**20))
+    print("compact models:     {:.1f} MiB".format(compact / 2**20))
+    print("reduction:          {:.0%}".format(1 - compact / legacy))
+    print(
+        "bytes per song:     {:.0f} -> {:.0f}".format(
+            legacy / args.songs, compact / args.songs
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark of the normalized response layout.
+
+A library is encoded and rendered as JSON in the nested layout and in the
+normalized layout, whose artist and image tables list each artist and image
+once. The normalized body must denormalize back to the nested one.
+
+    python -m benchmarks.bench_normalized --playlists 50 --songs 1000
+"""
+import json
+
+from rest_framework.renderers import JSONRenderer
+
+from benchmarks.bench_serialization import make_library, parse_args, timed
+from playlistmover.playlistmover.compiled_serializers import encode_playlists
+from playlistmover.playlistmover.normalized import (
+    denormalize_playlists,
+    normalize_playlists,
+)
+
+
+def main():
+    """Run the benchmark"""
+    args = parse_args(__doc__.splitlines()[0])
+
+    library = make_library(args.playlists, args.songs)
+    render = JSONRenderer().render
+
+    nested, nested_body = timed(
+        lambda: render({"playlists": encode_playlists(library)}), args.repeat
+    )
+    normalized, normalized_body = timed(
+        lambda: render(normalize_playlists(library)), args.repeat
+    )
+    assert denormalize_playlists(json.loads(normalized_body)) == (
+        json.loads(nested_body)["playlists"]
+    ), "normalized output differs from the nested layout"
+
+    print("songs:              {}".format(args.playlists * args.songs))
+    print(
+        "response size:      {:.1f} MiB -> {:.1f} MiB ({:.0%} smaller)".format(
+            len(nested_body) / 2**20,
+            len(normalized_body) / 2**20,
+            1 - len(normalized_body) / len(nested_body),
+        )
+    )
+    print("nested layout:      {:.3f}s".format(nested))
+    print("normalized layout:  {:.3f}s".format(normalized))
+    print("speedup:            {:.1f}x".format(nested / normalized))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark of encoding a library for the API response.
+
+The compiled encoder is compared with `PlaylistSerializer(many=True).data`,
+each followed by the JSON rendering of the response, which must produce
+identical bytes.
+
+    python -m benchmarks.bench_serialization --playlists 50 --songs 1000
+"""
+import argparse
+import time
+
+from rest_framework.renderers import JSONRenderer
+
+from playlistmover.playlistmover.compiled_serializers import encode_playlists
+from playlistmover.playlistmover.models import Image, Playlist, Song
+from playlistmover.playlistmover.serializers import PlaylistSerializer
+
+
+def make_library(playlists: int, songs: int):
+    """Playlists of songs with two artists and three album images each"""
+    albums = [
+        tuple(
+            Image("https://i.scdn.co/image/{}-{}".format(album, size), size, size)
+            for size in (640, 300, 64)
+        )
+        for album in range(500)
+    ]
+    return [
+        Playlist(
+            "Playlist {}".format(playlist),
+            [
+                Song(
+                    "Song {}.{}".format(playlist, song),
+                    ("Artist {}".format(song % 97), "Artist {}".format(song % 13)),
+                    albums[(playlist * songs + song) % len(albums)],
+                    "spotify:track:{:022d}".format(playlist * songs + song),
+                    "USRC1{:07d}".format(song),
+                )
+                for song in range(songs)
+            ],
+            albums[playlist % len(albums)],
+        )
+        for playlist in range(playlists)
+    ]
+
+
+def timed(function, repeat: int):
+    """Best time of several runs and the last result"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def parse_args(description: str) -> argparse.Namespace:
+    """Size of the synthetic library and number of timed runs"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--playlists", type=int, default=50)
+    parser.add_argument("--songs", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    return parser.parse_args()
+
+
+def main():
+    """Run the benchmark"""
+    args = parse_args(__doc__.splitlines()[0])
+
+    library = make_library(args.playlists, args.songs)
+    render = JSONRenderer().render
+
+    drf, drf_data = timed(
+        lambda: PlaylistSerializer(library, many=True).data, args.repeat
+    )
+    compiled, compiled_data = timed(lambda: encode_playlists(library), args.repeat)
+    drf_rendered, drf_body = timed(lambda: render(drf_data), args.repeat)
+    compiled_rendered, compiled_body = timed(lambda: render(compiled_data), args.repeat)
+    assert drf_body == compiled_body, "compiled output differs from the serializer"
+
+    print("songs:              {}".format(args.playlists * args.songs))
+    print("response size:      {:.1f} MiB".format(len(drf_body) / 2**20))
+    print("DRF serializer:     {:.3f}s".format(drf))
+    print("compiled encoder:   {:.3f}s".format(compiled))
+    print("speedup:            {:.1f}x".format(drf / compiled))
+    print(
+        "with JSON render:   {:.3f}s -> {:.3f}s".format(
+            drf + drf_rendered, compiled + compiled_rendered
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
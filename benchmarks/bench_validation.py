@@ -0,0 +1,74 @@
+"""
+Benchmark of validating a POST /api/playlists payload.
+
+The compiled validator is compared with
+`PlaylistSerializer(data=..., many=True).is_valid()` on a synthetic payload,
+and both must return the same validated data.
+
+    python -m benchmarks.bench_validation --songs 10000
+"""
+import argparse
+import json
+
+from benchmarks.bench_serialization import timed
+from playlistmover.playlistmover.compiled_serializers import validate_playlists
+from playlistmover.playlistmover.serializers import PlaylistSerializer
+
+
+def make_payload(playlists: int, songs: int):
+    """Decoded JSON body of playlists with songs spread evenly between them"""
+    images = [
+        {
+            "url": "https://i.scdn.co/image/{}".format(size),
+            "height": size,
+            "width": size,
+        }
+        for size in (640, 300, 64)
+    ]
+    body = [
+        {
+            "title": "Playlist {}".format(playlist),
+            "songs": [
+                {
+                    "title": "Song {}.{}".format(playlist, song),
+                    "artists": ["Artist {}".format(song % 97), "Featured"],
+                    "images": images,
+                    "uri": "spotify:track:{:022d}".format(song),
+                    "isrc": "USRC1{:07d}".format(song),
+                }
+                for song in range(songs // playlists)
+            ],
+            "images": images[:1],
+        }
+        for playlist in range(playlists)
+    ]
+    return json.loads(json.dumps(body))
+
+
+def validate_with_drf(payload):
+    """Validation as the view did it before"""
+    serializer = PlaylistSerializer(data=payload, many=True)
+    return serializer.validated_data if serializer.is_valid() else None
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--playlists", type=int, default=10)
+    parser.add_argument("--songs", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    payload = make_payload(args.playlists, args.songs)
+    drf, expected = timed(lambda: validate_with_drf(payload), args.repeat)
+    compiled, validated = timed(lambda: validate_playlists(payload), args.repeat)
+    assert validated == expected, "compiled validation differs from the serializer"
+
+    print("songs:              {}".format(args.songs))
+    print("DRF serializer:     {:.3f}s".format(drf))
+    print("compiled validator: {:.3f}s".format(compiled))
+    print("speedup:            {:.0f}x".format(drf / compiled))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,4 +5,4 @@ class PlaylistmoverConfig(AppConfig):
     """Configuration for playlistmover app"""
 
     default_auto_field = "django.db.models.BigAutoField"
-    name = "playlistmover"
+    name = "playlistmover.playlistmover"
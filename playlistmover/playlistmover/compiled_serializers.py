@@ -0,0 +1,297 @@
+"""
+Fast paths for the serializers in `serializers.py`.
+
+The fields of a serializer are compiled once into plain functions that read
+each attribute and convert it, or check and convert each input value,
+exactly like the DRF field would. Encoding a large library or validating a
+large payload then skips DRF's per-field machinery while the serializer
+stays the source of truth for the schema. Objects the compiled path cannot
+read, input it cannot vouch for, and serializers using fields it does not
+know go through DRF unchanged.
+"""
+import functools
+import operator
+import re
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from django.core.validators import (
+    MaxLengthValidator,
+    MinLengthValidator,
+    ProhibitNullCharactersValidator,
+)
+from rest_framework.fields import ProhibitSurrogateCharactersValidator, empty
+
+from rest_framework import serializers
+
+from playlistmover.playlistmover.serializers import PlaylistSerializer
+
+Encoder = Callable[[Any], Any]
+
+# fields encoded by a plain conversion, looked up by exact class since their
+# subclasses, such as EmailField, validate or format values of their own
+_PRIMITIVE_ENCODERS: Dict[type, Encoder] = {
+    serializers.CharField: str,
+    serializers.IntegerField: int,
+}
+
+
+def _compile_field(field: serializers.Field) -> Encoder:
+    """
+    Function converting a non-null attribute like `field.to_representation`
+    """
+    if isinstance(field, serializers.ListSerializer):
+        encode_item = _compile_serializer(field.child)
+        return lambda value: [encode_item(item) for item in value]
+    if isinstance(field, serializers.Serializer):
+        return _compile_serializer(field)
+    if isinstance(field, serializers.ListField):
+        encode_child = _compile_field(field.child)
+        return lambda value: [
+            None if item is None else encode_child(item) for item in value
+        ]
+    return _PRIMITIVE_ENCODERS.get(type(field), field.to_representation)
+
+
+def _compile_serializer(serializer: serializers.Serializer) -> Encoder:
+    """
+    Function encoding an instance like `serializer.to_representation`
+    """
+    serializer_class = type(serializer)
+
+    def encode_with_drf(instance: Any) -> Dict[str, Any]:
+        return serializer_class(instance).data
+
+    fields = [field for field in serializer.fields.values() if not field.write_only]
+    if not fields or any(len(field.source_attrs) != 1 for field in fields):
+        return encode_with_drf
+    names = [field.field_name for field in fields]
+    converters = [_compile_field(field) for field in fields]
+    sources = [field.source for field in fields]
+    # both return a tuple of the attributes, even of a single one
+    get_attributes = operator.attrgetter(*sources, *sources[:1])
+    get_items = operator.itemgetter(*sources, *sources[:1])
+
+    def encode(instance: Any) -> Dict[str, Any]:
+        try:
+            if isinstance(instance, Mapping):
+                values = get_items(instance)
+            else:
+                values = get_attributes(instance)
+        except (KeyError, AttributeError):
+            # DRF fills in defaults and leaves out optional fields
+            return encode_with_drf(instance)
+        return {
+            name: None if value is None else convert(value)
+            for name, convert, value in zip(names, converters, values)
+        }
+
+    return encode
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoder(serializer_class: type) -> Encoder:
+    """
+    Compiled encoder of a serializer class
+    """
+    return _compile_serializer(serializer_class())
+
+
+def encode_playlist(
+    playlist: Any, serializer_class: type = PlaylistSerializer
+) -> Dict[str, Any]:
+    """
+    Encode a playlist exactly like `PlaylistSerializer(playlist).data`, or
+    like the given playlist serializer
+    """
+    return get_encoder(serializer_class)(playlist)
+
+
+def encode_playlists(
+    playlists: Iterable[Any], serializer_class: type = PlaylistSerializer
+) -> List[Dict[str, Any]]:
+    """
+    Encode playlists exactly like `PlaylistSerializer(playlists, many=True).data`,
+    or like the given playlist serializer
+    """
+    encode = get_encoder(serializer_class)
+    return [encode(playlist) for playlist in playlists]
+
+
+class _Unsupported(Exception):
+    """A serializer uses fields or validation the compiled path does not know"""
+
+
+class _Fallback(Exception):
+    """The compiled path cannot vouch for the input, DRF has to validate it"""
+
+
+_PROHIBITED_CHARACTERS = re.compile("[\x00\ud800-\udfff]")
+_CHAR_VALIDATORS = (
+    MaxLengthValidator,
+    MinLengthValidator,
+    ProhibitNullCharactersValidator,
+    ProhibitSurrogateCharactersValidator,
+)
+
+
+def _compile_char_validator(field: serializers.CharField) -> Encoder:
+    if not all(
+        isinstance(validator, _CHAR_VALIDATORS) for validator in field.validators
+    ):
+        raise _Unsupported(field)
+    max_length, min_length = field.max_length, field.min_length
+    trim_whitespace, allow_blank = field.trim_whitespace, field.allow_blank
+
+    def validate(data: Any) -> str:
+        # numbers are accepted as strings by DRF, leave them to it
+        if not isinstance(data, str):
+            raise _Fallback
+        value = data.strip() if trim_whitespace else data
+        if not value:
+            if allow_blank and not data.strip():
+                return ""
+            raise _Fallback
+        if max_length is not None and len(value) > max_length:
+            raise _Fallback
+        if min_length is not None and len(value) < min_length:
+            raise _Fallback
+        if _PROHIBITED_CHARACTERS.search(value):
+            raise _Fallback
+        return value
+
+    return validate
+
+
+def _validate_int(data: Any) -> int:
+    # strings and floats such as "1" or 1.0 are left to DRF, and so are bools
+    if not isinstance(data, int) or isinstance(data, bool):
+        raise _Fallback
+    return data
+
+
+def _compile_int_validator(field: serializers.IntegerField) -> Encoder:
+    if field.validators:
+        raise _Unsupported(field)
+    return _validate_int
+
+
+# compilers of the checks of fields, looked up by exact class like the encoders
+_PRIMITIVE_VALIDATORS: Dict[type, Callable[[serializers.Field], Encoder]] = {
+    serializers.CharField: _compile_char_validator,
+    serializers.IntegerField: _compile_int_validator,
+}
+
+
+def _compile_field_validator(field: serializers.Field) -> Encoder:
+    """
+    Function checking and converting a non-null input value like
+    `field.run_validation`, raising `_Fallback` where DRF has to decide
+    """
+    if isinstance(field, (serializers.ListSerializer, serializers.ListField)):
+        if (
+            not field.allow_empty
+            or field.max_length is not None
+            or field.min_length is not None
+            or field.validators
+        ):
+            raise _Unsupported(field)
+        if isinstance(field, serializers.ListSerializer):
+            validate_item = _compile_serializer_validator(field.child)
+        else:
+            validate_item = _compile_field_validator(field.child)
+
+        def validate_list(data: Any) -> List[Any]:
+            if not isinstance(data, list):
+                raise _Fallback
+            return [validate_item(item) for item in data]
+
+        return validate_list
+    if isinstance(field, serializers.Serializer):
+        return _compile_serializer_validator(field)
+    compile_validator = _PRIMITIVE_VALIDATORS.get(type(field))
+    if compile_validator is None:
+        raise _Unsupported(field)
+    return compile_validator(field)
+
+
+def _compile_serializer_validator(serializer: serializers.Serializer) -> Encoder:
+    """
+    Function checking and converting input like `serializer.run_validation`
+    """
+    serializer_class = type(serializer)
+    if (
+        serializer.validators
+        or serializer_class.validate is not serializers.Serializer.validate
+        or any(
+            hasattr(serializer_class, "validate_{}".format(name))
+            for name in serializer.fields
+        )
+    ):
+        raise _Unsupported(serializer)
+    entries = []
+    for field in serializer.fields.values():
+        if field.read_only:
+            continue
+        if len(field.source_attrs) != 1 or (
+            field.default is not empty and callable(field.default)
+        ):
+            raise _Unsupported(field)
+        entries.append(
+            (
+                field.field_name,
+                field.source,
+                field.required,
+                field.default,
+                field.allow_null,
+                _compile_field_validator(field),
+            )
+        )
+
+    def validate(data: Any) -> Dict[str, Any]:
+        if not isinstance(data, dict):
+            raise _Fallback
+        validated = {}
+        for name, source, required, default, allow_null, validate_value in entries:
+            value = data.get(name, empty)
+            if value is empty:
+                if required:
+                    raise _Fallback
+                if default is not empty:
+                    validated[source] = default
+            elif value is None:
+                if not allow_null:
+                    raise _Fallback
+                validated[source] = None
+            else:
+                validated[source] = validate_value(value)
+        return validated
+
+    return validate
+
+
+@functools.lru_cache(maxsize=None)
+def get_list_validator(serializer_class: type) -> Optional[Encoder]:
+    """
+    Compiled validator of a list of the serializer's objects, None when the
+    serializer cannot be compiled
+    """
+    try:
+        return _compile_field_validator(serializer_class(many=True))
+    except _Unsupported:
+        return None
+
+
+def validate_playlists(data: Any) -> Optional[List[Dict[str, Any]]]:
+    """
+    Validated data of `PlaylistSerializer(data=data, many=True)`, None when
+    the data is invalid
+    """
+    validate = get_list_validator(PlaylistSerializer)
+    if validate is not None:
+        try:
+            return validate(data)
+        except _Fallback:
+            pass
+    serializer = PlaylistSerializer(data=data, many=True)
+    return serializer.validated_data if serializer.is_valid() else None
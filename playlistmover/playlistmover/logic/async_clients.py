@@ -0,0 +1,411 @@
+import asyncio
+import time
+import weakref
+from collections import deque
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    AsyncIterator,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from playlistmover.playlistmover.logic.clients import Client, SpotifyClient
+from playlistmover.playlistmover.logic.clients_enums import ClientEnum
+from playlistmover.playlistmover.logic.metrics import get_body_size
+from playlistmover.playlistmover.logic.projection import Projection
+from playlistmover.playlistmover.logic.registry import get_registry
+from playlistmover.playlistmover.logic.tokens import Credentials
+from playlistmover.playlistmover.models import Playlist, PlaylistSummary, Song
+
+# HTTP client of each event loop, with the async generator closing it
+_LoopHTTPClient = Tuple[httpx.AsyncClient, AsyncGenerator[None, None]]
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopHTTPClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def build_http_client(
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> httpx.AsyncClient:
+    """
+    Build a keep-alive async HTTP client with a bounded connection pool
+    """
+    limits = httpx.Limits(
+        max_connections=settings.ASYNC_HTTP_POOL_SIZE,
+        max_keepalive_connections=settings.ASYNC_HTTP_POOL_SIZE,
+    )
+    timeout = httpx.Timeout(
+        settings.HTTP_READ_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT
+    )
+    transport = transport or httpx.AsyncHTTPTransport(
+        retries=settings.HTTP_MAX_RETRIES, limits=limits
+    )
+    return httpx.AsyncClient(timeout=timeout, transport=transport)
+
+
+async def iter_items(items: Iterable[Any]) -> AsyncIterator[Any]:
+    """
+    Asynchronously iterate over the items of an iterable
+    """
+    for item in items:
+        yield item
+
+
+async def _close_on_shutdown(
+    http_client: httpx.AsyncClient,
+) -> AsyncGenerator[None, None]:
+    """
+    Async generator left suspended on the event loop, which closes the HTTP
+    client when the loop shuts its async generators down before closing,
+    as `asyncio.run` and asgiref do
+    """
+    try:
+        yield
+    finally:
+        await http_client.aclose()
+
+
+async def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the async HTTP client shared by every client on the running event
+    loop, closed along with the loop. Connections cannot be shared across
+    event loops.
+    """
+    loop = asyncio.get_running_loop()
+    if loop not in _http_clients:
+        http_client = build_http_client()
+        closer = _close_on_shutdown(http_client)
+        _http_clients[loop] = (http_client, closer)
+        await closer.asend(None)
+    return _http_clients[loop][0]
+
+
+class AsyncClient(Client):
+    """
+    Async HTTP client base-class, waits on requests without blocking the event loop
+    """
+
+    http_client: Optional[httpx.AsyncClient] = None
+
+    async def get_http_client(self) -> httpx.AsyncClient:
+        """
+        HTTP client used to send requests on the running event loop
+        """
+        return self.http_client or await get_http_client()
+
+    async def send_request(
+        self, method: str, endpoint: str, **kwargs
+    ) -> httpx.Response:
+        """
+        Send HTTP request to API endpoint once the platform's rate limit allows
+        it, retrying with backoff while the platform answers HTTP 429
+        """
+        url = httpx.URL("{}{}".format(self.base_url, endpoint))
+        # httpx replaces the query string of the url with `params`, merge them
+        # instead so paginated `next` urls keep their offset like with requests
+        params = kwargs.pop("params", None)
+        if params:
+            url = url.copy_merge_params(params)
+        for attempt in range(settings.CLIENT_RATE_LIMIT_ATTEMPTS):
+            if self.platform is not None:
+                await self.scheduler.acquire_async(
+                    self.platform,
+                    self.rate_limit_key,
+                    settings.CLIENT_RATE_LIMIT_TIMEOUT,
+                )
+            started = time.perf_counter()
+            try:
+                http_client = await self.get_http_client()
+                response = await http_client.request(method, url, **kwargs)
+            except httpx.HTTPError:
+                self._record_call(method, str(url), "error", started)
+                raise
+            self._record_call(
+                method,
+                str(url),
+                str(response.status_code),
+                started,
+                get_body_size(response.request.content),
+                get_body_size(response.content),
+            )
+            if not self._pause_if_rate_limited(response, attempt):
+                return response
+        raise self._get_rate_limit_exception(url)
+
+    async def send_get_request(
+        self,
+        endpoint: str,
+        params: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, Any]] = None,
+    ) -> httpx.Response:
+        """
+        Send HTTP GET request to API endpoint
+        """
+        return await self.send_request("GET", endpoint, params=params, headers=headers)
+
+    async def send_post_request(
+        self,
+        endpoint: str,
+        request_data: Optional[Dict[str, Any]],
+        headers: Optional[Dict[str, Any]] = None,
+        json_data: Optional[Dict[str, Any]] = None,
+    ) -> httpx.Response:
+        """
+        Send HTTP POST request to API endpoint, with a form or JSON body
+        """
+        return await self.send_request(
+            "POST", endpoint, data=request_data, json=json_data, headers=headers
+        )
+
+    async def get_json(
+        self,
+        endpoint: str,
+        params: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Send HTTP GET request to API endpoint and decode the JSON response body
+        """
+        response = await self.send_get_request(endpoint, params=params, headers=headers)
+        return response.json()
+
+    async def iter_pages(
+        self,
+        page: Optional[Dict[str, Any]],
+        params: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Lazily yield `page` and every page after it by following the `next` url
+        of each page. The next page is fetched while the caller processes the
+        current one.
+        """
+        while page:
+            next_url = page.get("next")
+            next_page: Optional[asyncio.Future] = None
+            if next_url:
+                next_page = asyncio.ensure_future(
+                    self.get_json(
+                        next_url, self._get_next_page_params(next_url, params), headers
+                    )
+                )
+            try:
+                yield page
+            except BaseException:
+                if next_page:
+                    next_page.cancel()
+                raise
+            page = await next_page if next_page else None
+
+    @staticmethod
+    def get_client(client_enum: ClientEnum):
+        """
+        Factory static method for getting an async client based on the passed
+        Enum, from the per-process client of its platform
+        """
+        return get_registry(asynchronous=True).get_client(client_enum)
+
+
+class AsyncSpotifyClient(AsyncClient, SpotifyClient):
+    """
+    Async Spotify Client Interface, fetches playlists concurrently on the event loop.
+    Playlists are created by the migration jobs, with the blocking client.
+    """
+
+    async def get_playlists(
+        self,
+        context: Dict[str, str],
+        redirect_uri: str,
+        projection: Optional[Projection] = None,
+    ) -> List[Playlist]:
+        """
+        Get list of playlists from Spotify account
+        """
+        playlists = await self.iter_playlists(context, redirect_uri, projection)
+        return [playlist async for playlist in playlists]
+
+    async def iter_playlists(
+        self,
+        context: Dict[str, str],
+        redirect_uri: str,
+        projection: Optional[Projection] = None,
+    ) -> AsyncIterator[Playlist]:
+        """
+        Lazily yield playlists from Spotify account in listing order, narrowed
+        to the `projection`. Authentication happens eagerly so errors surface
+        before iteration starts.
+        """
+        user_id = await self._start_fetch(context, redirect_uri, projection)
+        return self._iter_playlists(self._iter_playlist_listing(user_id))
+
+    async def get_playlist_listing(
+        self,
+        context: Dict[str, str],
+        redirect_uri: str,
+        projection: Optional[Projection] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Get the listing of the playlists in the Spotify account, with the id
+        and `snapshot_id` of each, without fetching any playlist. The listed
+        playlists are fetched, narrowed to the `projection`, by
+        `iter_listed_playlists`.
+        """
+        user_id = await self._start_fetch(context, redirect_uri, projection)
+        return [
+            playlist_data
+            async for playlist_data in self._iter_playlist_listing(user_id)
+        ]
+
+    def iter_listed_playlists(
+        self, listing: Iterable[Dict[str, Any]]
+    ) -> AsyncIterator[Playlist]:
+        """
+        Lazily yield the playlists of a listing in its order
+        """
+        return self._iter_playlists(iter_items(listing))
+
+    def _iter_playlists(
+        self, listing: AsyncIterable[Dict[str, Any]]
+    ) -> AsyncIterator[Playlist]:
+        """
+        Lazily yield the playlists of an async listing in its order
+        """
+        if self.projection.summary:
+            return self._iter_playlist_summaries(listing)
+        return self._iter_user_playlists(listing)
+
+    async def _start_fetch(
+        self,
+        context: Dict[str, str],
+        redirect_uri: str,
+        projection: Optional[Projection],
+    ) -> str:
+        """
+        Authenticate before fetching playlists narrowed to the `projection`,
+        returning the id of the user
+        """
+        self.projection = projection or Projection()
+        await self._setup_auth_tokens(context, redirect_uri)
+        return await self._get_user_id()
+
+    async def _iter_playlist_summaries(
+        self, listing: AsyncIterable[Dict[str, Any]]
+    ) -> AsyncIterator[PlaylistSummary]:
+        """
+        Lazily yield the summary of each playlist straight from the listing,
+        without requesting any playlist or its tracks
+        """
+        async for playlist_data in listing:
+            yield self._build_playlist_summary(playlist_data)
+
+    async def _iter_user_playlists(
+        self, listing: AsyncIterable[Dict[str, Any]]
+    ) -> AsyncIterator[Playlist]:
+        """
+        Fetch playlists concurrently, keeping at most `max_workers` in flight,
+        and yield them in the order of the playlist listing
+        """
+        pending: Deque[asyncio.Future] = deque()
+        try:
+            async for playlist_data in listing:
+                pending.append(asyncio.ensure_future(self._get_playlist(playlist_data)))
+                if len(pending) >= self.max_workers:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def _iter_playlist_listing(
+        self, user_id: str
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Lazily yield the summary of every playlist in the user's library
+        """
+        endpoint, params = self._get_playlist_listing_request(user_id)
+        first_page = await self.get_json(endpoint, params=params, headers=self.headers)
+        async for page in self.iter_pages(first_page, headers=self.headers):
+            for playlist_data in page.get("items", []):
+                yield playlist_data
+
+    async def authenticate(
+        self, context: Dict[str, str], redirect_uri: str
+    ) -> Credentials:
+        """
+        Authenticate with the context's session or authorization code and
+        return the credentials of the session, stored with the user id
+        """
+        await self._setup_auth_tokens(context, redirect_uri)
+        await self._get_user_id()
+        return self.credentials
+
+    async def _setup_auth_tokens(self, context: Dict[str, str], redirect_uri: str):
+        """
+        Authenticate with the stored credentials of the context's session,
+        refreshed when they are about to expire, or else by exchanging the
+        context's authorization code for new credentials
+        """
+        credentials = None
+        if context.get("session"):
+            credentials = await sync_to_async(self._get_session_credentials)(
+                context["session"]
+            )
+        auth_request = self._get_auth_request(context, redirect_uri, credentials)
+        if auth_request is None:
+            return
+        response = await self.send_post_request(*auth_request)
+        self._set_auth_tokens(response.status_code, response.json(), credentials)
+        if self.credentials.user_id:
+            await sync_to_async(self.token_store.save)(self.credentials)
+
+    async def _get_user_id(self) -> str:
+        """
+        Retrieve user_id from profile of Spotify user, unless the session
+        already knows it
+        """
+        if self.credentials is not None and self.credentials.user_id:
+            return self.credentials.user_id
+        response = await self.send_get_request(
+            "{}/v1/me".format(self.api_url), headers=self.headers
+        )
+        return await sync_to_async(self._set_user_id)(response.json())
+
+    async def _get_playlist(self, playlist_data: Dict[str, Any]) -> Playlist:
+        """
+        Create a `Playlist` object from the playlist data
+        """
+        cached_playlist = self._get_cached_playlist(playlist_data)
+        if cached_playlist is not None:
+            return cached_playlist
+        endpoint, params = self._get_playlist_request(playlist_data)
+        response_json = await self.get_json(
+            endpoint, params=params, headers=self.headers
+        )
+        songs: List[Song] = []
+        async for page in self.iter_song_pages(response_json.get("tracks")):
+            songs.extend(page)
+        return self._build_playlist(playlist_data, songs, response_json)
+
+    async def iter_song_pages(
+        self, tracks_page: Optional[Dict[str, Any]]
+    ) -> AsyncIterator[List[Song]]:
+        """
+        Lazily yield the songs of a playlist one page at a time, starting from
+        the first page of tracks embedded in the playlist object
+        """
+        params = {"fields": self._get_track_fields()}
+        async for page in self.iter_pages(
+            tracks_page, params=params, headers=self.headers
+        ):
+            yield self._parse_songs(page)
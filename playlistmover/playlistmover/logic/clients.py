@@ -1,16 +1,57 @@
+# pylint: disable=too-many-lines
+import contextlib
+import copy
+import dataclasses
+import datetime
 import os
-from typing import Any, Dict, List, Optional
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
 import requests
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
 from requests.models import PreparedRequest
-from rest_framework.status import HTTP_200_OK
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED
 
+from playlistmover.playlistmover.logic.cache import TTLCache, get_cache
 from playlistmover.playlistmover.logic.clients_enums import ClientEnum
-from playlistmover.playlistmover.models import Playlist, Song
+from playlistmover.playlistmover.models import Playlist, PlaylistSummary, Song
 from playlistmover.playlistmover.serializers import PlaylistSerializer
 from playlistmover.playlistmover.logic.exceptions import (
-    BadRequestException,
+    InternalServerException,
+    TooManyRequestsException,
     UnauthorizedException,
 )
+from playlistmover.playlistmover.logic.interning import Interner, TrackTable
+from playlistmover.playlistmover.logic.match_index import MatchIndex
+from playlistmover.playlistmover.logic.matching import MatchEngine
+from playlistmover.playlistmover.logic.metrics import (
+    bind_context,
+    get_body_size,
+    record_call,
+)
+from playlistmover.playlistmover.logic.projection import Projection
+from playlistmover.playlistmover.logic.ratelimit import (
+    RequestScheduler,
+    get_retry_delay,
+    get_scheduler,
+    is_rate_limited,
+)
+from playlistmover.playlistmover.logic.registry import get_registry
+from playlistmover.playlistmover.logic.sessions import (
+    get_connection_stats,
+    get_session,
+)
+from playlistmover.playlistmover.logic.sync import (
+    SyncedPlaylist,
+    SyncStore,
+    diff_tracks,
+    get_track_key,
+)
+from playlistmover.playlistmover.logic.tokens import Credentials, TokenStore
 from playlistmover.playlistmover.logic.utils import encode_string_base64
 
 
@@ -19,8 +60,115 @@ class Client:
     HTTP client base-class
     """
 
-    def __init__(self, base_url: str = ""):
+    platform: Optional[ClientEnum] = None
+    # path segments followed by an id, aggregated in the request metrics
+    ENDPOINT_ID_SEGMENTS: Tuple[str, ...] = ()
+
+    def __init__(
+        self,
+        base_url: str = "",
+        session: Optional[requests.Session] = None,
+        scheduler: Optional[RequestScheduler] = None,
+    ):
         self.base_url = base_url
+        self.session = session or get_session()
+        self.scheduler = scheduler or get_scheduler()
+        self.timeout = (settings.HTTP_CONNECT_TIMEOUT, settings.HTTP_READ_TIMEOUT)
+        self._reset_request_state()
+
+    def _reset_request_state(self):
+        """
+        Forget the state of the request the client served last
+        """
+        self.rate_limit_key: Optional[str] = None
+
+    def for_request(self) -> "Client":
+        """
+        Shallow copy of this client for a single request, sharing its
+        connection pools, caches and stores but none of its request state
+        """
+        client = copy.copy(self)
+        client._reset_request_state()
+        return client
+
+    def send_request(self, method: str, endpoint: str, **kwargs) -> requests.Response:
+        """
+        Send HTTP request to API endpoint once the platform's rate limit allows
+        it, retrying with backoff while the platform answers HTTP 429
+        """
+        url = "{}{}".format(self.base_url, endpoint)
+        for attempt in range(settings.CLIENT_RATE_LIMIT_ATTEMPTS):
+            if self.platform is not None:
+                self.scheduler.acquire(
+                    self.platform,
+                    self.rate_limit_key,
+                    settings.CLIENT_RATE_LIMIT_TIMEOUT,
+                )
+            started = time.perf_counter()
+            try:
+                response = self.session.request(
+                    method, url, timeout=self.timeout, **kwargs
+                )
+            except requests.RequestException:
+                self._record_call(method, url, "error", started)
+                raise
+            self._record_call(
+                method,
+                url,
+                str(response.status_code),
+                started,
+                get_body_size(response.request.body),
+                get_body_size(response.content),
+            )
+            if not self._pause_if_rate_limited(response, attempt):
+                return response
+        raise self._get_rate_limit_exception(url)
+
+    def _pause_if_rate_limited(self, response: Any, attempt: int) -> bool:
+        """
+        Whether the platform rejected the response of an attempt for exceeding
+        its rate limit, in which case its requests are paused for the delay it
+        asked for, else for the backoff of the attempt
+        """
+        if not is_rate_limited(response):
+            return False
+        if self.platform is not None:
+            self.scheduler.pause(self.platform, get_retry_delay(response, attempt))
+        return True
+
+    def _get_rate_limit_exception(self, url: Any) -> TooManyRequestsException:
+        """
+        Error raised once every attempt of a request was rate limited
+        """
+        return TooManyRequestsException(
+            "`{}` rate limit exceeded, try again later.".format(
+                self.platform.value if self.platform else url
+            )
+        )
+
+    def _record_call(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        method: str,
+        url: str,
+        status: str,
+        started: float,
+        sent: int = 0,
+        received: int = 0,
+    ):
+        """
+        Record the latency, status and bytes transferred of a request sent at
+        `started` in the request metrics
+        """
+        record_call(
+            self.platform.value if self.platform else "",
+            method,
+            url,
+            status,
+            time.perf_counter() - started,
+            sent,
+            received,
+            self.ENDPOINT_ID_SEGMENTS,
+        )
 
     def send_get_request(
         self,
@@ -31,43 +179,150 @@ class Client:
         """
         Send HTTP GET request to API endpoint
         """
-        return requests.get(
-            "{}{}".format(self.base_url, endpoint), params=params, headers=headers
-        )
+        return self.send_request("GET", endpoint, params=params, headers=headers)
 
     def send_post_request(
         self,
         endpoint: str,
         request_data: Optional[Dict[str, Any]],
         headers: Optional[Dict[str, Any]] = None,
+        json_data: Optional[Dict[str, Any]] = None,
     ) -> requests.Response:
         """
-        Send HTTP POST request to API endpoint
+        Send HTTP POST request to API endpoint, with a form or JSON body
         """
-        return requests.post(
-            "{}{}".format(self.base_url, endpoint), data=request_data, headers=headers
+        return self.send_request(
+            "POST", endpoint, data=request_data, json=json_data, headers=headers
         )
 
+    def send_delete_request(
+        self,
+        endpoint: str,
+        headers: Optional[Dict[str, Any]] = None,
+        json_data: Optional[Dict[str, Any]] = None,
+    ) -> requests.Response:
+        """
+        Send HTTP DELETE request to API endpoint, with a JSON body
+        """
+        return self.send_request("DELETE", endpoint, json=json_data, headers=headers)
+
+    def get_connection_stats(self) -> Dict[str, int]:
+        """
+        Connection reuse counters of the underlying HTTP session
+        """
+        return get_connection_stats(self.session)
+
+    def get_json(
+        self,
+        endpoint: str,
+        params: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Send HTTP GET request to API endpoint and decode the JSON response body
+        """
+        return self.send_get_request(endpoint, params=params, headers=headers).json()
+
+    def iter_pages(
+        self,
+        page: Optional[Dict[str, Any]],
+        params: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yield `page` and every page after it by following the `next` url
+        of each page. The next page is fetched in the background while the
+        caller processes the current one.
+        """
+        with ThreadPoolExecutor(max_workers=1) as prefetcher:
+            while page:
+                next_url = page.get("next")
+                next_page: Optional[Future] = None
+                if next_url:
+                    next_page = prefetcher.submit(
+                        bind_context(self.get_json),
+                        next_url,
+                        self._get_next_page_params(next_url, params),
+                        headers,
+                    )
+                yield page
+                page = next_page.result() if next_page else None
+
+    @staticmethod
+    def _get_next_page_params(
+        next_url: str, params: Optional[Dict[str, str]]
+    ) -> Optional[Dict[str, str]]:
+        """
+        Query parameters to send along with a `next` url, skipping those the
+        url already carries
+        """
+        next_params = {
+            key: value
+            for key, value in (params or {}).items()
+            if key not in parse_qs(urlparse(next_url).query)
+        }
+        return next_params or None
+
     @staticmethod
     def get_client(client_enum: ClientEnum):
         """
-        Factory static method for getting a client based on the passed Enum
+        Factory static method for getting a client based on the passed Enum,
+        from the per-process client of its platform
         """
-        if client_enum == ClientEnum.SPOTIFY:
-            return SpotifyClient()
-        raise BadRequestException("`{}` not supported.".format(client_enum))
+        return get_registry().get_client(client_enum)
 
 
-class SpotifyClient(Client):
+class SpotifyClient(Client):  # pylint: disable=too-many-instance-attributes
     """
     Spotify Client Interface
     """
 
-    def __init__(self):
+    platform = ClientEnum.SPOTIFY
+    ENDPOINT_ID_SEGMENTS = ("users", "playlists")
+    PLAYLISTS_PAGE_LIMIT = 50
+    TRACKS_BATCH_SIZE = 100
+    TRACK_FIELDS = (
+        "items(track(name,uri,external_ids(isrc),artists(name),album(images))),next"
+    )
+    TRACK_FIELDS_WITHOUT_IMAGES = (
+        "items(track(name,uri,external_ids(isrc),artists(name))),next"
+    )
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        playlist_cache: Optional[TTLCache] = None,
+        token_store: Optional[TokenStore] = None,
+    ):
         self.state = "123456789abcdefg"
+        self.api_url = settings.SPOTIFY_API_URL
+        self.accounts_url = settings.SPOTIFY_ACCOUNTS_URL
+        self.token_store = token_store or TokenStore(self.platform.value)
+        self.max_workers = max_workers or settings.CLIENT_MAX_WORKERS
+        self.playlist_cache = playlist_cache or get_cache(
+            "spotify-playlists",
+            settings.PLAYLIST_CACHE_SIZE,
+            settings.PLAYLIST_CACHE_TTL,
+        )
+        self.match_index = MatchIndex(self.platform.value)
+        self.sync_store = SyncStore(self.platform.value)
+        self.match_engine = MatchEngine(
+            settings.MATCH_THRESHOLD, settings.MATCH_TITLE_WEIGHT
+        )
+        super().__init__()
+
+    def _reset_request_state(self):
+        """
+        Forget the credentials, projection and tracks of the request the
+        client served last
+        """
+        super()._reset_request_state()
         self.access_token = self.refresh_token = ""
         self.headers = {}
-        super().__init__()
+        self.credentials: Optional[Credentials] = None
+        self.projection = Projection()
+        self.interner = Interner()
+        self.tracks = TrackTable()
 
     @staticmethod
     def _get_id_from_uri(uri: str) -> str:
@@ -77,30 +332,457 @@ class SpotifyClient(Client):
         return uri.split(":")[-1]
 
     def get_playlists(
-        self, context: Dict[str, str], redirect_uri: str
+        self,
+        context: Dict[str, str],
+        redirect_uri: str,
+        projection: Optional[Projection] = None,
     ) -> List[Playlist]:
         """
         Get list of playlists from Spotify account
         """
+        return list(self.iter_playlists(context, redirect_uri, projection))
+
+    def iter_playlists(
+        self,
+        context: Dict[str, str],
+        redirect_uri: str,
+        projection: Optional[Projection] = None,
+    ) -> Iterator[Playlist]:
+        """
+        Lazily yield playlists from Spotify account in listing order, narrowed
+        to the `projection`. Authentication happens eagerly so errors surface
+        before iteration starts.
+        """
+        user_id = self._start_fetch(context, redirect_uri, projection)
+        return self.iter_listed_playlists(self._iter_playlist_listing(user_id))
+
+    def get_playlist_listing(
+        self,
+        context: Dict[str, str],
+        redirect_uri: str,
+        projection: Optional[Projection] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Get the listing of the playlists in the Spotify account, with the id
+        and `snapshot_id` of each, without fetching any playlist. The listed
+        playlists are fetched, narrowed to the `projection`, by
+        `iter_listed_playlists`.
+        """
+        user_id = self._start_fetch(context, redirect_uri, projection)
+        return list(self._iter_playlist_listing(user_id))
+
+    def iter_listed_playlists(
+        self, listing: Iterable[Dict[str, Any]]
+    ) -> Iterator[Playlist]:
+        """
+        Lazily yield the playlists of a listing in its order
+        """
+        if self.projection.summary:
+            return self._iter_playlist_summaries(listing)
+        return self._iter_user_playlists(listing)
+
+    def _start_fetch(
+        self,
+        context: Dict[str, str],
+        redirect_uri: str,
+        projection: Optional[Projection],
+    ) -> str:
+        """
+        Authenticate before fetching playlists narrowed to the `projection`,
+        returning the id of the user
+        """
+        self.projection = projection or Projection()
         self._setup_auth_tokens(context, redirect_uri)
-        user_id = self._get_user_id()
-        endpoint = "https://api.spotify.com/v1/users/{}/playlists".format(user_id)
-        params = {"limit": 50}
-        response = self.send_get_request(endpoint, params=params, headers=self.headers)
-        response_json = response.json()
-        playlists: List[Playlist] = [
-            self._get_playlist(playlist) for playlist in response_json["items"]
-        ]
-        return playlists
+        return self._get_user_id()
+
+    def _iter_playlist_summaries(
+        self, listing: Iterable[Dict[str, Any]]
+    ) -> Iterator[PlaylistSummary]:
+        """
+        Lazily yield the summary of each playlist straight from the listing,
+        without requesting any playlist or its tracks
+        """
+        for playlist_data in listing:
+            yield self._build_playlist_summary(playlist_data)
+
+    def _build_playlist_summary(self, playlist_data: Dict[str, Any]) -> PlaylistSummary:
+        """
+        Create a `PlaylistSummary` object from an item of the playlist listing
+        """
+        return PlaylistSummary(
+            playlist_data["name"],
+            (playlist_data.get("tracks") or {}).get("total", 0),
+            self.interner.images(
+                self.projection.select_images(playlist_data.get("images"))
+            ),
+        )
+
+    def _iter_user_playlists(
+        self, listing: Iterable[Dict[str, Any]]
+    ) -> Iterator[Playlist]:
+        """
+        Fetch playlists concurrently, keeping at most `max_workers` in flight,
+        and yield them in the order of the playlist listing
+        """
+        get_playlist = bind_context(self._get_playlist)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending: Deque[Future] = deque()
+            try:
+                for playlist_data in listing:
+                    pending.append(executor.submit(get_playlist, playlist_data))
+                    if len(pending) >= self.max_workers:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def _iter_playlist_listing(self, user_id: str) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yield the summary of every playlist in the user's library
+        """
+        endpoint, params = self._get_playlist_listing_request(user_id)
+        first_page = self.get_json(endpoint, params=params, headers=self.headers)
+        for page in self.iter_pages(first_page, headers=self.headers):
+            yield from page.get("items", [])
+
+    def _get_playlist_listing_request(self, user_id: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Endpoint and query parameters of the first page of the playlist listing
+        """
+        endpoint = "{}/v1/users/{}/playlists".format(self.api_url, user_id)
+        params = {"limit": self.PLAYLISTS_PAGE_LIMIT}
+        return endpoint, params
 
     def create_playlists(
-        self, request, playlists: PlaylistSerializer
+        self, request, playlists: PlaylistSerializer, progress=None, sync=False
     ) -> List[Dict[str, Any]]:
         """
-        Create list of playlists on Spotify account
+        Create list of playlists on Spotify account, concurrently up to
+        `max_workers` playlists at a time. Returns the timing and track
+        counts of each created playlist.
+        With `sync`, playlists synced before are updated with the changes of
+        their source instead of being created again.
+        `progress` is told by position when each playlist starts, is created
+        or fails.
+        """
+        context = request["context"]
+        self._setup_auth_tokens(context, context.get("redirect_uri", ""))
+        user_id = self._get_user_id()
+
+        def create_playlist(position: int, playlist: Dict[str, Any]) -> Dict[str, Any]:
+            try:
+                if progress:
+                    progress.playlist_started(position)
+                if sync:
+                    report = self._sync_playlist(user_id, playlist)
+                else:
+                    report = self._create_playlist(user_id, playlist)
+                if progress:
+                    progress.playlist_created(position, report)
+                return report
+            except Exception as exception:
+                if progress:
+                    progress.playlist_failed(position, exception)
+                raise
+            finally:
+                connection.close()
+
+        playlists_data = playlists.validated_data
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(
+                executor.map(
+                    bind_context(create_playlist),
+                    range(len(playlists_data)),
+                    playlists_data,
+                )
+            )
+
+    def _create_playlist(
+        self, user_id: str, playlist: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Create a private playlist and add its tracks in the largest batches
+        the Spotify API allows
+        """
+        started = time.perf_counter()
+        playlist_id = self._create_destination_playlist(user_id, playlist["title"])
+        request_count = 1
+
+        with self._deleting_on_failure(playlist_id, playlist["title"]):
+            uris, searches = self._resolve_track_uris(playlist["songs"])
+            request_count += len(searches)
+            matched_uris = [uri for uri in uris if uri]
+            request_count += self._add_tracks(
+                playlist_id, playlist["title"], matched_uris
+            )
+
+        return {
+            "title": playlist["title"],
+            "id": playlist_id,
+            "tracks": len(uris),
+            "added": len(matched_uris),
+            "unmatched": len(uris) - len(matched_uris),
+            "searches": len(searches),
+            "requests": request_count,
+            "duration_ms": round((time.perf_counter() - started) * 1000),
+        }
+
+    def _sync_playlist(self, user_id: str, playlist: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Bring the playlist synced from a source playlist up to date, creating
+        it on the first sync, and deleting it again if that sync fails. Only
+        the tracks added to or removed from the source since the last sync are
+        resolved and written, and nothing is requested while the source
+        snapshot is unchanged and every track matched. Tracks left unmatched
+        are searched again by the next sync. Added tracks are appended, so
+        reordering the source is not reflected.
+        """
+        started = time.perf_counter()
+        snapshot_id = playlist.get("snapshot_id") or ""
+        synced = self.sync_store.get(user_id, playlist["id"])
+        uris: List[Optional[str]] = []
+        searches: List[int] = []
+        removed_uris: List[str] = []
+        request_count = 0
+        if synced is None:
+            playlist_id = self._create_destination_playlist(user_id, playlist["title"])
+            tracks: Dict[str, str] = {}
+            request_count += 1
+        else:
+            # states saved before unmatched tracks were left out hold them as None
+            playlist_id = synced.playlist_id
+            tracks = {key: uri for key, uri in synced.tracks.items() if uri}
+
+        with (
+            self._deleting_on_failure(playlist_id, playlist["title"])
+            if synced is None
+            else contextlib.nullcontext()
+        ):
+            if (
+                synced is None
+                or not snapshot_id
+                or synced.snapshot_id != snapshot_id
+                or len(tracks) != len(synced.tracks)
+            ):
+                added, removed = diff_tracks(tracks, playlist["songs"])
+                uris, searches = self._resolve_track_uris(list(added.values()))
+                request_count += len(searches)
+                # tracks still written for a remaining source track have to stay
+                removed_uris = sorted(
+                    {tracks.pop(key) for key in removed} - set(tracks.values())
+                )
+                request_count += self._remove_tracks(
+                    playlist_id, playlist["title"], removed_uris
+                )
+                tracks.update((key, uri) for key, uri in zip(added, uris) if uri)
+                request_count += self._add_tracks(
+                    playlist_id, playlist["title"], [uri for uri in uris if uri]
+                )
+                # without the snapshot, the next sync looks for the unmatched
+                # tracks again
+                self.sync_store.save(
+                    user_id,
+                    SyncedPlaylist(
+                        playlist["id"],
+                        snapshot_id if all(uris) else "",
+                        playlist_id,
+                        tracks,
+                    ),
+                )
+
+        added_count = len([uri for uri in uris if uri])
+        return {
+            "title": playlist["title"],
+            "id": playlist_id,
+            "tracks": len(playlist["songs"]),
+            "added": added_count,
+            "removed": len(removed_uris),
+            "unmatched": len(uris) - added_count,
+            "searches": len(searches),
+            "requests": request_count,
+            "duration_ms": round((time.perf_counter() - started) * 1000),
+        }
+
+    def _create_destination_playlist(self, user_id: str, title: str) -> str:
+        """
+        Create an empty private playlist, returning its id
+        """
+        endpoint = "{}/v1/users/{}/playlists".format(self.api_url, user_id)
+        response = self.send_post_request(
+            endpoint,
+            None,
+            headers=self.headers,
+            json_data={"name": title, "public": False},
+        )
+        if response.status_code not in (HTTP_200_OK, HTTP_201_CREATED):
+            raise InternalServerException(
+                "`{}` could not be created.".format(title), response.text
+            )
+        return response.json()["id"]
+
+    @contextlib.contextmanager
+    def _deleting_on_failure(self, playlist_id: str, title: str):
+        """
+        Delete the playlist created as `playlist_id` when filling it fails,
+        so no empty or partial copy is left on the account. The error reports
+        the playlist id if deleting fails too.
+        """
+        try:
+            yield
+        except Exception as exception:
+            try:
+                self._delete_destination_playlist(playlist_id, title)
+            except Exception:
+                raise InternalServerException(
+                    "`{}` was left incomplete as playlist `{}`.".format(
+                        title, playlist_id
+                    ),
+                    exception,
+                ) from exception
+            raise
+
+    def _delete_destination_playlist(self, playlist_id: str, title: str):
+        """
+        Delete a playlist, which Spotify does by unfollowing it
+        """
+        endpoint = "{}/v1/playlists/{}/followers".format(self.api_url, playlist_id)
+        response = self.send_delete_request(endpoint, headers=self.headers)
+        if response.status_code != HTTP_200_OK:
+            raise InternalServerException(
+                "`{}` could not be deleted.".format(title), response.text
+            )
+
+    def _add_tracks(self, playlist_id: str, title: str, uris: List[str]) -> int:
+        """
+        Append tracks to a playlist in the largest batches the Spotify API
+        allows, returning the number of requests sent
+        """
+        endpoint = "{}/v1/playlists/{}/tracks".format(self.api_url, playlist_id)
+        for offset in range(0, len(uris), self.TRACKS_BATCH_SIZE):
+            batch = uris[offset : offset + self.TRACKS_BATCH_SIZE]
+            response = self.send_post_request(
+                endpoint, None, headers=self.headers, json_data={"uris": batch}
+            )
+            if response.status_code not in (HTTP_200_OK, HTTP_201_CREATED):
+                raise InternalServerException(
+                    "Tracks could not be added to `{}`.".format(title),
+                    response.text,
+                )
+        return -(-len(uris) // self.TRACKS_BATCH_SIZE)
+
+    def _remove_tracks(self, playlist_id: str, title: str, uris: List[str]) -> int:
+        """
+        Remove every occurrence of the tracks from a playlist in the largest
+        batches the Spotify API allows, returning the number of requests sent
+        """
+        endpoint = "{}/v1/playlists/{}/tracks".format(self.api_url, playlist_id)
+        for offset in range(0, len(uris), self.TRACKS_BATCH_SIZE):
+            batch = uris[offset : offset + self.TRACKS_BATCH_SIZE]
+            response = self.send_delete_request(
+                endpoint,
+                headers=self.headers,
+                json_data={"tracks": [{"uri": uri} for uri in batch]},
+            )
+            if response.status_code != HTTP_200_OK:
+                raise InternalServerException(
+                    "Tracks could not be removed from `{}`.".format(title),
+                    response.text,
+                )
+        return -(-len(uris) // self.TRACKS_BATCH_SIZE)
+
+    def _resolve_track_uris(
+        self, songs: List[Dict[str, Any]]
+    ) -> Tuple[List[Optional[str]], List[int]]:
+        """
+        Find the Spotify track uri of every song, None for songs without a
+        match. Each track is matched once per request: songs already matched
+        for another playlist, or being matched by another thread, are looked
+        up in the track table.
+        Returns the uris and the indexes of the songs that had to be searched.
+        """
+        keys = [get_track_key(song) for song in songs]
+        claimed = self.tracks.claim_matches(keys)
+        claimed_keys = [keys[index] for index in claimed]
+        try:
+            uris, searches = self._match_songs([songs[index] for index in claimed])
+        except BaseException as exception:
+            self.tracks.fail_matches(claimed_keys, exception)
+            raise
+        self.tracks.set_matches(claimed_keys, uris)
+        return self.tracks.get_matches(keys), [claimed[index] for index in searches]
+
+    def _match_songs(
+        self, songs: List[Dict[str, Any]]
+    ) -> Tuple[List[Optional[str]], List[int]]:
+        """
+        Find the Spotify track uri of every song, None for songs without a
+        match. Songs that already carry a Spotify track uri or were resolved
+        before according to the match index need no request. Search results of
+        all other songs are fuzzy matched to them in one batch.
+        Returns the uris and the indexes of the songs that had to be searched.
+        """
+        uris: List[Optional[str]] = [
+            song["uri"]
+            if song.get("uri") and song["uri"].startswith("spotify:track:")
+            else None
+            for song in songs
+        ]
+        unresolved = [index for index, uri in enumerate(uris) if not uri]
+        indexed = self.match_index.lookup_many([songs[index] for index in unresolved])
+        searches: List[int] = []
+        candidates: List[Dict[str, Any]] = []
+        for index, uri in zip(unresolved, indexed):
+            if uri is not None:
+                uris[index] = uri
+                continue
+            searches.append(index)
+            results = self._search_tracks(songs[index])
+            if songs[index].get("isrc") and results:
+                # an ISRC identifies the recording, no need to compare names
+                uris[index] = results[0]["uri"]
+            else:
+                candidates.extend(results)
+
+        fuzzy = [index for index in searches if uris[index] is None]
+        matches = self.match_engine.match([songs[index] for index in fuzzy], candidates)
+        for index, match in zip(fuzzy, matches):
+            if match is not None:
+                uris[index] = candidates[match[0]]["uri"]
+
+        self.match_index.store_many(
+            [songs[index] for index in searches], [uris[index] for index in searches]
+        )
+        return uris, searches
+
+    def _search_tracks(self, song: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Search Spotify for tracks with the song's ISRC, or its title and artists.
+        Returns the title, artists and uri of each track found.
         """
-        print(playlists.create(playlists.validated_data))
-        return playlists.validated_data
+        if song.get("isrc"):
+            query, limit = "isrc:{}".format(song["isrc"]), 1
+        else:
+            query, limit = "track:{}".format(song["title"]), settings.MATCH_SEARCH_LIMIT
+            if song["artists"]:
+                query = "{} artist:{}".format(query, " ".join(song["artists"]))
+        response_json = self.get_json(
+            "{}/v1/search".format(self.api_url),
+            params={"q": query, "type": "track", "limit": limit},
+            headers=self.headers,
+        )
+        return [
+            {
+                "title": item.get("name", ""),
+                "artists": [
+                    artist.get("name", "") for artist in item.get("artists", [])
+                ],
+                "uri": item["uri"],
+            }
+            for item in response_json.get("tracks", {}).get("items", [])
+            if item and item.get("uri")
+        ]
 
     def get_authorization_url(self, redirect_uri: str) -> str:
         """
@@ -110,7 +792,7 @@ class SpotifyClient(Client):
         scope = "playlist-modify-private playlist-read-private"
 
         req_builder = PreparedRequest()
-        url = "https://accounts.spotify.com/authorize"
+        url = "{}/authorize".format(self.accounts_url)
         params = {
             "response_type": "code",
             "client_id": client_id,
@@ -121,81 +803,319 @@ class SpotifyClient(Client):
         req_builder.prepare_url(url, params)
         return req_builder.url
 
+    def authenticate(self, context: Dict[str, str], redirect_uri: str) -> Credentials:
+        """
+        Authenticate with the context's session or authorization code and
+        return the credentials of the session, stored with the user id so
+        later requests and background jobs can use the session in place of
+        the authorization code, which can only be exchanged once
+        """
+        self._setup_auth_tokens(context, redirect_uri)
+        self._get_user_id()
+        return self.credentials
+
     def _setup_auth_tokens(self, context: Dict[str, str], redirect_uri: str):
         """
-        get authentication options after setting up initial authentication with Spotify
+        Authenticate with the stored credentials of the context's session,
+        refreshed when they are about to expire, or else by exchanging the
+        context's authorization code for new credentials
+        """
+        credentials = None
+        if context.get("session"):
+            credentials = self._get_session_credentials(context["session"])
+        auth_request = self._get_auth_request(context, redirect_uri, credentials)
+        if auth_request is None:
+            return
+        response = self.send_post_request(*auth_request)
+        self._set_auth_tokens(response.status_code, response.json(), credentials)
+        if self.credentials.user_id:
+            self.token_store.save(self.credentials)
+
+    def _get_auth_request(
+        self,
+        context: Dict[str, str],
+        redirect_uri: str,
+        credentials: Optional[Credentials],
+    ) -> Optional[Tuple[str, Dict[str, str], Dict[str, str]]]:
+        """
+        Token request authenticating the context: a refresh of the session's
+        credentials when they are about to expire, the exchange of the
+        context's authorization code without a session, or None when the
+        session's credentials are used as they are
+        """
+        if credentials is None:
+            return self._get_token_request(context, redirect_uri)
+        if credentials.expires_within(settings.TOKEN_REFRESH_MARGIN):
+            return self._get_refresh_request(credentials)
+        self._use_credentials(credentials)
+        return None
+
+    def _get_session_credentials(self, session_key: str) -> Credentials:
+        """
+        Stored credentials of a session
+        """
+        credentials = self.token_store.get(session_key)
+        if credentials is None:
+            raise UnauthorizedException("Session is invalid or has expired.")
+        return credentials
+
+    def _get_token_request(
+        self, context: Dict[str, str], redirect_uri: str
+    ) -> Tuple[str, Dict[str, str], Dict[str, str]]:
+        """
+        Endpoint, form data and headers exchanging the authorization code for tokens
         """
         code = context["code"]
         state = context["state"]
-        endpoint = "https://accounts.spotify.com/api/token"
         if state != self.state:
             raise UnauthorizedException("User is unauthorized.")
-        client_id = os.getenv("SPOTIFY_CLIENT_ID")
-        client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
-        encoded_secret = encode_string_base64("{}:{}".format(client_id, client_secret))
-
         request_data = {
             "code": code,
             "grant_type": "authorization_code",
             "redirect_uri": redirect_uri,
         }
-        headers = {
+        return self._get_token_endpoint(), request_data, self._get_token_headers()
+
+    def _get_refresh_request(
+        self, credentials: Credentials
+    ) -> Tuple[str, Dict[str, str], Dict[str, str]]:
+        """
+        Endpoint, form data and headers exchanging the refresh token for a new
+        access token
+        """
+        request_data = {
+            "grant_type": "refresh_token",
+            "refresh_token": credentials.refresh_token,
+        }
+        return self._get_token_endpoint(), request_data, self._get_token_headers()
+
+    def _get_token_endpoint(self) -> str:
+        """
+        Endpoint issuing and refreshing access tokens
+        """
+        return "{}/api/token".format(self.accounts_url)
+
+    @staticmethod
+    def _get_token_headers() -> Dict[str, str]:
+        """
+        Headers authenticating this application with the token endpoint
+        """
+        client_id = os.getenv("SPOTIFY_CLIENT_ID")
+        client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
+        encoded_secret = encode_string_base64("{}:{}".format(client_id, client_secret))
+        return {
             "Content-Type": "application/x-www-form-urlencoded",
             "Authorization": "Basic {}".format(encoded_secret),
         }
-        response = self.send_post_request(endpoint, request_data, headers)
-        response_json = response.json()
 
+    def _set_auth_tokens(
+        self,
+        status_code: int,
+        response_json: Dict[str, Any],
+        credentials: Optional[Credentials] = None,
+    ):
+        """
+        Keep the tokens from the token endpoint response for subsequent requests.
+        When `credentials` are refreshed, the session and refresh token that
+        is not always renewed carry over.
+        """
+        refresh_token = response_json.get("refresh_token") or (
+            credentials and credentials.refresh_token
+        )
         if (
-            response.status_code != HTTP_200_OK
+            status_code != HTTP_200_OK
             or "access_token" not in response_json
-            or "refresh_token" not in response_json
+            or not refresh_token
         ):
             raise UnauthorizedException("User is unauthorized.", response_json)
-        self.access_token = response_json["access_token"]
-        self.refresh_token = response_json["refresh_token"]
+        expires_at = timezone.now() + datetime.timedelta(
+            seconds=response_json.get("expires_in", 3600)
+        )
+        if credentials is None:
+            credentials = Credentials(
+                self.token_store.new_session_key(), "", "", expires_at
+            )
+        self._use_credentials(
+            dataclasses.replace(
+                credentials,
+                access_token=response_json["access_token"],
+                refresh_token=refresh_token,
+                expires_at=expires_at,
+            )
+        )
+
+    def _use_credentials(self, credentials: Credentials):
+        """
+        Authenticate subsequent requests with the credentials
+        """
+        self.credentials = credentials
+        self.access_token = credentials.access_token
+        self.refresh_token = credentials.refresh_token
         self.headers = {
             "Authorization": "Bearer {}".format(self.access_token),
             "Content-Type": "application/json",
         }
+        if credentials.user_id:
+            self.rate_limit_key = credentials.user_id
 
     def _get_user_id(self) -> str:
         """
-        Retrieve user_id from profile of Spotify user
+        Retrieve user_id from profile of Spotify user, unless the session
+        already knows it
         """
-
+        if self.credentials is not None and self.credentials.user_id:
+            return self.credentials.user_id
         response = self.send_get_request(
-            "https://api.spotify.com/v1/me", headers=self.headers
+            "{}/v1/me".format(self.api_url), headers=self.headers
         )
-        user_id = self._get_id_from_uri(response.json()["uri"])
+        return self._set_user_id(response.json())
+
+    def _set_user_id(self, profile_json: Dict[str, Any]) -> str:
+        """
+        Parse the user_id from the profile of the Spotify user and store it
+        with the credentials of the session
+        """
+        user_id = self._get_id_from_uri(profile_json["uri"])
+        self.rate_limit_key = user_id
+        if self.credentials is not None:
+            self.credentials = dataclasses.replace(self.credentials, user_id=user_id)
+            self.token_store.save(self.credentials)
         return user_id
 
     def _get_playlist(self, playlist_data: Dict[str, Any]) -> Playlist:
         """
         Create a `Playlist` object from the playlist data
         """
-        playlist_title = playlist_data["name"]
-        playlist_id = playlist_data["id"]
-        endpoint = "https://api.spotify.com/v1/playlists/{}".format(playlist_id)
-        params = {
-            "fields": "images,tracks.items(track(name,artists(name),album(images)))"
-        }
-        response = self.send_get_request(endpoint, params=params, headers=self.headers)
-        response_json = response.json()
+        cached_playlist = self._get_cached_playlist(playlist_data)
+        if cached_playlist is not None:
+            return cached_playlist
+        endpoint, params = self._get_playlist_request(playlist_data)
+        response_json = self.get_json(endpoint, params=params, headers=self.headers)
         songs: List[Song] = []
-        for song in response_json["tracks"]["items"]:
-            if not song or not song.get("track"):
-                continue
-            artists = [
-                artist.get("name", "") for artist in song["track"].get("artists", [])
-            ]
-            song_title = song["track"]["name"]
-            songs.append(
-                Song(
-                    song_title,
-                    artists,
-                    song["track"].get("album", {}).get("images", []),
-                )
+        for page in self.iter_song_pages(response_json.get("tracks")):
+            songs.extend(page)
+        return self._build_playlist(playlist_data, songs, response_json)
+
+    def _get_cached_playlist(self, playlist_data: Dict[str, Any]) -> Optional[Playlist]:
+        """
+        Return the cached playlist when its `snapshot_id` is unchanged since it
+        was last fetched, so it can be served without any request
+        """
+        snapshot_id = playlist_data.get("snapshot_id")
+        if not snapshot_id:
+            return None
+        cached_playlist = self.playlist_cache.get(
+            self._get_playlist_cache_key(playlist_data)
+        )
+        if (
+            cached_playlist is not None
+            and cached_playlist.title != playlist_data["name"]
+        ):
+            return dataclasses.replace(cached_playlist, title=playlist_data["name"])
+        return cached_playlist
+
+    def _get_playlist_request(
+        self, playlist_data: Dict[str, Any]
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Endpoint and query parameters fetching a playlist with its first page of tracks
+        """
+        endpoint = "{}/v1/playlists/{}".format(self.api_url, playlist_data["id"])
+        fields = "tracks({})".format(self._get_track_fields())
+        if self.projection.with_images:
+            fields = "images,{}".format(fields)
+        return endpoint, {"fields": fields}
+
+    def _get_track_fields(self) -> str:
+        """
+        Fields of the playlist tracks needed for the projection, leaving out
+        the album images when no image is wanted
+        """
+        if self.projection.with_images:
+            return self.TRACK_FIELDS
+        return self.TRACK_FIELDS_WITHOUT_IMAGES
+
+    def _get_playlist_cache_key(self, playlist_data: Dict[str, Any]) -> Tuple:
+        """
+        Key of a playlist fetched for the projection in the playlist cache
+        """
+        return (
+            playlist_data["id"],
+            playlist_data.get("snapshot_id"),
+            self.projection.images,
+        )
+
+    def _build_playlist(
+        self,
+        playlist_data: Dict[str, Any],
+        songs: List[Song],
+        response_json: Dict[str, Any],
+    ) -> Playlist:
+        """
+        Create the `Playlist` object and cache it under its `snapshot_id`
+        """
+        playlist = Playlist(
+            playlist_data["name"],
+            songs,
+            self.interner.images(
+                self.projection.select_images(response_json.get("images"))
+            ),
+            playlist_data["id"],
+            playlist_data.get("snapshot_id"),
+        )
+        if playlist_data.get("snapshot_id"):
+            self.playlist_cache.set(
+                self._get_playlist_cache_key(playlist_data), playlist
             )
-        playlist = Playlist(playlist_title, songs, response_json.get("images", []))
         return playlist
+
+    def iter_song_pages(
+        self, tracks_page: Optional[Dict[str, Any]]
+    ) -> Iterator[List[Song]]:
+        """
+        Lazily yield the songs of a playlist one page at a time, starting from
+        the first page of tracks embedded in the playlist object
+        """
+        params = {"fields": self._get_track_fields()}
+        for page in self.iter_pages(tracks_page, params=params, headers=self.headers):
+            yield self._parse_songs(page)
+
+    def _parse_songs(self, tracks_page: Dict[str, Any]) -> List[Song]:
+        """
+        Create the `Song` objects of a page of playlist tracks
+        """
+        songs: List[Song] = []
+        for item in tracks_page.get("items", []):
+            song = self._parse_song(item)
+            if song:
+                songs.append(song)
+        return songs
+
+    def _parse_song(self, song: Optional[Dict[str, Any]]) -> Optional[Song]:
+        """
+        Create a `Song` object from a playlist track item, sharing its artists
+        and album images with the other songs of the library. A track already
+        parsed for another playlist of the request is shared as a whole.
+        """
+        if not song or not song.get("track"):
+            return None
+        track = song["track"]
+        if track.get("uri"):
+            return self.tracks.get_song(track["uri"], lambda: self._build_song(track))
+        return self._build_song(track)
+
+    def _build_song(self, track: Dict[str, Any]) -> Song:
+        """
+        Create a `Song` object from a track object
+        """
+        return Song(
+            track["name"],
+            self.interner.artists(
+                artist.get("name", "") for artist in track.get("artists", [])
+            ),
+            self.interner.images(
+                self.projection.select_images(track.get("album", {}).get("images"))
+            ),
+            track.get("uri"),
+            track.get("external_ids", {}).get("isrc"),
+        )
@@ -1,5 +1,7 @@
 from enum import Enum
 
+from playlistmover.playlistmover.logic.exceptions import BadRequestException
+
 
 class ClientEnum(str, Enum):
     """
@@ -18,4 +20,4 @@ class ClientEnum(str, Enum):
         for member in cls:
             if member.name.upper() == value.upper():
                 return member
-        raise ValueError(value)
+        raise BadRequestException("`{}` not supported.".format(value))
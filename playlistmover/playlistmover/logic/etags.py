@@ -0,0 +1,42 @@
+import hashlib
+from typing import Any, Dict, Iterable, Optional
+
+from django.utils.http import parse_etags
+
+
+def get_listing_etag(listing: Iterable[Dict[str, Any]], *variant: Any) -> Optional[str]:
+    """
+    Strong ETag of the playlists of a listing, derived from the id, name and
+    `snapshot_id` of each playlist and from the `variant` of the response they
+    are rendered in. None when a playlist has no `snapshot_id`, since its
+    changes could not be told apart.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in variant:
+        digest.update(repr(part).encode())
+        digest.update(b"\0")
+    for playlist_data in listing:
+        snapshot_id = playlist_data.get("snapshot_id")
+        if not snapshot_id:
+            return None
+        digest.update(
+            "{}\0{}\0{}\0".format(
+                playlist_data["id"], snapshot_id, playlist_data.get("name")
+            ).encode()
+        )
+    return '"{}"'.format(digest.hexdigest())
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an `If-None-Match` header matches the ETag, weakly compared as
+    for every conditional GET, since compressed responses carry weak ETags
+    """
+    if not if_none_match:
+        return False
+    for tag in parse_etags(if_none_match):
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag in ("*", etag):
+            return True
+    return False
@@ -3,6 +3,8 @@ from rest_framework.status import (
     HTTP_400_BAD_REQUEST,
     HTTP_500_INTERNAL_SERVER_ERROR,
     HTTP_401_UNAUTHORIZED,
+    HTTP_404_NOT_FOUND,
+    HTTP_429_TOO_MANY_REQUESTS,
 )
 
 
@@ -14,20 +16,49 @@ class UnauthorizedException(Exception):
     """Authorization failed"""
 
 
+class NotFoundException(Exception):
+    """Requested resource does not exist"""
+
+
+class TooManyRequestsException(Exception):
+    """Third-party platform kept rejecting requests for exceeding its rate limit"""
+
+
 class InternalServerException(Exception):
     """Server ran into errors processing request"""
 
 
+def get_exception_status(exception: Exception) -> int:
+    """
+    Return the HTTP status code that reports the exception to the caller
+    """
+    if isinstance(exception, BadRequestException):
+        return HTTP_400_BAD_REQUEST
+    if isinstance(exception, UnauthorizedException):
+        return HTTP_401_UNAUTHORIZED
+    if isinstance(exception, NotFoundException):
+        return HTTP_404_NOT_FOUND
+    if isinstance(exception, TooManyRequestsException):
+        return HTTP_429_TOO_MANY_REQUESTS
+    return HTTP_500_INTERNAL_SERVER_ERROR
+
+
+def get_exception_message(exception: Exception) -> str:
+    """
+    Return the message reported to the caller, without the details such as
+    upstream responses that exceptions carry as further arguments
+    """
+    if len(exception.args) > 1:
+        return str(exception.args[0])
+    return str(exception)
+
+
 def get_exception_response(exception: Exception):
     """
     Return the appropriate HTTP error response in case of exceptions
     """
-    response = Response({"success": False, "error": str(exception)})
-    if isinstance(exception, BadRequestException):
-        response.status_code = HTTP_400_BAD_REQUEST
-    elif isinstance(exception, UnauthorizedException):
-        response.status_code = HTTP_401_UNAUTHORIZED
-    else:
-        response.status_code = HTTP_500_INTERNAL_SERVER_ERROR
+    response = Response({"success": False, "error": get_exception_message(exception)})
+    response.status_code = get_exception_status(exception)
+    if response.status_code == HTTP_500_INTERNAL_SERVER_ERROR:
         raise exception
     return response
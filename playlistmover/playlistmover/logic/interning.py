@@ -0,0 +1,120 @@
+import sys
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from playlistmover.playlistmover.models import Image
+
+
+class Interner:
+    """
+    Shares equal artist lists and album images between the songs parsed from
+    a library, so every song of an album points to the same `Image` objects
+    and every artist name is stored once
+    """
+
+    def __init__(self):
+        self._artists: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        self._images: Dict[Tuple[Any, ...], Tuple[Image, ...]] = {}
+
+    def artists(self, names: Iterable[str]) -> Tuple[str, ...]:
+        """
+        Shared tuple of interned artist names
+        """
+        key = tuple(sys.intern(name or "") for name in names)
+        # setdefault keeps the first tuple stored when threads race
+        return self._artists.setdefault(key, key)
+
+    def images(self, images: Optional[Iterable[Dict[str, Any]]]) -> Tuple[Image, ...]:
+        """
+        Shared tuple of `Image` objects for the images of a Spotify response
+        """
+        key = tuple(
+            (image.get("url", ""), image.get("height"), image.get("width"))
+            for image in images or ()
+        )
+        shared = self._images.get(key)
+        if shared is None:
+            shared = self._images.setdefault(
+                key, tuple(Image(*fields) for fields in key)
+            )
+        return shared
+
+
+class TrackTable:
+    """
+    Unique tracks of the playlists handled by one request, keyed by source
+    track id. A track found in several playlists is parsed into a single
+    `Song` shared by all of them, and matched to a destination track once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._songs: Dict[str, Any] = {}
+        self._matches: Dict[str, Future] = {}
+        self.references = 0
+
+    def get_song(self, key: str, parse: Callable[[], Any]) -> Any:
+        """
+        Song of a track, parsed by `parse` the first time the track is seen
+        """
+        with self._lock:
+            self.references += 1
+            song = self._songs.get(key)
+        if song is None:
+            song = parse()
+            with self._lock:
+                # setdefault keeps the first song stored when threads race
+                song = self._songs.setdefault(key, song)
+        return song
+
+    def claim_matches(self, keys: Sequence[str]) -> List[int]:
+        """
+        Indexes of the first occurrence of each track not matched yet, which
+        the caller has to match and pass to `set_matches` or `fail_matches`.
+        Other callers asking for these tracks wait for their matches.
+        """
+        claimed = []
+        with self._lock:
+            for index, key in enumerate(keys):
+                if key not in self._matches:
+                    self._matches[key] = Future()
+                    claimed.append(index)
+        return claimed
+
+    def set_matches(self, keys: Sequence[str], uris: Sequence[Optional[str]]):
+        """
+        Record the destination track uris of claimed tracks, None when a
+        track has no match
+        """
+        for key, uri in zip(keys, uris):
+            self._matches[key].set_result(uri)
+
+    def fail_matches(self, keys: Sequence[str], exception: BaseException):
+        """
+        Release claimed tracks that could not be matched, failing their
+        waiters too
+        """
+        for key in keys:
+            self._matches[key].set_exception(exception)
+
+    def get_matches(self, keys: Sequence[str]) -> List[Optional[str]]:
+        """
+        Destination track uris of claimed tracks, waiting for those that
+        another caller is still matching
+        """
+        return [self._matches[key].result() for key in keys]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Track references parsed so far, unique tracks among them and the
+        share of references served from the table
+        """
+        with self._lock:
+            references, unique = self.references, len(self._songs)
+        dedup_ratio = 1 - unique / references if references else 0.0
+        return {
+            "tracks": references,
+            "unique_tracks": unique,
+            "dedup_ratio": round(dedup_ratio, 3),
+        }
@@ -0,0 +1,300 @@
+import contextlib
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework.status import HTTP_500_INTERNAL_SERVER_ERROR
+
+from playlistmover.playlistmover.logic.clients import Client
+from playlistmover.playlistmover.logic.clients_enums import ClientEnum
+from playlistmover.playlistmover.logic.exceptions import (
+    BadRequestException,
+    NotFoundException,
+    get_exception_message,
+    get_exception_status,
+)
+from playlistmover.playlistmover.models import MigrationJob, MigrationJobPlaylist
+from playlistmover.playlistmover.serializers import PlaylistSerializer
+
+logger = logging.getLogger(__name__)
+
+FINISHED = (MigrationJob.DONE, MigrationJob.FAILED)
+MODES = (MigrationJob.COPY, MigrationJob.SYNC)
+
+
+def get_job_mode(mode: Optional[str], playlists: List[Dict[str, Any]]) -> str:
+    """
+    Mode asked for by a request, copy unless it says otherwise. Synced
+    playlists have to carry the id of their source playlist.
+    """
+    if mode is None:
+        return MigrationJob.COPY
+    if mode not in MODES:
+        raise BadRequestException("`mode` must be one of {}.".format(", ".join(MODES)))
+    if mode == MigrationJob.SYNC and not all(
+        playlist.get("id") for playlist in playlists
+    ):
+        raise BadRequestException("`id` of every playlist is required to sync.")
+    return mode
+
+
+def enqueue_job(
+    platform: str,
+    session_key: str,
+    playlists: List[Dict[str, Any]],
+    mode: str = MigrationJob.COPY,
+) -> MigrationJob:
+    """
+    Queue the validated playlists to be created, or synced, on the platform
+    account of an authenticated session
+    """
+    with transaction.atomic():
+        job = MigrationJob.objects.create(
+            platform=platform, session_key=session_key, mode=mode
+        )
+        MigrationJobPlaylist.objects.bulk_create(
+            MigrationJobPlaylist(
+                job=job,
+                position=position,
+                title=playlist["title"],
+                data=playlist,
+                tracks=len(playlist["songs"]),
+            )
+            for position, playlist in enumerate(playlists)
+        )
+    return job
+
+
+def get_worker_name() -> str:
+    """
+    Name identifying this worker process in the jobs it claims
+    """
+    return "{}:{}".format(socket.gethostname(), os.getpid())[:64]
+
+
+def get_claimable_jobs(now):
+    """
+    Jobs that are queued, or running on a worker whose lease has expired
+    """
+    expired = now - timedelta(seconds=settings.JOB_LEASE_SECONDS)
+    return MigrationJob.objects.filter(
+        Q(status=MigrationJob.QUEUED)
+        | Q(status=MigrationJob.RUNNING, heartbeat_at__lt=expired)
+        | Q(status=MigrationJob.RUNNING, heartbeat_at__isnull=True)
+    )
+
+
+def claim_job(worker: str) -> Optional[MigrationJob]:
+    """
+    Take the oldest queued job, or a job left running by a worker that stopped
+    renewing its lease, None when there is neither. The job is taken with a
+    conditional update, so it is only ever claimed by one of the workers
+    polling the same database.
+    """
+    while True:
+        now = timezone.now()
+        job_id = (
+            get_claimable_jobs(now)
+            .order_by("created_at", "id")
+            .values_list("id", flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+        claimed = (
+            get_claimable_jobs(now)
+            .filter(id=job_id)
+            .update(
+                status=MigrationJob.RUNNING,
+                worker=worker,
+                started_at=Coalesce("started_at", now),
+                heartbeat_at=now,
+            )
+        )
+        if claimed:
+            return MigrationJob.objects.get(id=job_id)
+
+
+@contextlib.contextmanager
+def holding_lease(job: MigrationJob):
+    """
+    Renew the lease of a claimed job from a background thread while the block
+    runs, so other workers only take the job back once its worker is gone
+    """
+    jobs = MigrationJob.objects.filter(id=job.id, worker=job.worker)
+    interval = settings.JOB_LEASE_SECONDS / 3
+    stopped = threading.Event()
+
+    def renew():
+        try:
+            while not stopped.wait(interval):
+                jobs.update(heartbeat_at=timezone.now())
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=renew, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+class JobProgress:
+    """
+    Records the state of each playlist of a job as the client creates them.
+    The client counts the playlists it was handed, which are mapped back to
+    their `positions` in the job.
+    """
+
+    def __init__(self, job: MigrationJob, positions: List[int]):
+        self.playlists = MigrationJobPlaylist.objects.filter(job=job)
+        self.positions = positions
+
+    def playlist_started(self, index: int):
+        """
+        Mark a playlist as being created
+        """
+        self.playlists.filter(position=self.positions[index]).update(
+            status=MigrationJob.RUNNING, started_at=timezone.now()
+        )
+
+    def playlist_created(self, index: int, report: Dict[str, Any]):
+        """
+        Mark a playlist as created, with the report of its tracks
+        """
+        self.playlists.filter(position=self.positions[index]).update(
+            status=MigrationJob.DONE, report=report, finished_at=timezone.now()
+        )
+
+    def playlist_failed(self, index: int, exception: Exception):
+        """
+        Mark a playlist as failed with the message of its exception
+        """
+        self.playlists.filter(position=self.positions[index]).update(
+            status=MigrationJob.FAILED,
+            error=get_exception_message(exception),
+            finished_at=timezone.now(),
+        )
+
+
+def run_job(job: MigrationJob):
+    """
+    Create the playlists of a claimed job and record its outcome. A job taken
+    back from a worker that stopped only creates the playlists left unfinished.
+    """
+    pending = list(job.playlists.exclude(status__in=FINISHED))
+    playlists = PlaylistSerializer(
+        data=[playlist.data for playlist in pending], many=True
+    )
+    try:
+        if not playlists.is_valid():
+            raise BadRequestException("`playlists` object in job is invalid")
+        music_client = Client.get_client(ClientEnum(job.platform))
+        with holding_lease(job):
+            music_client.create_playlists(
+                {"context": {"session": job.session_key}},
+                playlists,
+                JobProgress(job, [playlist.position for playlist in pending]),
+                sync=job.mode == MigrationJob.SYNC,
+            )
+        status, error = MigrationJob.DONE, ""
+    except Exception as exception:
+        if get_exception_status(exception) == HTTP_500_INTERNAL_SERVER_ERROR:
+            logger.exception("Migration job %s failed", job.id)
+        status, error = MigrationJob.FAILED, get_exception_message(exception)
+
+    finished_at = timezone.now()
+    with transaction.atomic():
+        # a worker that lost its lease leaves the outcome to the one that took over
+        if not MigrationJob.objects.filter(id=job.id, worker=job.worker).update(
+            status=status, error=error, finished_at=finished_at
+        ):
+            return
+        # playlists that never started, for instance when authentication failed
+        job.playlists.exclude(status__in=FINISHED).update(
+            status=MigrationJob.FAILED, error=error, finished_at=finished_at
+        )
+
+
+def work(poll_interval: float, max_jobs: Optional[int] = None):
+    """
+    Run queued jobs one after the other, waiting `poll_interval` seconds
+    whenever the queue is empty. Returns after `max_jobs` jobs if given.
+    """
+    worker = get_worker_name()
+    done = 0
+    while max_jobs is None or done < max_jobs:
+        job = claim_job(worker)
+        if job is None:
+            connection.close()
+            time.sleep(poll_interval)
+            continue
+        run_job(job)
+        done += 1
+
+
+def get_job_progress(job_id: UUID) -> Dict[str, Any]:
+    """
+    State of the job with the given public id and each of its playlists, with
+    the tracks processed per second so far and the estimated seconds until the
+    job finishes
+    """
+    try:
+        job = MigrationJob.objects.get(public_id=job_id)
+    except MigrationJob.DoesNotExist:
+        raise NotFoundException("Job `{}` does not exist.".format(job_id))
+    playlists = list(job.playlists.all())
+
+    tracks = sum(playlist.tracks for playlist in playlists)
+    finished = [playlist for playlist in playlists if playlist.status in FINISHED]
+    finished_tracks = sum(playlist.tracks for playlist in finished)
+    throughput = eta = None
+    if job.started_at:
+        elapsed = ((job.finished_at or timezone.now()) - job.started_at).total_seconds()
+        if finished_tracks and elapsed > 0:
+            throughput = round(finished_tracks / elapsed, 2)
+    if job.status in FINISHED:
+        eta = 0
+    elif throughput:
+        eta = round((tracks - finished_tracks) / throughput, 1)
+
+    return {
+        "id": str(job.public_id),
+        "platform": job.platform,
+        "mode": job.mode,
+        "status": job.status,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "progress": {
+            "playlists": len(playlists),
+            "finished_playlists": len(finished),
+            "tracks": tracks,
+            "finished_tracks": finished_tracks,
+            "tracks_per_second": throughput,
+            "eta_seconds": eta,
+        },
+        "playlists": [
+            {
+                "title": playlist.title,
+                "status": playlist.status,
+                "tracks": playlist.tracks,
+                "report": playlist.report,
+                "error": playlist.error,
+            }
+            for playlist in playlists
+        ],
+    }
@@ -0,0 +1,99 @@
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from django.db.models import F
+
+from playlistmover.playlistmover.logic.utils import normalize_artists, normalize_text
+from playlistmover.playlistmover.models import TrackMatch
+
+
+class MatchIndex:
+    """
+    Persistent index of songs already resolved to tracks of a destination
+    platform, so repeat and overlapping migrations skip the search requests
+    """
+
+    def __init__(self, platform: str):
+        self.platform = platform
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_song_key(song: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Normalized (title, artists) key of a song
+        """
+        return (
+            normalize_text(song["title"])[:200],
+            normalize_artists(song.get("artists", []))[:400],
+        )
+
+    def lookup_many(self, songs: Sequence[Dict[str, Any]]) -> List[Optional[str]]:
+        """
+        Return the indexed track uri of every song, None for songs that have
+        not been resolved before. Matches by ISRC take precedence.
+        """
+        if not songs:
+            return []
+        keys = [self.get_song_key(song) for song in songs]
+        isrcs = {song["isrc"] for song in songs if song.get("isrc")}
+        matches = TrackMatch.objects.filter(
+            platform=self.platform, title_key__in={title for title, _ in keys}
+        )
+        by_key = {(match.title_key, match.artists_key): match for match in matches}
+        by_isrc = {}
+        if isrcs:
+            isrc_matches = TrackMatch.objects.filter(
+                platform=self.platform, isrc__in=isrcs
+            )
+            by_isrc = {match.isrc: match for match in isrc_matches}
+
+        found = [
+            by_isrc.get(song.get("isrc")) or by_key.get(key)
+            for song, key in zip(songs, keys)
+        ]
+        matched_ids = [match.pk for match in found if match]
+        if matched_ids:
+            TrackMatch.objects.filter(pk__in=matched_ids).update(hits=F("hits") + 1)
+        with self._lock:
+            self.hits += len(matched_ids)
+            self.misses += len(found) - len(matched_ids)
+        return [match.track_uri if match else None for match in found]
+
+    def store_many(
+        self, songs: Sequence[Dict[str, Any]], uris: Sequence[Optional[str]]
+    ):
+        """
+        Index the track uri each song was resolved to, skipping unresolved songs
+        """
+        matches = {}
+        for song, uri in zip(songs, uris):
+            if not uri:
+                continue
+            title_key, artists_key = self.get_song_key(song)
+            matches[(title_key, artists_key)] = TrackMatch(
+                platform=self.platform,
+                title_key=title_key,
+                artists_key=artists_key,
+                isrc=song.get("isrc") or "",
+                track_uri=uri,
+            )
+        if matches:
+            TrackMatch.objects.bulk_create(
+                matches.values(),
+                update_conflicts=True,
+                unique_fields=["platform", "title_key", "artists_key"],
+                update_fields=["isrc", "track_uri", "updated_at"],
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Lookups answered by the index and those that needed a search
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,212 @@
+import functools
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from playlistmover.playlistmover.logic.utils import normalize_artists, normalize_text
+
+_VERSION_SUFFIX = re.compile(r"\s-\s.*$")
+
+# (title, artists) trigrams of a song or candidate
+Features = Tuple[FrozenSet[str], FrozenSet[str]]
+
+
+def get_trigrams(text: str) -> FrozenSet[str]:
+    """
+    Character trigrams of a normalized string, padded so short words count
+    """
+    if not text:
+        return frozenset()
+    padded = "  {} ".format(text)
+    return frozenset(padded[index : index + 3] for index in range(len(padded) - 2))
+
+
+def dice_coefficient(first: FrozenSet[str], second: FrozenSet[str]) -> float:
+    """
+    Similarity of two trigram sets between 0 and 1
+    """
+    if not first or not second:
+        return 0.0
+    return 2 * len(first & second) / (len(first) + len(second))
+
+
+def normalize_title(title: str) -> str:
+    """
+    Normalized song title without a version suffix such as " - Remastered",
+    so the versions of a song are close enough to be matched to each other
+    """
+    return normalize_text(_VERSION_SUFFIX.sub(" ", title))
+
+
+class TitleIndex:
+    """
+    Distinct candidate titles indexed by the prefix of their rarest trigrams.
+    Two titles reaching `min_title_score` share at least one trigram of their
+    prefixes, so only titles sharing one with a song are ever scored.
+    """
+
+    def __init__(self, titles: Sequence[FrozenSet[str]], min_title_score: float):
+        self.min_title_score = min_title_score
+        # candidates sharing a title share its trigrams and its postings
+        self.titles: Dict[FrozenSet[str], List[int]] = defaultdict(list)
+        for index, title_trigrams in enumerate(titles):
+            self.titles[title_trigrams].append(index)
+        self.frequency: Counter = Counter()
+        for title_trigrams in self.titles:
+            self.frequency.update(title_trigrams)
+        # every posting keeps how many trigrams of its title follow the trigram
+        self.postings: Dict[str, List[Tuple[int, int, FrozenSet[str]]]] = defaultdict(
+            list
+        )
+        for title_trigrams in self.titles:
+            size = len(title_trigrams)
+            for position, trigram in enumerate(self.get_prefix(title_trigrams)):
+                self.postings[trigram].append(
+                    (size, size - position - 1, title_trigrams)
+                )
+
+    def get_prefix(self, title_trigrams: FrozenSet[str]) -> List[str]:
+        """
+        Rarest trigrams of a title, of which any title reaching the minimum
+        score shares at least one
+        """
+        # two titles reaching the minimum score share at least this many
+        # trigrams, so under one global rarest-first order their prefixes
+        # of `len - min_overlap + 1` trigrams intersect
+        min_overlap = math.ceil(
+            self.min_title_score * len(title_trigrams) / (2 - self.min_title_score)
+        )
+        frequency = self.frequency
+        ordered = sorted(
+            title_trigrams, key=lambda trigram: (frequency[trigram], trigram)
+        )
+        return ordered[: len(title_trigrams) - min_overlap + 1]
+
+    def get_candidates(self, title: FrozenSet[str]) -> List[int]:
+        """
+        Indexes of the candidates whose title reaches the minimum score
+        """
+        size = len(title)
+        min_title_score, postings = self.min_title_score, self.postings
+        seen = set()
+        shortlist = []
+        for position, trigram in enumerate(self.get_prefix(title), 1):
+            rest = size - position
+            for shared_size, shared_rest, shared_title in postings.get(trigram, ()):
+                if shared_title in seen:
+                    continue
+                seen.add(shared_title)
+                # this is the rarest trigram both titles share, so they
+                # share at most it and what follows it in the shorter rest
+                max_overlap = 1 + (rest if rest < shared_rest else shared_rest)
+                if 2 * max_overlap >= min_title_score * (size + shared_size):
+                    shortlist.append(shared_title)
+        return sorted(
+            index
+            for shared_title in shortlist
+            if dice_coefficient(title, shared_title) >= min_title_score
+            for index in self.titles[shared_title]
+        )
+
+
+class MatchEngine:
+    """
+    Fuzzy matches songs that have no exact match to candidate tracks by the
+    trigram similarity of their normalized titles and artists.
+
+    All songs are matched against all candidates in a single batch. Distinct
+    titles are indexed once by the prefix of their rarest trigrams, so only
+    pairs that share a prefix trigram, and could therefore still reach the
+    threshold, are ever scored. The matches are the same as scoring every
+    song against every candidate, at a cost that grows with the number of
+    plausible pairs instead of songs x candidates.
+    """
+
+    def __init__(self, threshold: float = 0.75, title_weight: float = 0.7):
+        self.threshold = threshold
+        self.title_weight = title_weight
+
+    @staticmethod
+    def _get_features(item: Dict[str, Any]) -> Features:
+        return (
+            get_trigrams(normalize_title(item["title"])),
+            get_trigrams(normalize_artists(item.get("artists", []))),
+        )
+
+    def get_min_title_score(self) -> float:
+        """
+        Lowest title similarity with which a pair can still reach the threshold
+        """
+        return max((self.threshold - (1 - self.title_weight)) / self.title_weight, 0)
+
+    def score(
+        self,
+        song_features: Features,
+        candidate_features: Features,
+    ) -> float:
+        """
+        Similarity of a song and a candidate between 0 and 1
+        """
+        score = dice_coefficient(song_features[0], candidate_features[0])
+        # songs or candidates without artists are matched on title alone
+        if song_features[1] and candidate_features[1]:
+            score = self.title_weight * score + (1 - self.title_weight) * (
+                dice_coefficient(song_features[1], candidate_features[1])
+            )
+        return score
+
+    def match(
+        self,
+        songs: Sequence[Dict[str, Any]],
+        candidates: Sequence[Dict[str, Any]],
+    ) -> List[Optional[Tuple[int, float]]]:
+        """
+        Return for every song the index and score of its best scoring
+        candidate, or None when no candidate reaches the threshold
+        """
+        get_features = functools.lru_cache(maxsize=None)(self._get_text_features)
+        candidate_features = [
+            get_features(candidate["title"], tuple(candidate.get("artists", [])))
+            for candidate in candidates
+        ]
+        # a little below the exact bound so that rounding never filters out a
+        # pair that scoring every candidate would have matched
+        min_title_score = self.get_min_title_score() - 1e-9
+        song_features = [
+            get_features(song["title"], tuple(song.get("artists", [])))
+            for song in songs
+        ]
+        if min_title_score <= 0:
+            return [
+                self._get_best_match(
+                    features, range(len(candidates)), candidate_features
+                )
+                for features in song_features
+            ]
+        index = TitleIndex([title for title, _ in candidate_features], min_title_score)
+        return [
+            self._get_best_match(
+                features, index.get_candidates(features[0]), candidate_features
+            )
+            for features in song_features
+        ]
+
+    def _get_text_features(self, title: str, artists: Tuple[str, ...]) -> Features:
+        return self._get_features({"title": title, "artists": artists})
+
+    def _get_best_match(
+        self,
+        song_features: Features,
+        indexes: Iterable[int],
+        candidate_features: List[Features],
+    ) -> Optional[Tuple[int, float]]:
+        best_index: Optional[int] = None
+        best_score = 0.0
+        for index in indexes:
+            score = self.score(song_features, candidate_features[index])
+            if score >= self.threshold and (best_index is None or score > best_score):
+                best_index, best_score = index, score
+        if best_index is None:
+            return None
+        return best_index, best_score
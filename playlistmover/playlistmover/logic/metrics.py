@@ -0,0 +1,300 @@
+import bisect
+import contextlib
+import contextvars
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+# upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# (platform, method, host, endpoint) of an outbound request
+EndpointKey = Tuple[str, str, str, str]
+
+
+def get_endpoint(url: str, id_segments: Sequence[str] = ()) -> Tuple[str, str]:
+    """
+    Host and path template of a url, the path segment after each of the
+    `id_segments` being replaced by `{id}` so requests for every user or
+    playlist are aggregated under the same endpoint
+    """
+    parts = urlsplit(str(url))
+    segments = parts.path.split("/")
+    for index in range(1, len(segments)):
+        if segments[index - 1] in id_segments and segments[index]:
+            segments[index] = "{id}"
+    return parts.netloc, "/".join(segments)
+
+
+def get_body_size(body: Any) -> int:
+    """
+    Size of a request or response body, 0 when it is streamed or missing
+    """
+    if isinstance(body, (bytes, str)):
+        return len(body)
+    return 0
+
+
+class Histogram:
+    """
+    Cumulative histogram of observed values, with their sum and count
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """
+        Count a value in the first bucket whose bound is at least the value
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def get_cumulative_counts(self) -> List[Tuple[str, int]]:
+        """
+        Count of the values at most each bucket bound, `+Inf` last
+        """
+        bounds = [repr(float(bound)) for bound in self.buckets] + ["+Inf"]
+        cumulative, total = [], 0
+        for bound, count in zip(bounds, self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return cumulative
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    escaped = (
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"),
+        )
+        for name, value in labels.items()
+    )
+    return "{{{}}}".format(",".join(escaped))
+
+
+class UpstreamMetrics:
+    """
+    Latency histograms, status counts and bytes transferred of the outbound
+    requests made by this process, per platform endpoint
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[EndpointKey, Histogram] = {}
+        self.statuses: Dict[Tuple[EndpointKey, str], int] = {}
+        self.sent_bytes: Dict[EndpointKey, int] = {}
+        self.received_bytes: Dict[EndpointKey, int] = {}
+
+    def observe(
+        self,
+        key: EndpointKey,
+        status: str,
+        duration: float,
+        sent: int,
+        received: int,
+    ):
+        """
+        Add an outbound request to the metrics of its endpoint
+        """
+        with self._lock:
+            if key not in self.latencies:
+                self.latencies[key] = Histogram()
+            self.latencies[key].observe(duration)
+            self.statuses[key, status] = self.statuses.get((key, status), 0) + 1
+            self.sent_bytes[key] = self.sent_bytes.get(key, 0) + sent
+            self.received_bytes[key] = self.received_bytes.get(key, 0) + received
+
+    def clear(self):
+        """
+        Forget every request observed so far
+        """
+        with self._lock:
+            self.latencies.clear()
+            self.statuses.clear()
+            self.sent_bytes.clear()
+            self.received_bytes.clear()
+
+    def render(self) -> str:
+        """
+        Metrics in the Prometheus text exposition format
+        """
+        lines: List[str] = []
+
+        def add_metric(name: str, kind: str, description: str):
+            lines.append("# HELP {} {}".format(name, description))
+            lines.append("# TYPE {} {}".format(name, kind))
+
+        def get_labels(key: EndpointKey, **extra: str) -> Dict[str, str]:
+            platform, method, host, endpoint = key
+            labels = {
+                "platform": platform,
+                "method": method,
+                "host": host,
+                "endpoint": endpoint,
+            }
+            return {**labels, **extra}
+
+        with self._lock:
+            name = "playlistmover_upstream_request_duration_seconds"
+            add_metric(name, "histogram", "Latency of requests to music platforms.")
+            for key, histogram in sorted(self.latencies.items()):
+                for bound, count in histogram.get_cumulative_counts():
+                    labels = _format_labels(get_labels(key, le=bound))
+                    lines.append("{}_bucket{} {}".format(name, labels, count))
+                labels = _format_labels(get_labels(key))
+                lines.append("{}_sum{} {}".format(name, labels, repr(histogram.sum)))
+                lines.append("{}_count{} {}".format(name, labels, histogram.count))
+
+            name = "playlistmover_upstream_requests_total"
+            add_metric(name, "counter", "Requests to music platforms by status.")
+            for (key, status), count in sorted(self.statuses.items()):
+                labels = _format_labels(get_labels(key, status=status))
+                lines.append("{}{} {}".format(name, labels, count))
+
+            for name, counters, description in (
+                (
+                    "playlistmover_upstream_sent_bytes_total",
+                    self.sent_bytes,
+                    "Bytes of request bodies sent to music platforms.",
+                ),
+                (
+                    "playlistmover_upstream_received_bytes_total",
+                    self.received_bytes,
+                    "Bytes of response bodies received from music platforms.",
+                ),
+            ):
+                add_metric(name, "counter", description)
+                for key, count in sorted(counters.items()):
+                    labels = _format_labels(get_labels(key))
+                    lines.append("{}{} {}".format(name, labels, count))
+        return "\n".join(lines) + "\n"
+
+
+class RequestTimings:
+    """
+    Outbound requests made while serving one API request, per endpoint
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.calls: Dict[Tuple[str, str], List[float]] = {}
+
+    def add(self, method: str, endpoint: str, duration: float):
+        """
+        Add an outbound request to the count and time of its endpoint
+        """
+        with self._lock:
+            calls = self.calls.setdefault((method, endpoint), [0, 0.0])
+            calls[0] += 1
+            calls[1] += duration
+
+    def get_server_timing(self) -> str:
+        """
+        `Server-Timing` header value: the total time spent on each endpoint,
+        which concurrent requests can make exceed the time of the response,
+        and the time of the whole response
+        """
+        metrics = []
+        with self._lock:
+            for (method, endpoint), (count, duration) in self.calls.items():
+                name = re.sub(
+                    r"[^a-z0-9]+", "-", "{} {}".format(method, endpoint).lower()
+                )
+                metrics.append(
+                    '{};desc="{} {} x{}";dur={:.1f}'.format(
+                        name.strip("-"), method, endpoint, count, duration * 1000
+                    )
+                )
+        total = (time.perf_counter() - self.started) * 1000
+        metrics.append("total;dur={:.1f}".format(total))
+        return ", ".join(metrics)
+
+
+_request_timings: contextvars.ContextVar[
+    Optional[RequestTimings]
+] = contextvars.ContextVar("request_timings", default=None)
+
+_METRICS: Optional[UpstreamMetrics] = None
+_METRICS_LOCK = threading.Lock()
+
+
+def get_metrics() -> UpstreamMetrics:
+    """
+    Return the metrics of the outbound requests made by this process
+    """
+    global _METRICS
+    if _METRICS is None:
+        with _METRICS_LOCK:
+            if _METRICS is None:
+                _METRICS = UpstreamMetrics()
+    return _METRICS
+
+
+def is_metrics_client(request) -> bool:
+    """
+    Whether the client of a request may see the metrics, which name the
+    endpoints called upstream: only the addresses of METRICS_ALLOWED_IPS can
+    """
+    return request.META.get("REMOTE_ADDR") in settings.METRICS_ALLOWED_IPS
+
+
+@contextlib.contextmanager
+def track_request() -> Iterator[RequestTimings]:
+    """
+    Collect the outbound requests made in this context, and in the threads
+    running functions bound to it, into new request timings
+    """
+    timings = RequestTimings()
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def bind_context(function: Callable) -> Callable:
+    """
+    Wrap a function to run in a copy of the caller's context in whichever
+    thread calls it, so executor threads add to the caller's request timings
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(function, *args, **kwargs)
+
+    return run
+
+
+def record_call(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    platform: str,
+    method: str,
+    url: str,
+    status: str,
+    duration: float,
+    sent: int,
+    received: int,
+    id_segments: Sequence[str] = (),
+):
+    """
+    Record an outbound request in the process metrics and in the timings of
+    the API request being served, if any
+    """
+    host, endpoint = get_endpoint(url, id_segments)
+    get_metrics().observe(
+        (platform, method, host, endpoint), status, duration, sent, received
+    )
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.add(method, endpoint, duration)
@@ -0,0 +1,74 @@
+import dataclasses
+from typing import Any, Dict, List, Optional, Sequence
+
+from rest_framework import serializers
+
+from playlistmover.playlistmover.logic.exceptions import BadRequestException
+from playlistmover.playlistmover.serializers import (
+    PlaylistSerializer,
+    PlaylistSummarySerializer,
+)
+
+ALL_IMAGES = "all"
+LARGEST_IMAGE = "largest"
+SMALLEST_IMAGE = "smallest"
+NO_IMAGES = "none"
+IMAGE_VARIANTS = (ALL_IMAGES, LARGEST_IMAGE, SMALLEST_IMAGE, NO_IMAGES)
+
+
+def _get_image_area(image: Dict[str, Any]) -> int:
+    return (image.get("width") or 0) * (image.get("height") or 0)
+
+
+@dataclasses.dataclass(frozen=True)
+class Projection:
+    """
+    Parts of the playlists a caller asked for: which image variants to keep,
+    and whether only a summary of each playlist is needed instead of its songs
+    """
+
+    images: str = ALL_IMAGES
+    summary: bool = False
+
+    @classmethod
+    def from_query_params(cls, query_params: Dict[str, Any]) -> "Projection":
+        """
+        Projection of the `images` and `summary` query parameters
+        """
+        images = query_params.get("images", ALL_IMAGES)
+        if images not in IMAGE_VARIANTS:
+            raise BadRequestException(
+                "`images` must be one of {}.".format(", ".join(IMAGE_VARIANTS))
+            )
+        summary = query_params.get("summary", "false")
+        if summary.lower() not in ("true", "false", "1", "0"):
+            raise BadRequestException("`summary` must be true or false.")
+        return cls(images=images, summary=summary.lower() in ("true", "1"))
+
+    @property
+    def with_images(self) -> bool:
+        """
+        Whether any image has to be fetched
+        """
+        return self.images != NO_IMAGES
+
+    @property
+    def serializer_class(self) -> type[serializers.Serializer]:
+        """
+        Serializer of the projected playlists
+        """
+        return PlaylistSummarySerializer if self.summary else PlaylistSerializer
+
+    def select_images(
+        self, images: Optional[Sequence[Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        The image variants kept out of those of a platform response
+        """
+        if not images or self.images == NO_IMAGES:
+            return []
+        if self.images == LARGEST_IMAGE:
+            return [max(images, key=_get_image_area)]
+        if self.images == SMALLEST_IMAGE:
+            return [min(images, key=_get_image_area)]
+        return list(images)
@@ -0,0 +1,315 @@
+import asyncio
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, Hashable, Optional, Tuple
+
+from django.conf import settings
+from requests.models import Response
+from rest_framework.status import HTTP_429_TOO_MANY_REQUESTS
+
+from playlistmover.playlistmover.logic.exceptions import TooManyRequestsException
+
+# seconds between admission checks of async requests queued behind others
+ADMISSION_POLL_INTERVAL = 0.001
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `rate` tokens per second up to
+    `capacity` tokens. A `rate` of None never runs out of tokens.
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float],
+        capacity: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.clock = clock
+        self.updated_at = clock()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        if self.rate is not None:
+            elapsed = max(now - self.updated_at, 0.0)
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def wait_time(self) -> float:
+        """
+        Seconds until a token is available, 0 if one is available now
+        """
+        now = self.clock()
+        self._refill(now)
+        paused = max(self.paused_until - now, 0.0)
+        if self.rate is None or self.tokens >= 1:
+            return paused
+        return max(paused, (1 - self.tokens) / self.rate)
+
+    def consume(self):
+        """
+        Take one token, the caller must have checked `wait_time` first
+        """
+        if self.rate is not None:
+            self.tokens -= 1
+
+    def pause(self, seconds: float):
+        """
+        Hand out no tokens for the next `seconds`
+        """
+        self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+    def is_full(self) -> bool:
+        """
+        Whether the bucket is refilled to capacity and not paused, so it
+        behaves like a new one
+        """
+        now = self.clock()
+        self._refill(now)
+        return self.tokens >= self.capacity and self.paused_until <= now
+
+
+def _get_wait(
+    platform: Hashable, wait: Optional[float], deadline: Optional[float]
+) -> Optional[float]:
+    """
+    Seconds to wait before checking admission again, no later than the
+    deadline, raising a TooManyRequestsException once it has passed
+    """
+    if deadline is None:
+        return wait
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TooManyRequestsException(
+            "`{}` rate limit exceeded, try again later.".format(
+                getattr(platform, "value", platform)
+            )
+        )
+    return remaining if wait is None else min(wait, remaining)
+
+
+class RequestScheduler:  # pylint: disable=too-many-instance-attributes
+    """
+    Admits outbound requests against one token bucket per platform and one per
+    user on that platform. Waiting requests are served round-robin across users
+    so a single user's burst cannot starve everyone else of the platform quota.
+    Requests made before the user is known, such as logins, only count against
+    the platform bucket. The buckets of users back to full capacity are
+    dropped once per refill time, so idle users do not accumulate.
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float],
+        burst: int,
+        user_rate: Optional[float] = None,
+        user_burst: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.clock = clock
+        self._condition = threading.Condition()
+        self._platform_buckets: Dict[Hashable, TokenBucket] = {}
+        self._user_buckets: Dict[Tuple[Hashable, Hashable], TokenBucket] = {}
+        self._queues: Dict[Hashable, "OrderedDict[Hashable, Deque[object]]"] = {}
+        self._user_refill_time = user_burst / user_rate if user_rate else 0.0
+        self._swept_at = clock()
+
+    def _platform_bucket(self, platform: Hashable) -> TokenBucket:
+        if platform not in self._platform_buckets:
+            self._platform_buckets[platform] = TokenBucket(
+                self.rate, self.burst, self.clock
+            )
+        return self._platform_buckets[platform]
+
+    def _user_bucket(self, platform: Hashable, user: Hashable) -> TokenBucket:
+        key = (platform, user)
+        if key not in self._user_buckets:
+            self._user_buckets[key] = TokenBucket(
+                self.user_rate, self.user_burst, self.clock
+            )
+        return self._user_buckets[key]
+
+    def _user_wait_time(self, platform: Hashable, user: Optional[Hashable]) -> float:
+        if user is None:
+            return 0.0
+        return self._user_bucket(platform, user).wait_time()
+
+    def _drop_full_user_buckets(self):
+        """
+        Drop the user buckets refilled to capacity, at most once per refill
+        time of a user bucket
+        """
+        now = self.clock()
+        if now - self._swept_at < self._user_refill_time:
+            return
+        self._swept_at = now
+        full = [key for key, bucket in self._user_buckets.items() if bucket.is_full()]
+        for key in full:
+            del self._user_buckets[key]
+
+    def _try_admit(
+        self, platform: Hashable, user: Hashable, ticket: object
+    ) -> Optional[float]:
+        """
+        Admit `ticket` if it is at the head of the next user in round-robin
+        order that has tokens left. Returns 0 when admitted, None when another
+        request goes first, otherwise how long until a token is refilled.
+        """
+        queue = self._queues[platform]
+        platform_wait = self._platform_bucket(platform).wait_time()
+        wait = None
+        for queued_user, tickets in queue.items():
+            user_wait = self._user_wait_time(platform, queued_user)
+            if user_wait == 0 and platform_wait == 0:
+                if queued_user != user or tickets[0] is not ticket:
+                    return None
+                self._platform_bucket(platform).consume()
+                if user is not None:
+                    self._user_bucket(platform, user).consume()
+                tickets.popleft()
+                if tickets:
+                    queue.move_to_end(user)
+                else:
+                    del queue[user]
+                return 0
+            user_wait = max(user_wait, platform_wait)
+            wait = user_wait if wait is None else min(wait, user_wait)
+        return wait
+
+    def _enqueue(self, platform: Hashable, user: Hashable) -> object:
+        ticket = object()
+        self._queues.setdefault(platform, OrderedDict()).setdefault(
+            user, deque()
+        ).append(ticket)
+        self._drop_full_user_buckets()
+        return ticket
+
+    def _dequeue(self, platform: Hashable, user: Hashable, ticket: object):
+        queue = self._queues[platform]
+        if ticket in queue.get(user, ()):
+            queue[user].remove(ticket)
+            if not queue[user]:
+                del queue[user]
+
+    def acquire(
+        self,
+        platform: Hashable,
+        user: Optional[Hashable] = None,
+        timeout: Optional[float] = None,
+    ):
+        """
+        Block until a request for `user` on `platform` may be sent, raising a
+        TooManyRequestsException if that takes more than `timeout` seconds
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            ticket = self._enqueue(platform, user)
+            try:
+                while True:
+                    wait = self._try_admit(platform, user, ticket)
+                    if wait == 0:
+                        return
+                    self._condition.wait(_get_wait(platform, wait, deadline))
+            except BaseException:
+                self._dequeue(platform, user, ticket)
+                raise
+            finally:
+                self._condition.notify_all()
+
+    async def acquire_async(
+        self,
+        platform: Hashable,
+        user: Optional[Hashable] = None,
+        timeout: Optional[float] = None,
+    ):
+        """
+        Wait without blocking the event loop until a request for `user` on
+        `platform` may be sent, raising a TooManyRequestsException if that
+        takes more than `timeout` seconds. Requests are queued with the
+        blocking ones and admitted in the same round-robin order. Used by
+        async clients, which poll every `ADMISSION_POLL_INTERVAL` seconds
+        while another request goes first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            ticket = self._enqueue(platform, user)
+        try:
+            while True:
+                with self._condition:
+                    wait = self._try_admit(platform, user, ticket)
+                    if wait == 0:
+                        self._condition.notify_all()
+                        return
+                await asyncio.sleep(
+                    _get_wait(
+                        platform,
+                        ADMISSION_POLL_INTERVAL if wait is None else wait,
+                        deadline,
+                    )
+                )
+        except BaseException:
+            with self._condition:
+                self._dequeue(platform, user, ticket)
+                self._condition.notify_all()
+            raise
+
+    def pause(self, platform: Hashable, seconds: float):
+        """
+        Stop admitting requests to `platform` for `seconds`, e.g. after a 429
+        """
+        with self._condition:
+            self._platform_bucket(platform).pause(seconds)
+            self._condition.notify_all()
+
+
+def get_retry_delay(response: Response, attempt: int) -> float:
+    """
+    Seconds to wait before retrying a rate limited request. Honors the
+    `Retry-After` header up to CLIENT_RATE_LIMIT_MAX_DELAY seconds and
+    otherwise backs off exponentially, with jitter added in both cases so
+    concurrent retries do not arrive together.
+    """
+    backoff = settings.CLIENT_RATE_LIMIT_BACKOFF * (2**attempt)
+    try:
+        retry_after = float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return random.uniform(0, backoff)
+    retry_after = min(max(retry_after, 0.0), settings.CLIENT_RATE_LIMIT_MAX_DELAY)
+    return retry_after + random.uniform(0, settings.CLIENT_RATE_LIMIT_BACKOFF)
+
+
+def is_rate_limited(response: Response) -> bool:
+    """
+    Whether the platform rejected the request for exceeding its rate limit
+    """
+    return response.status_code == HTTP_429_TOO_MANY_REQUESTS
+
+
+_SCHEDULER: Optional[RequestScheduler] = None
+_SCHEDULER_LOCK = threading.Lock()
+
+
+def get_scheduler() -> RequestScheduler:
+    """
+    Return the request scheduler shared by every client in this process
+    """
+    global _SCHEDULER
+    if _SCHEDULER is None:
+        with _SCHEDULER_LOCK:
+            if _SCHEDULER is None:
+                _SCHEDULER = RequestScheduler(
+                    settings.CLIENT_RATE_LIMIT,
+                    settings.CLIENT_RATE_BURST,
+                    settings.CLIENT_USER_RATE_LIMIT,
+                    settings.CLIENT_USER_RATE_BURST,
+                )
+    return _SCHEDULER
@@ -0,0 +1,117 @@
+"""
+Registry of the platform clients.
+
+Clients are plugins: each platform maps to the dotted path of its client
+class, in the `CLIENT_PLUGINS` and `ASYNC_CLIENT_PLUGINS` settings or in the
+`playlistmover.clients` and `playlistmover.async_clients` entry point groups
+of installed packages:
+
+    [project.entry-points."playlistmover.clients"]
+    APPLE_MUSIC = "playlistmover_apple.clients:AppleMusicClient"
+
+A plugin is only imported the first time its platform is asked for, and its
+client is built once per process. Each request gets a shallow copy of that
+client from `for_request`, sharing its connection pools, caches and stores.
+"""
+import threading
+from importlib.metadata import entry_points
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from playlistmover.playlistmover.logic.clients_enums import ClientEnum
+from playlistmover.playlistmover.logic.exceptions import BadRequestException
+
+CLIENTS_GROUP = "playlistmover.clients"
+ASYNC_CLIENTS_GROUP = "playlistmover.async_clients"
+
+
+class ClientRegistry:
+    """
+    Per-process clients of the platforms, built from their plugins on first use
+    """
+
+    def __init__(self, plugins: Dict[str, str], group: str):
+        self.plugins = dict(plugins)
+        self.group = group
+        self._clients: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def get_client_class(self, platform: ClientEnum) -> type:
+        """
+        Import the client class of a platform, from the settings or else from
+        the entry points of installed packages
+        """
+        path = self.plugins.get(platform.value)
+        if path is not None:
+            return import_string(path)
+        for entry_point in entry_points(group=self.group):
+            if entry_point.name == platform.value:
+                return entry_point.load()
+        raise BadRequestException("`{}` not supported.".format(platform.value))
+
+    def get_shared_client(self, platform: ClientEnum) -> Any:
+        """
+        Client of a platform shared by every request of this process
+        """
+        client = self._clients.get(platform.value)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(platform.value)
+                if client is None:
+                    client = self._clients[platform.value] = self.get_client_class(
+                        platform
+                    )()
+        return client
+
+    def get_client(self, platform: ClientEnum) -> Any:
+        """
+        Client of a platform for a single request
+        """
+        return self.get_shared_client(platform).for_request()
+
+    def clear(self):
+        """
+        Drop the clients built so far, to be rebuilt from the current settings
+        """
+        with self._lock:
+            self._clients.clear()
+
+
+_registries: Dict[bool, ClientRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(asynchronous: bool = False) -> ClientRegistry:
+    """
+    Return the registry of the sync or async clients of this process
+    """
+    registry: Optional[ClientRegistry] = _registries.get(asynchronous)
+    if registry is None:
+        with _registries_lock:
+            registry = _registries.get(asynchronous)
+            if registry is None:
+                if asynchronous:
+                    registry = ClientRegistry(
+                        settings.ASYNC_CLIENT_PLUGINS, ASYNC_CLIENTS_GROUP
+                    )
+                else:
+                    registry = ClientRegistry(settings.CLIENT_PLUGINS, CLIENTS_GROUP)
+                _registries[asynchronous] = registry
+    return registry
+
+
+@receiver(setting_changed)
+def reset_registries(setting: str, **kwargs):
+    """
+    Rebuild the clients once settings they were built from are overridden,
+    as tests do
+    """
+    with _registries_lock:
+        if setting in ("CLIENT_PLUGINS", "ASYNC_CLIENT_PLUGINS"):
+            _registries.clear()
+        for registry in _registries.values():
+            registry.clear()
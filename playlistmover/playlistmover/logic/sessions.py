@@ -0,0 +1,75 @@
+import os
+import threading
+from typing import Dict, Optional
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_SESSION: Optional[requests.Session] = None
+_SESSION_PID: Optional[int] = None
+_SESSION_LOCK = threading.Lock()
+
+
+def build_session(
+    pool_size: Optional[int] = None,
+    max_retries: Optional[int] = None,
+    retry_backoff: Optional[float] = None,
+) -> requests.Session:
+    """
+    Build a keep-alive HTTP session with a bounded connection pool per host
+    and retries for idempotent requests that hit transient server errors
+    """
+    pool_size = pool_size or settings.HTTP_POOL_SIZE
+    retry = Retry(
+        total=settings.HTTP_MAX_RETRIES if max_retries is None else max_retries,
+        backoff_factor=(
+            settings.HTTP_RETRY_BACKOFF if retry_backoff is None else retry_backoff
+        ),
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Return the HTTP session shared by every client in this process.
+    A new session is built after a fork so workers never share sockets.
+    """
+    global _SESSION, _SESSION_PID
+    pid = os.getpid()
+    if _SESSION is None or _SESSION_PID != pid:
+        with _SESSION_LOCK:
+            if _SESSION is None or _SESSION_PID != pid:
+                _SESSION = build_session()
+                _SESSION_PID = pid
+    return _SESSION
+
+
+def get_connection_stats(session: requests.Session) -> Dict[str, int]:
+    """
+    Count the connections opened and requests sent through the session's
+    pools. Every request beyond the number of connections reused a socket.
+    """
+    stats = {"pools": 0, "connections": 0, "requests": 0}
+    for adapter in set(session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            try:
+                pool = pools[key]
+            except KeyError:
+                continue
+            stats["pools"] += 1
+            stats["connections"] += pool.num_connections
+            stats["requests"] += pool.num_requests
+    stats["reused"] = max(stats["requests"] - stats["connections"], 0)
+    return stats
@@ -0,0 +1,90 @@
+import dataclasses
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from playlistmover.playlistmover.logic.match_index import MatchIndex
+from playlistmover.playlistmover.models import SyncState
+
+
+@dataclasses.dataclass(frozen=True)
+class SyncedPlaylist:
+    """
+    Destination playlist a source playlist was synced to, with the source
+    snapshot it reflects and the destination track uri of each source track
+    that matched one, the snapshot being empty while some tracks did not
+    """
+
+    source_id: str
+    snapshot_id: str
+    playlist_id: str
+    tracks: Dict[str, str]
+
+
+def get_track_key(song: Dict[str, Any]) -> str:
+    """
+    Key identifying a source track across syncs: its uri, else its ISRC,
+    else its normalized title and artists
+    """
+    if song.get("uri"):
+        return song["uri"]
+    if song.get("isrc"):
+        return "isrc:{}".format(song["isrc"])
+    return "song:{}\0{}".format(*MatchIndex.get_song_key(song))
+
+
+def diff_tracks(
+    synced_tracks: Dict[str, str], songs: Sequence[Dict[str, Any]]
+) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """
+    Songs of a source playlist missing from the synced tracks, by key in
+    playlist order, and the keys of the synced tracks no longer in it
+    """
+    added: Dict[str, Dict[str, Any]] = {}
+    keys = set()
+    for song in songs:
+        key = get_track_key(song)
+        keys.add(key)
+        if key not in synced_tracks:
+            added.setdefault(key, song)
+    removed = [key for key in synced_tracks if key not in keys]
+    return added, removed
+
+
+class SyncStore:
+    """
+    Persistent state of the source playlists synced to each user of a
+    destination platform
+    """
+
+    def __init__(self, platform: str):
+        self.platform = platform
+
+    def get(self, user_id: str, source_id: str) -> Optional[SyncedPlaylist]:
+        """
+        Sync state of a source playlist, None when it was never synced
+        """
+        state = SyncState.objects.filter(
+            platform=self.platform, user_id=user_id, source_id=source_id
+        ).first()
+        if state is None:
+            return None
+        return SyncedPlaylist(
+            source_id=state.source_id,
+            snapshot_id=state.snapshot_id,
+            playlist_id=state.playlist_id,
+            tracks=state.tracks,
+        )
+
+    def save(self, user_id: str, synced_playlist: SyncedPlaylist):
+        """
+        Store the state of a source playlist once it has been synced
+        """
+        SyncState.objects.update_or_create(
+            platform=self.platform,
+            user_id=user_id,
+            source_id=synced_playlist.source_id,
+            defaults={
+                "snapshot_id": synced_playlist.snapshot_id,
+                "playlist_id": synced_playlist.playlist_id,
+                "tracks": synced_playlist.tracks,
+            },
+        )
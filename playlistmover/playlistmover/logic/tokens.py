@@ -0,0 +1,159 @@
+import base64
+import dataclasses
+import datetime
+import secrets
+from typing import Optional
+
+from cryptography.fernet import Fernet, InvalidToken
+from django.conf import settings
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+from playlistmover.playlistmover.logic.cache import TTLCache, get_cache
+from playlistmover.playlistmover.models import OAuthToken
+
+
+@dataclasses.dataclass(frozen=True)
+class Credentials:
+    """
+    Tokens and user id of an authenticated platform user
+    """
+
+    session_key: str
+    access_token: str
+    refresh_token: str
+    expires_at: datetime.datetime
+    user_id: str = ""
+    # end of the session itself, known once the credentials were stored
+    session_expires_at: Optional[datetime.datetime] = dataclasses.field(
+        default=None, compare=False
+    )
+
+    def expires_within(self, seconds: float) -> bool:
+        """
+        Whether the access token expires in less than `seconds` seconds
+        """
+        return self.expires_at - timezone.now() < datetime.timedelta(seconds=seconds)
+
+
+def get_session_cutoff() -> datetime.datetime:
+    """
+    Creation time before which sessions have expired
+    """
+    return timezone.now() - datetime.timedelta(seconds=settings.TOKEN_SESSION_TTL)
+
+
+def purge_expired_sessions() -> int:
+    """
+    Delete the stored credentials of expired sessions, returns how many
+    """
+    deleted, _ = OAuthToken.objects.filter(created_at__lt=get_session_cutoff()).delete()
+    return deleted
+
+
+def get_token_cipher() -> Fernet:
+    """
+    Cipher of the tokens at rest, keyed by the token encryption key or else
+    the secret key of the project
+    """
+    secret = settings.TOKEN_ENCRYPTION_KEY or settings.SECRET_KEY
+    key = salted_hmac(
+        "playlistmover.tokens", "fernet", secret=secret, algorithm="sha256"
+    ).digest()
+    return Fernet(base64.urlsafe_b64encode(key))
+
+
+class TokenStore:
+    """
+    Persistent store of the credentials of each session, encrypted at rest,
+    behind an in-process LRU so follow-up requests of a user skip the
+    database too. Sessions expire `TOKEN_SESSION_TTL` seconds after they
+    were created.
+    """
+
+    def __init__(self, platform: str, cache: Optional[TTLCache] = None):
+        self.platform = platform
+        self.cache = cache or get_cache(
+            "{}-tokens".format(platform),
+            settings.TOKEN_CACHE_SIZE,
+            settings.TOKEN_CACHE_TTL,
+        )
+        self.cipher = get_token_cipher()
+
+    @staticmethod
+    def new_session_key() -> str:
+        """
+        Random session key handed to the caller in place of the tokens
+        """
+        return secrets.token_urlsafe(32)
+
+    def get(self, session_key: str) -> Optional[Credentials]:
+        """
+        Credentials of a session, None for unknown or expired sessions
+        """
+        credentials = self.cache.get(session_key)
+        if credentials is not None:
+            if credentials.session_expires_at > timezone.now():
+                return credentials
+            self.cache.delete(session_key)
+        token = OAuthToken.objects.filter(
+            platform=self.platform,
+            session_key=session_key,
+            created_at__gte=get_session_cutoff(),
+        ).first()
+        if token is None:
+            return None
+        try:
+            credentials = Credentials(
+                session_key=token.session_key,
+                access_token=self.decrypt(token.access_token),
+                refresh_token=self.decrypt(token.refresh_token),
+                expires_at=token.expires_at,
+                user_id=token.user_id,
+                session_expires_at=self.get_session_expiry(token),
+            )
+        except InvalidToken:
+            # encrypted with a key that has been replaced since
+            return None
+        self.cache.set(session_key, credentials)
+        return credentials
+
+    def save(self, credentials: Credentials):
+        """
+        Store new or refreshed credentials of a session
+        """
+        token, _ = OAuthToken.objects.update_or_create(
+            platform=self.platform,
+            session_key=credentials.session_key,
+            defaults={
+                "access_token": self.encrypt(credentials.access_token),
+                "refresh_token": self.encrypt(credentials.refresh_token),
+                "expires_at": credentials.expires_at,
+                "user_id": credentials.user_id,
+            },
+        )
+        self.cache.set(
+            credentials.session_key,
+            dataclasses.replace(
+                credentials, session_expires_at=self.get_session_expiry(token)
+            ),
+        )
+
+    def encrypt(self, token: str) -> str:
+        """
+        Token as stored in the database
+        """
+        return self.cipher.encrypt(token.encode()).decode()
+
+    def decrypt(self, token: str) -> str:
+        """
+        Token as read from the database
+        """
+        return self.cipher.decrypt(token.encode()).decode()
+
+    @staticmethod
+    def get_session_expiry(token: OAuthToken) -> datetime.datetime:
+        """
+        End of the session of stored credentials
+        """
+        return token.created_at + datetime.timedelta(seconds=settings.TOKEN_SESSION_TTL)
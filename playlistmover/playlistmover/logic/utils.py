@@ -1,4 +1,11 @@
 import base64
+import re
+import unicodedata
+from typing import Iterable
+
+_BRACKETED = re.compile(r"[\(\[][^\)\]]*[\)\]]")
+_FEATURING = re.compile(r"\s(feat|ft|featuring)\.?\s.*$")
+_NON_WORD = re.compile(r"[\W_]+")
 
 
 def encode_string_base64(message: str) -> str:
@@ -9,3 +16,22 @@ def encode_string_base64(message: str) -> str:
     base64_bytes = base64.b64encode(message_bytes)
     base64_message = base64_bytes.decode("ascii")
     return base64_message
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize a song title or artist name for matching across platforms:
+    strip accents, bracketed notes and featured artists, case and punctuation
+    """
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = _BRACKETED.sub(" ", text.casefold())
+    text = _FEATURING.sub(" ", text)
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def normalize_artists(artists: Iterable[str]) -> str:
+    """
+    Normalize a list of artist names independently of their order
+    """
+    return "|".join(sorted(filter(None, map(normalize_text, artists))))
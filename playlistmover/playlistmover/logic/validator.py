@@ -1,3 +1,4 @@
+import asyncio
 import functools
 from typing import Any, Dict, List
 
@@ -6,6 +7,22 @@ from playlistmover.playlistmover.logic.exceptions import (
     get_exception_response,
 )
 
+# the session of an earlier response, which authenticates follow-up requests
+# of the account in place of an authorization code
+SESSION_HEADER = "X-Playlistmover-Session"
+
+
+def get_auth_context(request, context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Context authenticating the request: its fields with the session of the
+    session header, any session sent along with them being ignored
+    """
+    auth_context = {key: value for key, value in context.items() if key != "session"}
+    session_key = request.headers.get(SESSION_HEADER)
+    if session_key:
+        auth_context["session"] = session_key
+    return auth_context
+
 
 def is_valid_request(request_name: str, request) -> str:
     """Validates the request passed in for the given request_name"""
@@ -21,30 +38,56 @@ def is_valid_request(request_name: str, request) -> str:
         for field in fields:
             check_field(object, field)
 
+    def check_credentials(object: Dict[str, Any]):
+        if not request.headers.get(SESSION_HEADER):
+            check_fields(object, "code", "state")
+
     if request_name == "getPlaylists":
-        check_fields(query_params, "platform", "code", "state", "redirect_uri")
+        check_field(query_params, "platform")
+        check_credentials(query_params)
+        check_field(query_params, "redirect_uri")
     elif request_name == "postPlaylists":
         check_fields(data, "playlists", "context")
-        check_field(data.get("context", {}), "platform")
+        context = data.get("context", {})
+        check_field(context, "platform")
+        check_credentials(context)
+        check_field(context, "redirect_uri")
     elif request_name == "getAuth":
         check_fields(query_params, "platform", "redirect_uri")
 
     return ", ".join(invalid_fields)
 
 
+def get_invalid_request_response(request_name: str, request):
+    """Returns the error response for an invalid request, None if it is valid"""
+    invalid_fields: str = is_valid_request(request_name, request)
+    if invalid_fields:
+        return get_exception_response(
+            BadRequestException("`{}` in request is invalid.".format(invalid_fields))
+        )
+    return None
+
+
 def request_validator(request_name: str):
     """Wrapper around view handlers to validate incoming requests"""
 
     def request_validator_wrapper(view_handler):
+        if asyncio.iscoroutinefunction(view_handler):
+
+            @functools.wraps(view_handler)
+            async def async_wrapper(self, request, *args, **kwargs):
+                response = get_invalid_request_response(request_name, request)
+                if response is not None:
+                    return response
+                return await view_handler(self, request, *args, **kwargs)
+
+            return async_wrapper
+
         @functools.wraps(view_handler)
         def wrapper(self, request, *args, **kwargs):
-            invalid_fields: str = is_valid_request(request_name, request)
-            if invalid_fields:
-                return get_exception_response(
-                    BadRequestException(
-                        "`{}` in request is invalid.".format(invalid_fields)
-                    )
-                )
+            response = get_invalid_request_response(request_name, request)
+            if response is not None:
+                return response
             return view_handler(self, request, *args, **kwargs)
 
         return wrapper
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from playlistmover.playlistmover.logic.tokens import purge_expired_sessions
+
+
+class Command(BaseCommand):
+    """
+    Delete the stored credentials of expired sessions
+    """
+
+    help = "Delete the stored OAuth tokens of expired sessions"
+
+    def handle(self, *args, **options):
+        self.stdout.write("Purged {} sessions.".format(purge_expired_sessions()))
@@ -0,0 +1,50 @@
+import multiprocessing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from playlistmover.playlistmover.logic.jobs import work
+
+
+class Command(BaseCommand):
+    """
+    Start the worker processes and wait for them until interrupted
+    """
+
+    help = "Run a pool of worker processes creating the queued migration jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=settings.JOB_WORKERS,
+            help="Number of worker processes",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.JOB_POLL_INTERVAL,
+            help="Seconds to wait before polling an empty queue again",
+        )
+
+    def handle(self, *args, **options):
+        # forked workers must open their own database connections
+        connections.close_all()
+        # workers are forked to inherit the app registry loaded by this command
+        context = multiprocessing.get_context("fork")
+        processes = [
+            context.Process(target=work, args=(options["poll_interval"],), daemon=True)
+            for _ in range(options["processes"])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(
+            "Started {} workers, press CTRL-C to stop.".format(len(processes))
+        )
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
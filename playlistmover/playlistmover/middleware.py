@@ -0,0 +1,39 @@
+import asyncio
+
+from django.utils.decorators import sync_and_async_middleware
+
+from playlistmover.playlistmover.logic.metrics import (
+    is_metrics_client,
+    track_request,
+)
+
+
+@sync_and_async_middleware
+def server_timing_middleware(get_response):
+    """
+    Add a `Server-Timing` header with the time spent on each platform endpoint
+    while serving the request, for the clients allowed to see the metrics
+    only. Streamed responses only account for the requests made before their
+    first chunk.
+    """
+    if asyncio.iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            if not is_metrics_client(request):
+                return await get_response(request)
+            with track_request() as timings:
+                response = await get_response(request)
+                response["Server-Timing"] = timings.get_server_timing()
+            return response
+
+    else:
+
+        def middleware(request):
+            if not is_metrics_client(request):
+                return get_response(request)
+            with track_request() as timings:
+                response = get_response(request)
+                response["Server-Timing"] = timings.get_server_timing()
+            return response
+
+    return middleware
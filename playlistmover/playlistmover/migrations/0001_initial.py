@@ -0,0 +1,48 @@
+# Generated by Django 4.1 on 2026-10-18 15:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="TrackMatch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("platform", models.CharField(max_length=32)),
+                ("title_key", models.CharField(max_length=200)),
+                ("artists_key", models.CharField(max_length=400)),
+                ("isrc", models.CharField(blank=True, default="", max_length=12)),
+                ("track_uri", models.CharField(max_length=200)),
+                ("hits", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="trackmatch",
+            index=models.Index(
+                fields=["platform", "isrc"], name="playlistmov_platfor_99fea8_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="trackmatch",
+            constraint=models.UniqueConstraint(
+                fields=("platform", "title_key", "artists_key"),
+                name="unique_track_match_song",
+            ),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.1 on 2026-10-18 15:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("playlistmover", "0002_migrationjob_migrationjobplaylist_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OAuthToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("platform", models.CharField(max_length=32)),
+                ("session_key", models.CharField(max_length=64)),
+                ("user_id", models.CharField(blank=True, default="", max_length=200)),
+                ("access_token", models.TextField()),
+                ("refresh_token", models.TextField()),
+                ("expires_at", models.DateTimeField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="oauthtoken",
+            constraint=models.UniqueConstraint(
+                fields=("platform", "session_key"), name="unique_oauth_token_session"
+            ),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.1 on 2026-10-18 15:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("playlistmover", "0003_oauthtoken"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SyncState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("platform", models.CharField(max_length=32)),
+                ("user_id", models.CharField(max_length=200)),
+                ("source_id", models.CharField(max_length=200)),
+                (
+                    "snapshot_id",
+                    models.CharField(blank=True, default="", max_length=200),
+                ),
+                ("playlist_id", models.CharField(max_length=200)),
+                ("tracks", models.JSONField(default=dict)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="migrationjob",
+            name="mode",
+            field=models.CharField(
+                choices=[("copy", "Copy"), ("sync", "Sync")],
+                default="copy",
+                max_length=16,
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="syncstate",
+            constraint=models.UniqueConstraint(
+                fields=("platform", "user_id", "source_id"),
+                name="unique_sync_state_source",
+            ),
+        ),
+    ]
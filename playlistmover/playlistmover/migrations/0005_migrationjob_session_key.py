@@ -0,0 +1,38 @@
+# Generated by Django 4.1 on 2026-10-18 19:02
+
+from django.db import migrations, models
+
+
+def copy_sessions(apps, schema_editor):
+    """
+    Keep the session of the jobs queued with one, and fail the unfinished jobs
+    that only carry an authorization code, which has expired by now
+    """
+    MigrationJob = apps.get_model("playlistmover", "MigrationJob")
+    for job in MigrationJob.objects.all():
+        job.session_key = job.context.get("session") or ""
+        if not job.session_key and job.status in ("queued", "running"):
+            job.status = "failed"
+            job.error = "Job was queued without a session, queue it again."
+        job.save(update_fields=["session_key", "status", "error"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("playlistmover", "0004_migrationjob_mode_syncstate"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="migrationjob",
+            name="session_key",
+            field=models.CharField(default="", max_length=64),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_sessions, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="migrationjob",
+            name="context",
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1 on 2026-10-18 16:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("playlistmover", "0005_migrationjob_session_key"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="migrationjob",
+            name="heartbeat_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.1 on 2026-10-18 20:14
+
+import uuid
+
+from django.db import migrations, models
+
+
+def set_public_ids(apps, schema_editor):
+    """
+    Give every existing job its own public id
+    """
+    MigrationJob = apps.get_model("playlistmover", "MigrationJob")
+    for job in MigrationJob.objects.all():
+        job.public_id = uuid.uuid4()
+        job.save(update_fields=["public_id"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("playlistmover", "0006_migrationjob_heartbeat_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="migrationjob",
+            name="public_id",
+            field=models.UUIDField(null=True, editable=False),
+        ),
+        migrations.RunPython(set_public_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="migrationjob",
+            name="public_id",
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.1 on 2026-10-18 20:41
+
+from django.db import migrations, models
+
+
+def delete_plaintext_tokens(apps, schema_editor):
+    """
+    Tokens are encrypted from now on, so the ones stored in plaintext are
+    dropped and their sessions authenticate again
+    """
+    apps.get_model("playlistmover", "OAuthToken").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("playlistmover", "0007_migrationjob_public_id"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_plaintext_tokens, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="oauthtoken",
+            index=models.Index(
+                fields=["created_at"], name="playlistmov_created_d874c1_idx"
+            ),
+        ),
+    ]
@@ -1,14 +1,17 @@
 """
 State models for objects used by this service
 """
+import uuid
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Sequence
 
+from django.db import models
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class Image:
     """
-    Image object
+    Image object, shared by every song of an album
     """
 
     url: str
@@ -16,18 +19,20 @@ class Image:
     width: Optional[int]
 
 
-@dataclass
+@dataclass(slots=True)
 class Song:
     """
     Song Object
     """
 
     title: str
-    artists: list[str]
-    images: list[Image]
+    artists: Sequence[str]
+    images: Sequence[Image]
+    uri: Optional[str] = None
+    isrc: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Playlist:
     """
     Playlist Object
@@ -35,4 +40,185 @@ class Playlist:
 
     title: str
     songs: list[Song]
-    images: list[Image]
+    images: Sequence[Image]
+    id: Optional[str] = None
+    snapshot_id: Optional[str] = None
+
+
+@dataclass(slots=True)
+class PlaylistSummary:
+    """
+    Playlist Object without its songs
+    """
+
+    title: str
+    tracks: int
+    images: Sequence[Image]
+
+
+class TrackMatch(models.Model):
+    """
+    Track of a destination platform that a song was resolved to, looked up by
+    ISRC or by the song's normalized title and artists
+    """
+
+    platform = models.CharField(max_length=32)
+    title_key = models.CharField(max_length=200)
+    artists_key = models.CharField(max_length=400)
+    isrc = models.CharField(max_length=12, blank=True, default="")
+    track_uri = models.CharField(max_length=200)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        """
+        One match per song and platform, looked up by ISRC too
+        """
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=["platform", "title_key", "artists_key"],
+                name="unique_track_match_song",
+            )
+        ]
+        indexes = [models.Index(fields=["platform", "isrc"])]
+
+
+class MigrationJob(models.Model):
+    """
+    Playlists queued to be created on a platform by a background worker
+    """
+
+    COPY = "copy"
+    SYNC = "sync"
+    MODE_CHOICES = [(COPY, "Copy"), (SYNC, "Sync")]
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    # handed to the caller in place of the sequential primary key, so jobs of
+    # other users cannot be found by counting
+    public_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    platform = models.CharField(max_length=32)
+    # the credentials of the session are resolved when the job is queued, so
+    # no authorization code ever waits in the queue
+    session_key = models.CharField(max_length=64)
+    mode = models.CharField(max_length=16, choices=MODE_CHOICES, default=COPY)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    worker = models.CharField(max_length=64, blank=True, default="")
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # renewed by the worker running the job, which other workers take back
+    # once it is older than the lease
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        """
+        Workers poll the queued jobs in creation order
+        """
+
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+
+class MigrationJobPlaylist(models.Model):
+    """
+    A playlist of a migration job and the outcome of creating it
+    """
+
+    job = models.ForeignKey(
+        MigrationJob, related_name="playlists", on_delete=models.CASCADE
+    )
+    position = models.PositiveIntegerField()
+    title = models.CharField(max_length=200)
+    data = models.JSONField()
+    tracks = models.PositiveIntegerField(default=0)
+    status = models.CharField(
+        max_length=16,
+        choices=MigrationJob.STATUS_CHOICES,
+        default=MigrationJob.QUEUED,
+    )
+    report = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        """
+        Playlists are listed, and unique, by their position in the job
+        """
+
+        ordering = ["position"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["job", "position"], name="unique_migration_job_position"
+            )
+        ]
+
+
+class OAuthToken(models.Model):
+    """
+    Credentials of a user authenticated with a platform, looked up by the
+    opaque session key handed to the caller
+    """
+
+    platform = models.CharField(max_length=32)
+    session_key = models.CharField(max_length=64)
+    user_id = models.CharField(max_length=200, blank=True, default="")
+    # both tokens are encrypted by the token store
+    access_token = models.TextField()
+    refresh_token = models.TextField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        """
+        One set of credentials per session and platform, purged by creation time
+        """
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=["platform", "session_key"], name="unique_oauth_token_session"
+            )
+        ]
+        indexes = [models.Index(fields=["created_at"])]
+
+
+class SyncState(models.Model):
+    """
+    Source playlist synced to a playlist of a destination platform user: the
+    source snapshot last synced, empty while some source tracks have no match,
+    and the destination track written for each matched source track
+    """
+
+    platform = models.CharField(max_length=32)
+    user_id = models.CharField(max_length=200)
+    source_id = models.CharField(max_length=200)
+    snapshot_id = models.CharField(max_length=200, blank=True, default="")
+    playlist_id = models.CharField(max_length=200)
+    tracks = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        """
+        One sync state per source playlist of a user
+        """
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=["platform", "user_id", "source_id"],
+                name="unique_sync_state_source",
+            )
+        ]
@@ -0,0 +1,211 @@
+"""
+Normalized layout of the playlists of a request or response.
+
+The songs of a large library repeat the same artist names and album images
+over and over. In the normalized layout every artist and image is listed
+once, in the top-level `artists` and `images` tables, and songs and
+playlists refer to them by their index in those tables:
+
+    {
+        "layout": "normalized",
+        "artists": ["Artist"],
+        "images": [{"url": "https://...", "height": 64, "width": 64}],
+        "playlists": [
+            {
+                "title": "mix",
+                "songs": [{"title": "song", "artists": [0], "images": [0], ...}],
+                "images": [0],
+            }
+        ],
+    }
+"""
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from playlistmover.playlistmover.logic.exceptions import BadRequestException
+from playlistmover.playlistmover.models import PlaylistSummary
+
+NESTED_LAYOUT = "nested"
+NORMALIZED_LAYOUT = "normalized"
+LAYOUTS = (NESTED_LAYOUT, NORMALIZED_LAYOUT)
+
+
+def get_layout(layout: Optional[str]) -> str:
+    """
+    Layout asked for by a request, nested unless it says otherwise
+    """
+    if layout is None:
+        return NESTED_LAYOUT
+    if layout not in LAYOUTS:
+        raise BadRequestException(
+            "`layout` must be one of {}.".format(", ".join(LAYOUTS))
+        )
+    return layout
+
+
+def _get_image_fields(image: Any) -> Tuple[Any, Any, Any]:
+    if isinstance(image, Mapping):
+        return image.get("url"), image.get("height"), image.get("width")
+    return image.url, image.height, image.width
+
+
+def _encode_image(fields: Tuple[Any, Any, Any]) -> Dict[str, Any]:
+    url, height, width = fields
+    return {"url": url, "height": height, "width": width}
+
+
+class Normalizer:
+    """
+    Encodes playlists while building the artist and image tables they refer
+    to. The artists and images of a song are shared with the other songs of
+    the library by the client's interner, so each shared sequence is only
+    looked up once.
+    """
+
+    def __init__(self):
+        self.artists: List[str] = []
+        self.images: List[Dict[str, Any]] = []
+        self._artist_indexes: Dict[Hashable, int] = {}
+        self._image_indexes: Dict[Hashable, int] = {}
+        # the sequences are kept alive alongside, so their ids are not reused
+        self._sequences: Dict[int, Tuple[Iterable, List[int]]] = {}
+
+    def _index(
+        self,
+        items: Iterable,
+        indexes: Dict[Hashable, int],
+        table: List[Any],
+        get_key: Callable[[Any], Hashable],
+        encode: Callable[[Any], Any],
+    ) -> List[int]:
+        """
+        Indexes of the items in the table, adding the items it lacks
+        """
+        known = self._sequences.get(id(items))
+        if known is not None:
+            return known[1]
+        result = []
+        for item in items:
+            key = get_key(item)
+            index = indexes.get(key)
+            if index is None:
+                index = indexes[key] = len(table)
+                table.append(encode(key))
+            result.append(index)
+        self._sequences[id(items)] = (items, result)
+        return result
+
+    def index_artists(self, artists: Iterable[str]) -> List[int]:
+        """
+        Indexes of the artist names in the artist table
+        """
+        return self._index(artists, self._artist_indexes, self.artists, str, str)
+
+    def index_images(self, images: Iterable[Any]) -> List[int]:
+        """
+        Indexes of the images in the image table
+        """
+        return self._index(
+            images, self._image_indexes, self.images, _get_image_fields, _encode_image
+        )
+
+    def encode_song(self, song: Any) -> Dict[str, Any]:
+        """
+        Encode a song like `SongSerializer`, with indexes for artists and images
+        """
+        return {
+            "title": song.title,
+            "artists": self.index_artists(song.artists),
+            "images": self.index_images(song.images),
+            "uri": song.uri,
+            "isrc": song.isrc,
+        }
+
+    def encode_playlist(self, playlist: Any) -> Dict[str, Any]:
+        """
+        Encode a playlist or playlist summary like its serializer, with
+        indexes for artists and images
+        """
+        if isinstance(playlist, PlaylistSummary):
+            return {
+                "title": playlist.title,
+                "tracks": playlist.tracks,
+                "images": self.index_images(playlist.images),
+            }
+        return {
+            "title": playlist.title,
+            "songs": [self.encode_song(song) for song in playlist.songs],
+            "images": self.index_images(playlist.images),
+            "id": playlist.id,
+            "snapshot_id": playlist.snapshot_id,
+        }
+
+
+def normalize_playlists(playlists: Iterable[Any]) -> Dict[str, Any]:
+    """
+    Playlists in the normalized layout, with their artist and image tables
+    """
+    normalizer = Normalizer()
+    encoded = [normalizer.encode_playlist(playlist) for playlist in playlists]
+    return {
+        "layout": NORMALIZED_LAYOUT,
+        "artists": normalizer.artists,
+        "images": normalizer.images,
+        "playlists": encoded,
+    }
+
+
+def _invalid() -> BadRequestException:
+    return BadRequestException("`playlists` object in request is invalid")
+
+
+def _resolve(table: List[Any], indexes: Any) -> List[Any]:
+    if not isinstance(indexes, list):
+        raise _invalid()
+    resolved = []
+    for index in indexes:
+        # bools are ints and negative indexes would wrap around the table
+        if (
+            not isinstance(index, int)
+            or isinstance(index, bool)
+            or not 0 <= index < len(table)
+        ):
+            raise _invalid()
+        resolved.append(table[index])
+    return resolved
+
+
+def _resolve_fields(data: Any, tables: Dict[str, List[Any]]) -> Dict[str, Any]:
+    """
+    Copy of an object with the indexes of its fields replaced by the table
+    entries. Missing fields are left for the serializer to report.
+    """
+    if not isinstance(data, dict):
+        raise _invalid()
+    resolved = dict(data)
+    for field, table in tables.items():
+        if field in data:
+            resolved[field] = _resolve(table, data[field])
+    return resolved
+
+
+def denormalize_playlists(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Nested playlists data of a request in the normalized layout, ready to be
+    validated by `PlaylistSerializer`
+    """
+    artists, images = data.get("artists", []), data.get("images", [])
+    playlists = data.get("playlists")
+    if not all(isinstance(value, list) for value in (artists, images, playlists)):
+        raise _invalid()
+    song_tables = {"artists": artists, "images": images}
+    playlist_tables = {"images": images}
+    denormalized = []
+    for playlist in playlists:
+        playlist = _resolve_fields(playlist, playlist_tables)
+        if isinstance(playlist.get("songs"), list):
+            playlist["songs"] = [
+                _resolve_fields(song, song_tables) for song in playlist["songs"]
+            ]
+        denormalized.append(playlist)
+    return denormalized
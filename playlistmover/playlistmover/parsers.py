@@ -0,0 +1,17 @@
+import msgpack
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class MessagePackParser(BaseParser):  # pylint: disable=too-few-public-methods
+    """
+    Parser for MessagePack request bodies
+    """
+
+    media_type = "application/msgpack"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, TypeError) as exception:
+            raise ParseError("MessagePack parse error - {}".format(exception))
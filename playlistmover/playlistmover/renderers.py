@@ -0,0 +1,43 @@
+from typing import Any
+
+import msgpack
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renderer for newline delimited JSON, one JSON document per line
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+        items = data if isinstance(data, list) else [data]
+        return b"".join(self.render_line(item) for item in items)
+
+    @staticmethod
+    def render_line(item: Any) -> bytes:
+        """
+        Render a single item as one line of JSON
+        """
+        return JSONRenderer().render(item) + b"\n"
+
+
+class MessagePackRenderer(BaseRenderer):  # pylint: disable=too-few-public-methods
+    """
+    Renderer for MessagePack, a denser binary encoding of the JSON data model
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+        if data is None:
+            return b""
+        # dates, decimals and the like are converted like in JSON responses
+        return msgpack.packb(data, default=JSONEncoder().default)
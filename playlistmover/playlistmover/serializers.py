@@ -20,6 +20,8 @@ class SongSerializer(serializers.Serializer):
     title = serializers.CharField(max_length=200)
     artists = serializers.ListField(child=serializers.CharField(max_length=200))
     images = ImageSerializer(many=True)
+    uri = serializers.CharField(max_length=200, required=False, allow_null=True)
+    isrc = serializers.CharField(max_length=12, required=False, allow_null=True)
 
 
 class PlaylistSerializer(serializers.Serializer):
@@ -30,3 +32,15 @@ class PlaylistSerializer(serializers.Serializer):
     title = serializers.CharField(max_length=200)
     songs = SongSerializer(many=True)
     images = ImageSerializer(many=True)
+    id = serializers.CharField(max_length=200, required=False, allow_null=True)
+    snapshot_id = serializers.CharField(max_length=200, required=False, allow_null=True)
+
+
+class PlaylistSummarySerializer(serializers.Serializer):
+    """
+    Serializer class for the PlaylistSummary object
+    """
+
+    title = serializers.CharField(max_length=200)
+    tracks = serializers.IntegerField(default=0)
+    images = ImageSerializer(many=True)
@@ -0,0 +1,138 @@
+"""
+    Test module for the async Playlist API served under ASGI
+"""
+import json
+from unittest import mock
+
+import msgpack
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncRequestFactory
+
+from playlistmover.playlistmover.logic.async_clients import (
+    AsyncClient,
+    build_http_client,
+)
+from playlistmover.playlistmover.middleware import server_timing_middleware
+from playlistmover.playlistmover.tests.conftest import CODE, CONTEXT, STATE
+from playlistmover.playlistmover.tests.fake_spotify import FakeSpotify
+from playlistmover.playlistmover.views import AsyncPlaylistApiView
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_get_playlists_fetches_concurrently():
+    """Playlists are fetched concurrently and returned in listing order"""
+    fake_spotify = FakeSpotify(playlists=6, tracks=5, page_size=2, latency=0.01)
+    request = AsyncRequestFactory().get("/api/playlists", data=CONTEXT)
+
+    async def get_playlists():
+        http_client = build_http_client(fake_spotify.transport())
+        with mock.patch.object(AsyncClient, "http_client", http_client):
+            return await AsyncPlaylistApiView.as_view()(request)
+
+    response = async_to_sync(get_playlists)()
+
+    playlists = json.loads(response.content)["playlists"]
+    assert response.status_code == 200
+    assert json.loads(response.content)["session"]
+    assert [playlist["title"] for playlist in playlists] == [
+        "Playlist {}".format(index) for index in range(6)
+    ]
+    assert [song["title"] for song in playlists[0]["songs"]] == [
+        "Song 0.{}".format(index) for index in range(5)
+    ]
+    assert fake_spotify.peak_in_flight > 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_get_playlists_reports_upstream_timings():
+    """Platform calls of async views are timed in Server-Timing"""
+    fake_spotify = FakeSpotify(playlists=2, tracks=2)
+    request = AsyncRequestFactory().get("/api/playlists", data=CONTEXT)
+
+    async def get_playlists():
+        http_client = build_http_client(fake_spotify.transport())
+        with mock.patch.object(AsyncClient, "http_client", http_client):
+            view = server_timing_middleware(AsyncPlaylistApiView.as_view())
+            return await view(request)
+
+    response = async_to_sync(get_playlists)()
+
+    assert response.status_code == 200
+    assert 'desc="GET /v1/playlists/{id} x2"' in response["Server-Timing"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_get_playlists_answers_matching_etag_with_304():
+    """A matching `If-None-Match` skips fetching the listed playlists"""
+    fake_spotify = FakeSpotify(playlists=3, tracks=5, page_size=2)
+
+    async def get_playlists(request):
+        http_client = build_http_client(fake_spotify.transport())
+        with mock.patch.object(AsyncClient, "http_client", http_client):
+            return await AsyncPlaylistApiView.as_view()(request)
+
+    first = async_to_sync(get_playlists)(
+        AsyncRequestFactory().get("/api/playlists", data=CONTEXT)
+    )
+    query_params = {"platform": "SPOTIFY", "redirect_uri": "http://localhost"}
+    request = AsyncRequestFactory().get(
+        "/api/playlists",
+        data=query_params,
+        IF_NONE_MATCH="W/{}".format(first["ETag"]),
+        X_PLAYLISTMOVER_SESSION=json.loads(first.content)["session"],
+    )
+
+    response = async_to_sync(get_playlists)(request)
+
+    assert response.status_code == 304
+    assert response["ETag"] == first["ETag"]
+    assert fake_spotify.calls["GET v1/playlists/{id}"] == 3
+
+
+def test_async_get_playlists_rejects_invalid_state():
+    """Authorization errors are rendered as JSON error responses"""
+    query_params = {
+        "platform": "SPOTIFY",
+        "code": CODE,
+        "state": "invalid",
+        "redirect_uri": "http://localhost",
+    }
+    request = AsyncRequestFactory().get("/api/playlists", data=query_params)
+
+    response = async_to_sync(AsyncPlaylistApiView.as_view())(request)
+
+    assert response.status_code == 401
+    assert json.loads(response.content) == {
+        "success": False,
+        "error": "User is unauthorized.",
+    }
+
+
+def test_async_responses_negotiate_messagepack():
+    """Error responses are rendered as MessagePack when it is accepted"""
+    query_params = {"platform": "SPOTIFY", "state": STATE}
+    request = AsyncRequestFactory().get(
+        "/api/playlists", data=query_params, ACCEPT="application/msgpack"
+    )
+
+    response = async_to_sync(AsyncPlaylistApiView.as_view())(request)
+
+    assert response.status_code == 400
+    assert response["Content-Type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content) == {
+        "success": False,
+        "error": "`code, redirect_uri` in request is invalid.",
+    }
+
+
+def test_async_post_playlists_rejects_malformed_body():
+    """Bodies that cannot be parsed are bad requests, like with DRF views"""
+    request = AsyncRequestFactory().post(
+        "/api/playlists", data="{not json", content_type="application/json"
+    )
+
+    response = async_to_sync(AsyncPlaylistApiView.as_view())(request)
+
+    assert response.status_code == 400
+    assert json.loads(response.content)["detail"].startswith("JSON parse error")
@@ -1,92 +1,392 @@
 """
     Test module for Playlist API
 """
+import gzip
+import json
+import uuid
+from unittest import mock
+
+import msgpack
 import pytest
 from django.urls import reverse
 from rest_framework import status
 
-from playlistmover.playlistmover.tests.component_tests.conftest import CODE, STATE
-
-
-def test_blank():
-    """No-op test"""
-    assert True
-
-
-# @pytest.mark.parametrize(
-#     "missing_params,query_params",
-#     (
-#         ("platform", {"code": "dummycode", "state": "dummystate"}),
-#         ("platform, code", {"state": "dummystate"}),
-#         ("platform, code, state", {}),
-#     ),
-# )
-# def test_get_playlist_without_platform(api_client, missing_params, query_params):
-#     """Test error response when there are query parameters missing"""
-#     url = reverse("playlists")
-#     expected_response = {
-#         "success": False,
-#         "error": "`{}` in request is invalid.".format(missing_params),
-#     }
-
-#     response = api_client.get(url, data=query_params, format="json")
-
-#     assert response.status_code == status.HTTP_400_BAD_REQUEST
-#     assert response.json() == expected_response
-
-
-# def test_get_playlist_with_invalid_platform(api_client):
-#     """Test error response when unsupported platform is given"""
-#     platform = "NonesensePlatform"
-#     query_params = {"platform": platform, "code": "DummyCode", "state": "DummyState"}
-#     url = reverse("playlists")
-#     expected_response = {
-#         "success": False,
-#         "error": "`{}` not supported.".format(platform),
-#     }
-
-#     response = api_client.get(url, data=query_params, format="json")
-
-#     assert response.status_code == status.HTTP_400_BAD_REQUEST
-#     assert response.json() == expected_response
-
-
-# @pytest.mark.parametrize(
-#     "query_code,query_state",
-#     (
-#         ("DummyCode", "Dummystate"),
-#         ("DummyCode", "123456789abcdefg"),
-#     ),
-# )
-# def test_get_playlist_with_invalid_auth(
-#     api_client, mock_requests_module, query_code, query_state
-# ):
-#     """Test error response when auth is invalid"""
-#     query_params = {"platform": "SPOTIFY", "code": query_code, "state": query_state}
-#     url = reverse("playlists")
-#     expected_response = {
-#         "success": False,
-#         "error": "User is unauthorized.",
-#     }
-
-#     with mock_requests_module:
-#         response = api_client.get(url, data=query_params, format="json")
-
-#     assert response.status_code == status.HTTP_401_UNAUTHORIZED
-#     assert response.json() == expected_response
-
-
-# def test_get_playlist_passes(api_client, mock_requests_module):
-#     """Test successful response when playlists API is called correctly."""
-#     query_params = {"platform": "SPOTIFY", "code": CODE, "state": STATE}
-#     url = reverse("playlists")
-#     expected_response = {
-#         "success": True,
-#         "playlists": [],
-#     }
-
-#     with mock_requests_module:
-#         response = api_client.get(url, data=query_params, format="json")
-
-#     assert response.status_code == status.HTTP_200_OK
-#     assert response.json() == expected_response
+from playlistmover.playlistmover.logic.clients import SpotifyClient
+from playlistmover.playlistmover.logic.tokens import Credentials
+from playlistmover.playlistmover.models import Playlist, Song
+from playlistmover.playlistmover.tests.conftest import CONTEXT
+
+
+@pytest.mark.parametrize(
+    "missing_params,query_params",
+    (
+        ("platform, redirect_uri", {"code": "dummycode", "state": "dummystate"}),
+        ("platform, code, redirect_uri", {"state": "dummystate"}),
+        ("platform, code, state, redirect_uri", {}),
+    ),
+)
+def test_get_playlist_without_platform(api_client, missing_params, query_params):
+    """Test error response when there are query parameters missing"""
+    url = reverse("playlists")
+    expected_response = {
+        "success": False,
+        "error": "`{}` in request is invalid.".format(missing_params),
+    }
+
+    response = api_client.get(url, data=query_params, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == expected_response
+
+
+def test_get_playlist_with_invalid_platform(api_client):
+    """Test error response when unsupported platform is given"""
+    platform = "NonesensePlatform"
+    query_params = dict(CONTEXT, platform=platform, code="DummyCode")
+    url = reverse("playlists")
+    expected_response = {
+        "success": False,
+        "error": "`{}` not supported.".format(platform),
+    }
+
+    response = api_client.get(url, data=query_params, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == expected_response
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "query_code,query_state",
+    (
+        ("DummyCode", "Dummystate"),
+        ("DummyCode", "123456789abcdefg"),
+    ),
+)
+def test_get_playlist_with_invalid_auth(
+    api_client, fake_spotify, query_code, query_state
+):
+    """Test error response when auth is invalid"""
+    query_params = dict(CONTEXT, code=query_code, state=query_state)
+    url = reverse("playlists")
+    expected_response = {
+        "success": False,
+        "error": "User is unauthorized.",
+    }
+
+    response = api_client.get(url, data=query_params, format="json")
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response.json() == expected_response
+
+
+@pytest.mark.django_db(transaction=True)
+def test_get_playlist_passes(api_client, fake_spotify):
+    """Test successful response when playlists API is called correctly."""
+    url = reverse("playlists")
+
+    response = api_client.get(url, data=CONTEXT, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    body = response.json()
+    assert body["success"] and body["session"]
+    assert [playlist["title"] for playlist in body["playlists"]] == [
+        "Playlist 0",
+        "Playlist 1",
+        "Playlist 2",
+    ]
+    assert [song["title"] for song in body["playlists"][0]["songs"]] == [
+        "Song 0.{}".format(index) for index in range(5)
+    ]
+    assert fake_spotify.calls["POST api/token"] == 1
+    assert response["X-Playlistmover-Tracks"] == "total=15, unique=15, dedup-ratio=0.0"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_get_playlist_accepts_session_only_in_header(api_client, fake_spotify):
+    """Follow-up requests authenticate with the session header"""
+    url = reverse("playlists")
+    query_params = {"platform": "SPOTIFY", "redirect_uri": "http://localhost"}
+    session = api_client.get(url, data=CONTEXT).json()["session"]
+
+    in_query = api_client.get(url, data={**query_params, "session": session})
+    in_header = api_client.get(
+        url, data=query_params, HTTP_X_PLAYLISTMOVER_SESSION=session
+    )
+
+    assert in_query.status_code == status.HTTP_400_BAD_REQUEST
+    assert in_header.status_code == status.HTTP_200_OK
+    assert fake_spotify.calls["POST api/token"] == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_get_playlist_retries_throttled_requests(api_client, fake_spotify, settings):
+    """Requests the platform answers with HTTP 429 are retried"""
+    fake_spotify.playlists, fake_spotify.page_size = 10, 4
+    fake_spotify.throttle_every = 5
+    settings.CLIENT_RATE_LIMIT_BACKOFF = 0.01
+
+    response = api_client.get(reverse("playlists"), data=CONTEXT)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()["playlists"]) == 10
+    assert fake_spotify.throttled > 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_get_playlist_reports_upstream_timings(api_client, fake_spotify):
+    """Platform calls are timed in Server-Timing and exposed as metrics"""
+    response = api_client.get(reverse("playlists"), data=CONTEXT)
+
+    assert response.status_code == status.HTTP_200_OK
+    server_timing = response["Server-Timing"]
+    assert 'desc="POST /api/token x1"' in server_timing
+    assert 'desc="GET /v1/playlists/{id} x3"' in server_timing
+    assert server_timing.split(", ")[-1].startswith("total;dur=")
+
+    metrics = api_client.get(reverse("metrics"))
+
+    assert metrics.status_code == status.HTTP_200_OK
+    assert metrics["Content-Type"].startswith("text/plain; version=0.0.4")
+    lines = metrics.content.decode().splitlines()
+    assert any(
+        line.startswith('playlistmover_upstream_requests_total{platform="SPOTIFY"')
+        and 'endpoint="/v1/users/{id}/playlists",status="200"}' in line
+        for line in lines
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_get_playlist_hides_upstream_timings_from_other_clients(
+    api_client, fake_spotify, settings
+):
+    """Clients outside the metrics addresses get neither timings nor metrics"""
+    settings.METRICS_ALLOWED_IPS = ["10.0.0.1"]
+
+    response = api_client.get(reverse("playlists"), data=CONTEXT)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert "Server-Timing" not in response
+    assert api_client.get(reverse("metrics")).status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db(transaction=True)
+def test_get_playlist_answers_unchanged_listing_with_304(api_client, fake_spotify):
+    """Polling an unchanged library costs the listing and no playlist fetch"""
+    first = api_client.get(reverse("playlists"), data=CONTEXT)
+    etag = first["ETag"]
+    query_params = {"platform": "SPOTIFY", "redirect_uri": "http://localhost"}
+    api_client.credentials(HTTP_X_PLAYLISTMOVER_SESSION=first.json()["session"])
+    fetched = fake_spotify.calls["GET v1/playlists/{id}"]
+
+    response = api_client.get(
+        reverse("playlists"), data=query_params, HTTP_IF_NONE_MATCH=etag
+    )
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response["ETag"] == etag and not response.content
+    assert fake_spotify.calls["GET v1/playlists/{id}"] == fetched
+
+    fake_spotify.snapshot = "changed"
+    response = api_client.get(
+        reverse("playlists"), data=query_params, HTTP_IF_NONE_MATCH=etag
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response["ETag"] != etag
+    assert len(response.json()["playlists"]) == 3
+
+
+def test_get_auth_returns_authorization_url(api_client, fake_spotify, settings):
+    """The authorization url points to the accounts service"""
+    query_params = {"platform": "SPOTIFY", "redirect_uri": "http://localhost"}
+
+    response = api_client.get(reverse("auth-redirect"), data=query_params)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["auth_url"].startswith(
+        "{}/authorize?".format(settings.SPOTIFY_ACCOUNTS_URL)
+    )
+
+
+def test_get_playlist_streams_ndjson(api_client):
+    """Playlists are streamed one per line when NDJSON is accepted"""
+    playlists = [
+        Playlist("first", [Song("song", ["artist"], [])], []),
+        Playlist(
+            "second",
+            [],
+            [{"url": "http://image", "height": 1, "width": 1}],
+            "second-id",
+            "snapshot",
+        ),
+    ]
+
+    def iter_playlists(client, context, redirect_uri, projection=None):
+        client.credentials = Credentials("session", "access", "refresh", None)
+        return iter(playlists)
+
+    with mock.patch.object(
+        SpotifyClient, "iter_playlists", autospec=True, side_effect=iter_playlists
+    ):
+        response = api_client.get(
+            reverse("playlists"), data=CONTEXT, HTTP_ACCEPT="application/x-ndjson"
+        )
+
+    lines = b"".join(response.streaming_content).decode().splitlines()
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"] == "application/x-ndjson"
+    assert response["X-Playlistmover-Session"] == "session"
+    assert [json.loads(line) for line in lines] == [
+        {
+            "title": "first",
+            "songs": [
+                {
+                    "title": "song",
+                    "artists": ["artist"],
+                    "images": [],
+                    "uri": None,
+                    "isrc": None,
+                }
+            ],
+            "images": [],
+            "id": None,
+            "snapshot_id": None,
+        },
+        {
+            "title": "second",
+            "songs": [],
+            "images": [{"url": "http://image", "height": 1, "width": 1}],
+            "id": "second-id",
+            "snapshot_id": "snapshot",
+        },
+    ]
+
+
+def test_get_playlist_rejects_unknown_image_variant(api_client):
+    """Only the known image variants can be projected"""
+    query_params = dict(CONTEXT, images="medium")
+
+    response = api_client.get(reverse("playlists"), data=query_params)
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == {
+        "success": False,
+        "error": "`images` must be one of all, largest, smallest, none.",
+    }
+
+
+@pytest.mark.django_db
+def test_post_playlists_queues_job(api_client, fake_spotify):
+    """Playlists are queued as a job whose progress can be followed"""
+    data = {
+        "context": CONTEXT,
+        "playlists": [
+            {
+                "title": "mix",
+                "songs": [{"title": "song", "artists": [], "images": []}],
+                "images": [],
+            }
+        ],
+    }
+
+    response = api_client.post(reverse("playlists"), data=data, format="json")
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    job_id = response.json()["job_id"]
+    assert response["Location"] == reverse("job", args=[job_id])
+    # the code is exchanged right away, the job only keeps the session
+    assert fake_spotify.calls["POST api/token"] == 1
+    assert response.json()["session"]
+
+    job = api_client.get(response["Location"]).json()["job"]
+    assert job["status"] == "queued"
+    assert job["progress"]["tracks"] == 1
+    assert job["id"] == job_id
+    assert [playlist["title"] for playlist in job["playlists"]] == ["mix"]
+    assert api_client.get(reverse("job", args=[uuid.uuid4()])).status_code == 404
+
+
+@pytest.mark.django_db
+def test_post_playlists_queues_sync_job(api_client, fake_spotify):
+    """Playlists carrying their source id can be queued to be synced"""
+    playlist = {"title": "mix", "songs": [], "images": []}
+    data = {
+        "context": CONTEXT,
+        "playlists": [playlist],
+        "mode": "sync",
+    }
+
+    response = api_client.post(reverse("playlists"), data=data, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["error"] == "`id` of every playlist is required to sync."
+
+    playlist.update(id="source-mix", snapshot_id="1")
+    response = api_client.post(reverse("playlists"), data=data, format="json")
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    job = api_client.get(response["Location"]).json()["job"]
+    assert job["mode"] == "sync"
+
+
+@pytest.mark.django_db
+def test_post_normalized_playlists_queues_job(api_client, fake_spotify):
+    """Playlists in the normalized layout are queued like nested ones"""
+    data = {
+        "context": CONTEXT,
+        "layout": "normalized",
+        "artists": ["artist"],
+        "images": [{"url": "http://image", "height": 64, "width": 64}],
+        "playlists": [
+            {
+                "title": "mix",
+                "songs": [
+                    {"title": "one", "artists": [0], "images": [0]},
+                    {"title": "two", "artists": [0], "images": [0]},
+                ],
+                "images": [0],
+            }
+        ],
+    }
+
+    response = api_client.post(reverse("playlists"), data=data, format="json")
+    data["playlists"][0]["songs"][1]["artists"] = [1]
+    invalid = api_client.post(reverse("playlists"), data=data, format="json")
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    job = api_client.get(response["Location"]).json()["job"]
+    assert job["progress"]["tracks"] == 2
+    assert invalid.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_playlists_negotiate_messagepack_and_gzip(api_client, fake_spotify):
+    """MessagePack bodies are accepted and returned, gzipped when accepted"""
+    data = {
+        "context": CONTEXT,
+        "playlists": [
+            {"title": "mix {}".format(index), "songs": [], "images": []}
+            for index in range(10)
+        ],
+    }
+
+    response = api_client.post(
+        reverse("playlists"),
+        data=msgpack.packb(data),
+        content_type="application/msgpack",
+        HTTP_ACCEPT="application/msgpack",
+    )
+    job_response = api_client.get(
+        response["Location"],
+        HTTP_ACCEPT="application/msgpack",
+        HTTP_ACCEPT_ENCODING="gzip",
+    )
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert response["Content-Type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content)["status"] == "queued"
+    assert job_response["Content-Encoding"] == "gzip"
+    job = msgpack.unpackb(gzip.decompress(job_response.content))["job"]
+    assert job["progress"]["playlists"] == 10
+    assert job["created_at"].endswith("Z")
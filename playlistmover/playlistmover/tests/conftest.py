@@ -0,0 +1,41 @@
+import os
+
+import pytest
+from django.conf import settings
+
+from playlistmover.playlistmover.logic.cache import TTLCache
+from playlistmover.playlistmover.logic.clients import SpotifyClient
+from playlistmover.playlistmover.logic.ratelimit import RequestScheduler
+from playlistmover.playlistmover.tests.fake_spotify import FakeSpotify
+
+
+CODE = "this_is_dummy_code"
+STATE = "123456789abcdefg"
+# query parameters, or request context, authenticating with the Spotify stand-in
+CONTEXT = {
+    "platform": "SPOTIFY",
+    "code": CODE,
+    "state": STATE,
+    "redirect_uri": "http://localhost",
+}
+
+if not os.getenv("PLAYLISTMOVER_SECRET_KEY"):
+    settings.SECRET_KEY = "this_is_dummy_secret_key"
+
+
+@pytest.fixture
+def spotify_client():
+    """
+    Factory of Spotify clients talking in process to a Spotify stand-in, with
+    a playlist cache of their own and without the rate limits other tests
+    have used up. Options are passed on to the client.
+    """
+
+    def get_client(fake_spotify: FakeSpotify, **options) -> SpotifyClient:
+        options.setdefault("playlist_cache", TTLCache(maxsize=16, ttl=60))
+        client = SpotifyClient(**options)
+        client.session = fake_spotify.session()
+        client.scheduler = RequestScheduler(rate=None, burst=1)
+        return client
+
+    return get_client
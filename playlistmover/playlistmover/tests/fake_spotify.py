@@ -0,0 +1,429 @@
+"""
+    Local stand-in for the Spotify Web API used by tests and benchmarks
+"""
+import asyncio
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import httpx
+import requests
+from requests.adapters import BaseAdapter
+
+ACCESS_TOKEN = "this_is_dummy_access_token"
+REFRESH_TOKEN = "this_is_dummy_refresh_token"
+USER_ID = "fake-user"
+
+Answer = Tuple[int, Dict[str, Any], Dict[str, str]]
+
+
+class FakeRequest(NamedTuple):
+    """
+    Request routed to a handler: the parts of its path, its URL without the
+    query string, its query parameters and its JSON body
+    """
+
+    parts: List[str]
+    url: str
+    params: Dict[str, str]
+    body: Optional[Dict[str, Any]]
+
+
+class FakeSpotify:  # pylint: disable=too-many-instance-attributes
+    """
+    Serves a synthetic account with `playlists` playlists of `tracks` tracks
+    each, paginated at most `page_size` items at a time, after `latency`
+    seconds. Every `throttle_every`-th request is answered with HTTP 429 and
+    a `Retry-After` of `retry_after` seconds. Only `code` is accepted as
+    authorization code when it is given. With `shared_tracks`, every playlist
+    lists the same tracks.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        playlists: int = 3,
+        tracks: int = 5,
+        page_size: int = 2,
+        latency: float = 0.0,
+        throttle_every: int = 0,
+        retry_after: int = 0,
+        code: Optional[str] = None,
+        shared_tracks: bool = False,
+    ):
+        self.playlists = playlists
+        self.tracks = tracks
+        self.page_size = page_size
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.code = code
+        self.shared_tracks = shared_tracks
+        self.snapshot = uuid.uuid4().hex
+        self.calls: Dict[str, int] = {}
+        self.fields: List[str] = []
+        self.requests = self.throttled = 0
+        self.created_playlists: Dict[str, Dict[str, Any]] = {}
+        self.in_flight = self.peak_in_flight = 0
+        self.lock = threading.Lock()
+
+    def _page(
+        self,
+        url: str,
+        params: Dict[str, str],
+        total: int,
+        get_item: Callable[[int], Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        offset = int(params.get("offset", 0))
+        limit = min(int(params.get("limit", self.page_size)), self.page_size)
+        end = min(offset + limit, total)
+        next_url = None
+        if end < total:
+            next_url = "{}?{}".format(url, urlencode({"offset": end, "limit": limit}))
+        return {
+            "items": [get_item(index) for index in range(offset, end)],
+            "next": next_url,
+            "total": total,
+        }
+
+    @staticmethod
+    def _images(url: str) -> List[Dict[str, Any]]:
+        return [
+            {"url": "{}/{}".format(url, size), "height": size, "width": size}
+            for size in (300, 640, 64)
+        ]
+
+    def _playlist(self, index: int) -> Dict[str, Any]:
+        return {
+            "id": "playlist-{}".format(index),
+            "name": "Playlist {}".format(index),
+            "snapshot_id": "{}-{}".format(self.snapshot, index),
+            "images": self._images("http://mosaic/{}".format(index)),
+            "tracks": {"total": self.tracks},
+        }
+
+    def _track(self, playlist_index: int, index: int) -> Dict[str, Any]:
+        if self.shared_tracks:
+            playlist_index = 0
+        return {
+            "track": {
+                "name": "Song {}.{}".format(playlist_index, index),
+                "uri": "spotify:track:{}-{}".format(playlist_index, index),
+                "artists": [{"name": "Artist {}".format(index % 3)}],
+                "album": {"images": self._images("http://image/{}".format(index))},
+            }
+        }
+
+    def _count(self, key: str) -> bool:
+        """
+        Record a request, and whether it has to be throttled
+        """
+        with self.lock:
+            self.requests += 1
+            self.calls[key] = self.calls.get(key, 0) + 1
+            throttled = bool(
+                self.throttle_every and self.requests % self.throttle_every == 0
+            )
+            self.throttled += throttled
+            return throttled
+
+    def handle(
+        self,
+        method: str,
+        url: str,
+        params: Dict[str, str],
+        body: Optional[Dict[str, Any]] = None,
+    ) -> Answer:
+        """
+        Return the status code, JSON body and headers answering a request
+        """
+        parts = urlparse(url).path.strip("/").split("/")
+        key = "{} {}".format(
+            method,
+            "/".join(
+                "{id}" if index == 2 and len(parts) > 2 else part
+                for index, part in enumerate(parts)
+            ),
+        )
+        if self._count(key):
+            return (
+                429,
+                {"error": {"status": 429, "message": "API rate limit exceeded"}},
+                {"Retry-After": str(self.retry_after)},
+            )
+        if "fields" in params:
+            with self.lock:
+                self.fields.append(params["fields"])
+        route = self.ROUTES.get(key)
+        if route is None:
+            return 404, {"error": {"status": 404, "message": "Not found"}}, {}
+        return getattr(self, route)(FakeRequest(parts, url.split("?")[0], params, body))
+
+    def _token(self, request: FakeRequest) -> Answer:
+        if (
+            self.code is not None
+            and request.body.get("grant_type") == "authorization_code"
+            and request.body.get("code") != self.code
+        ):
+            return 400, {"error": "invalid_grant"}, {}
+        return (
+            200,
+            {
+                "access_token": ACCESS_TOKEN,
+                "refresh_token": REFRESH_TOKEN,
+                "expires_in": 3600,
+            },
+            {},
+        )
+
+    @staticmethod
+    def _profile(_: FakeRequest) -> Answer:
+        return 200, {"uri": "spotify:user:{}".format(USER_ID)}, {}
+
+    def _list_playlists(self, request: FakeRequest) -> Answer:
+        page = self._page(request.url, request.params, self.playlists, self._playlist)
+        return 200, page, {}
+
+    def _create_playlist(self, request: FakeRequest) -> Answer:
+        with self.lock:
+            playlist_id = "created-{}".format(len(self.created_playlists))
+            self.created_playlists[playlist_id] = {
+                "name": request.body["name"],
+                "uris": [],
+            }
+        return 201, {"id": playlist_id}, {}
+
+    def _unfollow_playlist(self, request: FakeRequest) -> Answer:
+        with self.lock:
+            self.created_playlists.pop(request.parts[2], None)
+        return 200, {}, {}
+
+    def _add_tracks(self, request: FakeRequest) -> Answer:
+        if len(request.body["uris"]) > 100:
+            return 400, {"error": {"status": 400, "message": "Too many ids"}}, {}
+        self.created_playlists[request.parts[2]]["uris"].extend(request.body["uris"])
+        return 201, {"snapshot_id": self.snapshot}, {}
+
+    def _remove_tracks(self, request: FakeRequest) -> Answer:
+        if len(request.body["tracks"]) > 100:
+            return 400, {"error": {"status": 400, "message": "Too many ids"}}, {}
+        removed = {track["uri"] for track in request.body["tracks"]}
+        playlist = self.created_playlists[request.parts[2]]
+        playlist["uris"] = [uri for uri in playlist["uris"] if uri not in removed]
+        return 200, {"snapshot_id": self.snapshot}, {}
+
+    @staticmethod
+    def _search(request: FakeRequest) -> Answer:
+        name = request.params["q"].split("track:")[-1].split(" artist:")[0]
+        uri = "spotify:track:{}".format(name.replace(" ", "-"))
+        return 200, {"tracks": {"items": [{"uri": uri, "name": name}]}}, {}
+
+    @staticmethod
+    def _playlist_index(request: FakeRequest) -> int:
+        return int(request.parts[2].split("-")[-1])
+
+    def _tracks_page(
+        self, request: FakeRequest, url: str, params: Dict[str, str]
+    ) -> Dict[str, Any]:
+        playlist_index = self._playlist_index(request)
+        return self._page(
+            url, params, self.tracks, lambda index: self._track(playlist_index, index)
+        )
+
+    def _get_playlist(self, request: FakeRequest) -> Answer:
+        mosaic = "http://mosaic/{}".format(self._playlist_index(request))
+        tracks_url = "{}/tracks".format(request.url)
+        return (
+            200,
+            {
+                "images": self._images(mosaic),
+                "tracks": self._tracks_page(request, tracks_url, {}),
+            },
+            {},
+        )
+
+    def _get_playlist_tracks(self, request: FakeRequest) -> Answer:
+        return 200, self._tracks_page(request, request.url, request.params), {}
+
+    # method of each request, keyed like the calls counted
+    ROUTES = {
+        "POST api/token": "_token",
+        "GET v1/me": "_profile",
+        "GET v1/users/{id}/playlists": "_list_playlists",
+        "POST v1/users/{id}/playlists": "_create_playlist",
+        "DELETE v1/playlists/{id}/followers": "_unfollow_playlist",
+        "POST v1/playlists/{id}/tracks": "_add_tracks",
+        "DELETE v1/playlists/{id}/tracks": "_remove_tracks",
+        "GET v1/search": "_search",
+        "GET v1/playlists/{id}": "_get_playlist",
+        "GET v1/playlists/{id}/tracks": "_get_playlist_tracks",
+    }
+
+    def _enter(self):
+        with self.lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _exit(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def answer(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes],
+    ) -> Tuple[int, bytes, Dict[str, str]]:
+        """
+        Answer a raw request with the encoded response body, after the latency
+        """
+        self._enter()
+        try:
+            time.sleep(self.latency)
+            return self._answer(method, url, body)
+        finally:
+            self._exit()
+
+    def _answer(
+        self, method: str, url: str, body: Optional[bytes]
+    ) -> Tuple[int, bytes, Dict[str, str]]:
+        query = urlparse(url).query
+        params = {key: values[-1] for key, values in parse_qs(query).items()}
+        data = None
+        if body:
+            text = body.decode()
+            if text.startswith("{"):
+                data = json.loads(text)
+            else:
+                data = {key: values[-1] for key, values in parse_qs(text).items()}
+        status, response_body, headers = self.handle(method, url, params, data)
+        headers = {"Content-Type": "application/json", **headers}
+        return status, json.dumps(response_body).encode(), headers
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """
+        Answer a request sent through an httpx.MockTransport
+        """
+        self._enter()
+        try:
+            await asyncio.sleep(self.latency)
+            status, content, headers = self._answer(
+                request.method, str(request.url), request.content
+            )
+            return httpx.Response(status, content=content, headers=headers)
+        finally:
+            self._exit()
+
+    def transport(self) -> httpx.MockTransport:
+        """
+        httpx transport that routes every request to this stand-in
+        """
+        return httpx.MockTransport(self.handle_async_request)
+
+    def session(self) -> requests.Session:
+        """
+        requests session that routes every request to this stand-in
+        """
+        session = requests.Session()
+        session.mount("https://", FakeSpotifyAdapter(self))
+        session.mount("http://", FakeSpotifyAdapter(self))
+        return session
+
+
+class FakeSpotifyAdapter(BaseAdapter):
+    """
+    requests transport adapter answering requests from a `FakeSpotify`
+    """
+
+    def __init__(self, fake_spotify: FakeSpotify):
+        super().__init__()
+        self.fake_spotify = fake_spotify
+
+    def send(self, request, **kwargs):
+        body = request.body
+        if isinstance(body, str):
+            body = body.encode()
+        status, content, headers = self.fake_spotify.answer(
+            request.method, request.url, body
+        )
+        response = requests.Response()
+        response.status_code = status
+        response._content = content
+        response.headers.update(headers)
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class FakeSpotifyServer:
+    """
+    Serves a `FakeSpotify` over HTTP on a free local port, so requests go
+    through real sockets and connection pools. Used as a context manager:
+
+        with FakeSpotifyServer(FakeSpotify(playlists=1000)) as server:
+            settings.SPOTIFY_API_URL = settings.SPOTIFY_ACCOUNTS_URL = server.url
+    """
+
+    def __init__(self, fake_spotify: FakeSpotify, host: str = "127.0.0.1"):
+        self.fake_spotify = fake_spotify
+        self.server = ThreadingHTTPServer((host, 0), self._get_handler_class())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, args=(0.01,), daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        """
+        Base url of the stand-in, for both the Web API and accounts service
+        """
+        host, port = self.server.server_address[:2]
+        return "http://{}:{}".format(host, port)
+
+    def _get_handler_class(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """
+            Answers each request of the server with the stand-in
+            """
+
+            # keep-alive, like the Spotify API, without delaying the body
+            # written after the headers
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _respond(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else None
+                status, content, headers = server.fake_spotify.answer(
+                    self.command, "{}{}".format(server.url, self.path), body
+                )
+                self.send_response(status)
+                for header, value in headers.items():
+                    self.send_header(header, value)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _respond
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self) -> "FakeSpotifyServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
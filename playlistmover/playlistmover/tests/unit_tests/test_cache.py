@@ -0,0 +1,45 @@
+"""
+    Test module for the in-process caches
+"""
+from playlistmover.playlistmover.logic.cache import TTLCache
+
+
+class FakeClock:
+    """Manually advanced clock"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        """Move the clock forward"""
+        self.now += seconds
+
+
+def test_least_recently_used_entry_is_evicted():
+    """Entries beyond `maxsize` evict the least recently used one"""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_entries_expire_after_ttl():
+    """Entries are not returned once their TTL has passed"""
+    clock = FakeClock()
+    cache = TTLCache(maxsize=2, ttl=10, clock=clock)
+    cache.set("a", 1)
+
+    clock.advance(9.9)
+    assert cache.get("a") == 1
+    clock.advance(0.1)
+    assert cache.get("a", "missing") == "missing"
+    assert len(cache) == 0
@@ -0,0 +1,245 @@
+"""
+    Test module for the third-party music platform clients
+"""
+import threading
+import time
+from unittest import mock
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from playlistmover.playlistmover.logic.async_clients import get_http_client
+from playlistmover.playlistmover.logic.cache import TTLCache
+from playlistmover.playlistmover.logic.clients import SpotifyClient
+from playlistmover.playlistmover.logic.exceptions import InternalServerException
+from playlistmover.playlistmover.tests.conftest import CODE, STATE
+from playlistmover.playlistmover.tests.fake_spotify import FakeSpotify
+
+
+def test_get_playlists_fetches_concurrently_in_listing_order():
+    """Per-playlist fetches overlap but results keep the listing order"""
+    listing = [{"name": "playlist-{}".format(index), "id": index} for index in range(6)]
+    in_flight = {"current": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def get_playlist(playlist_data):
+        with lock:
+            in_flight["current"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["current"])
+        # later playlists finish first to prove ordering is not completion order
+        time.sleep(0.01 * (len(listing) - playlist_data["id"]))
+        with lock:
+            in_flight["current"] -= 1
+        return playlist_data["name"]
+
+    client = SpotifyClient(max_workers=3)
+    response = mock.Mock()
+    response.json.return_value = {"items": listing}
+    with mock.patch.object(client, "_setup_auth_tokens"), mock.patch.object(
+        client, "_get_user_id", return_value="user"
+    ), mock.patch.object(
+        client, "send_get_request", return_value=response
+    ), mock.patch.object(
+        client, "_get_playlist", side_effect=get_playlist
+    ):
+        playlists = client.get_playlists({}, "")
+
+    assert playlists == [playlist["name"] for playlist in listing]
+    assert in_flight["peak"] == 3
+
+
+def test_iter_playlists_follows_every_page():
+    """Playlist listing and track pages are followed until `next` is empty"""
+    api = "https://api.spotify.com/v1"
+    pages = {
+        "{}/users/user/playlists".format(api): {
+            "items": [{"name": "first", "id": "1"}],
+            "next": "{}/users/user/playlists?offset=1&limit=1".format(api),
+        },
+        "{}/users/user/playlists?offset=1&limit=1".format(api): {
+            "items": [{"name": "second", "id": "2"}],
+            "next": None,
+        },
+        "{}/playlists/1".format(api): {
+            "images": [],
+            "tracks": {
+                "items": [{"track": {"name": "a", "artists": [{"name": "x"}]}}],
+                "next": "{}/playlists/1/tracks?offset=1".format(api),
+            },
+        },
+        "{}/playlists/1/tracks?offset=1".format(api): {
+            "items": [None, {"track": {"name": "b", "artists": []}}],
+            "next": None,
+        },
+        "{}/playlists/2".format(api): {"tracks": {"items": [], "next": None}},
+    }
+    requested_params = []
+
+    def send_get_request(endpoint, params=None, headers=None):
+        requested_params.append((endpoint, params))
+        response = mock.Mock()
+        response.json.return_value = pages[endpoint]
+        return response
+
+    client = SpotifyClient(max_workers=2)
+    with mock.patch.object(client, "_setup_auth_tokens"), mock.patch.object(
+        client, "_get_user_id", return_value="user"
+    ), mock.patch.object(client, "send_get_request", side_effect=send_get_request):
+        playlists = list(client.iter_playlists({}, ""))
+
+    assert [playlist.title for playlist in playlists] == ["first", "second"]
+    assert [song.title for song in playlists[0].songs] == ["a", "b"]
+    assert playlists[1].songs == []
+    assert (
+        "{}/playlists/1/tracks?offset=1".format(api),
+        {"fields": SpotifyClient.TRACK_FIELDS},
+    ) in requested_params
+
+
+def test_unchanged_snapshot_is_served_from_cache():
+    """A playlist is only fetched again once its snapshot_id changes"""
+    response = mock.Mock()
+    response.json.return_value = {"images": [], "tracks": {"items": []}}
+    client = SpotifyClient(playlist_cache=TTLCache(maxsize=8, ttl=60))
+    playlist_data = {"name": "mix", "id": "1", "snapshot_id": "s1"}
+
+    with mock.patch.object(
+        client, "send_get_request", return_value=response
+    ) as send_get_request:
+        first = client._get_playlist(playlist_data)
+        renamed = client._get_playlist({**playlist_data, "name": "renamed"})
+        assert send_get_request.call_count == 1
+        client._get_playlist({**playlist_data, "snapshot_id": "s2"})
+        assert send_get_request.call_count == 2
+
+    assert client._get_playlist(playlist_data) is first
+    assert renamed.title == "renamed" and renamed.songs is first.songs
+
+
+@pytest.mark.django_db(transaction=True)
+def test_create_playlists_adds_tracks_in_batches(spotify_client):
+    """Tracks are added 100 at a time and songs without a uri are searched"""
+    fake_spotify = FakeSpotify()
+    songs = [
+        {"title": "Song {}".format(index), "artists": [], "images": []}
+        for index in range(250)
+    ]
+    for index, song in enumerate(songs[:240]):
+        song["uri"] = "spotify:track:{}".format(index)
+    playlists = mock.Mock(
+        validated_data=[
+            {"title": "big", "songs": songs, "images": []},
+            {"title": "empty", "songs": [], "images": []},
+        ]
+    )
+    context = {"code": CODE, "state": STATE, "redirect_uri": "http://localhost"}
+    client = spotify_client(fake_spotify)
+
+    created = client.create_playlists({"context": context}, playlists)
+
+    assert [(report["title"], report["added"]) for report in created] == [
+        ("big", 250),
+        ("empty", 0),
+    ]
+    assert created[0]["requests"] == 1 + 10 + 3
+    assert fake_spotify.calls["GET v1/search"] == 10
+    assert fake_spotify.created_playlists[created[0]["id"]]["uris"][-1] == (
+        "spotify:track:Song-249"
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_create_playlists_deletes_playlist_when_adding_tracks_fails(spotify_client):
+    """A playlist whose tracks could not be added is not left on the account"""
+    fake_spotify = FakeSpotify()
+    songs = [{"title": "Song", "artists": [], "images": [], "uri": "spotify:track:1"}]
+    playlists = mock.Mock(validated_data=[{"title": "mix", "songs": songs}])
+    context = {"code": CODE, "state": STATE, "redirect_uri": "http://localhost"}
+    client = spotify_client(fake_spotify)
+    failure = InternalServerException("Tracks could not be added to `mix`.")
+
+    with mock.patch.object(client, "_add_tracks", side_effect=failure):
+        with pytest.raises(InternalServerException) as raised:
+            client.create_playlists({"context": context}, playlists)
+
+    assert raised.value is failure
+    assert fake_spotify.calls["DELETE v1/playlists/{id}/followers"] == 1
+    assert not fake_spotify.created_playlists
+
+
+@pytest.mark.django_db(transaction=True)
+def test_create_playlists_reports_playlist_left_behind(spotify_client):
+    """The error names the playlist when it could not be deleted either"""
+    fake_spotify = FakeSpotify()
+    playlists = mock.Mock(validated_data=[{"title": "mix", "songs": []}])
+    context = {"code": CODE, "state": STATE, "redirect_uri": "http://localhost"}
+    client = spotify_client(fake_spotify)
+
+    with mock.patch.object(
+        client, "_add_tracks", side_effect=InternalServerException("add")
+    ), mock.patch.object(
+        client,
+        "_delete_destination_playlist",
+        side_effect=InternalServerException("delete"),
+    ):
+        with pytest.raises(InternalServerException, match="`created-0`"):
+            client.create_playlists({"context": context}, playlists)
+
+    assert list(fake_spotify.created_playlists) == ["created-0"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_create_playlists_reuses_indexed_matches(spotify_client):
+    """Songs resolved by an earlier migration are not searched again"""
+    fake_spotify = FakeSpotify()
+    songs = [
+        {"title": "Song {}".format(index), "artists": ["Artist"], "images": []}
+        for index in range(5)
+    ]
+    playlists = mock.Mock(validated_data=[{"title": "mix", "songs": songs}])
+    context = {"code": CODE, "state": STATE, "redirect_uri": "http://localhost"}
+
+    reports = []
+    for _ in range(2):
+        client = spotify_client(fake_spotify)
+        reports.extend(client.create_playlists({"context": context}, playlists))
+
+    assert [report["searches"] for report in reports] == [5, 0]
+    assert [report["added"] for report in reports] == [5, 5]
+    assert client.match_index.get_stats() == {
+        "hits": 5,
+        "misses": 0,
+        "hit_ratio": 1.0,
+    }
+
+
+def test_parsed_songs_share_artists_and_album_images():
+    """Songs of the same album and artists point to the same objects"""
+    client = SpotifyClient()
+    image = {"url": "http://image", "height": 64, "width": 64}
+    page = {
+        "items": [
+            {
+                "track": {
+                    "name": "Song {}".format(index),
+                    "artists": [{"name": "Art" + "ist"}],
+                    "album": {"images": [dict(image)]},
+                }
+            }
+            for index in range(2)
+        ]
+    }
+
+    first, second = client._parse_songs(page)
+
+    assert first.images is second.images
+    assert first.artists is second.artists
+    assert first.images[0].url == "http://image"
+    assert not hasattr(first, "__dict__")
+
+
+def test_async_http_client_is_closed_with_its_event_loop():
+    """The HTTP client of an event loop is closed when the loop shuts down"""
+    http_client = async_to_sync(get_http_client)()
+
+    assert http_client.is_closed
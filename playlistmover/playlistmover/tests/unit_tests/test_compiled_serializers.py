@@ -0,0 +1,76 @@
+"""
+    Test module for the compiled serializers
+"""
+import pytest
+from rest_framework.renderers import JSONRenderer
+
+from playlistmover.playlistmover.compiled_serializers import (
+    encode_playlist,
+    encode_playlists,
+    validate_playlists,
+)
+from playlistmover.playlistmover.models import Image, Playlist, Song
+from playlistmover.playlistmover.serializers import PlaylistSerializer
+
+
+def test_compiled_output_is_identical_to_serializer():
+    """Objects, dicts, nulls and missing optional keys render the same JSON"""
+    images = (Image("http://image/640", 640, 640), Image("http://image", None, None))
+    playlists = [
+        Playlist(
+            "first",
+            [
+                Song("song", ("artist", "other"), images, "spotify:track:1", "US1"),
+                Song("no uri", (), ()),
+            ],
+            images,
+        ),
+        Playlist(
+            "second",
+            [{"title": "dict", "artists": ["a"], "images": [{"url": "http://i"}]}],
+            [{"url": "http://image", "height": 1, "width": 1}],
+        ),
+    ]
+    render = JSONRenderer().render
+
+    assert render(encode_playlists(playlists)) == render(
+        PlaylistSerializer(playlists, many=True).data
+    )
+    assert render(encode_playlist(playlists[1])) == render(
+        PlaylistSerializer(playlists[1]).data
+    )
+
+
+@pytest.mark.parametrize(
+    "data",
+    (
+        [
+            {
+                "title": "  padded  ",
+                "songs": [
+                    {
+                        "title": "song",
+                        "artists": ["a", "b"],
+                        "images": [{"url": "http://i", "height": 64}],
+                        "uri": None,
+                        "ignored": True,
+                    }
+                ],
+                "images": [],
+            }
+        ],
+        [{"title": "numbers", "songs": [], "images": [{"url": 1, "height": "64"}]}],
+        [{"title": "x" * 201, "songs": [], "images": []}],
+        [{"title": "", "songs": [], "images": []}],
+        [{"title": "no songs", "images": []}],
+        [{"title": "null", "songs": None, "images": []}],
+        {"title": "not a list", "songs": [], "images": []},
+        [],
+    ),
+)
+def test_compiled_validation_is_identical_to_serializer(data):
+    """Valid payloads give the same data and invalid ones are rejected alike"""
+    serializer = PlaylistSerializer(data=data, many=True)
+
+    expected = serializer.validated_data if serializer.is_valid() else None
+    assert validate_playlists(data) == expected
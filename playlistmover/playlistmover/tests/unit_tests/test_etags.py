@@ -0,0 +1,44 @@
+"""
+    Test module for the ETags of playlist listings
+"""
+import pytest
+
+from playlistmover.playlistmover.logic.etags import etag_matches, get_listing_etag
+
+LISTING = [
+    {"id": "a", "name": "mix", "snapshot_id": "1"},
+    {"id": "b", "name": "chill", "snapshot_id": "7"},
+]
+
+
+def test_listing_etag_follows_snapshots_and_variant():
+    """The ETag changes with any snapshot, the order or the variant"""
+    etag = get_listing_etag(LISTING, "json")
+
+    assert etag == get_listing_etag([dict(item) for item in LISTING], "json")
+    assert etag != get_listing_etag(LISTING, "msgpack")
+    assert etag != get_listing_etag(LISTING[::-1], "json")
+    assert etag != get_listing_etag([LISTING[0], {**LISTING[1], "snapshot_id": "8"}])
+
+
+def test_listing_without_snapshot_has_no_etag():
+    """Playlists whose changes cannot be told apart disable the ETag"""
+    assert get_listing_etag([*LISTING, {"id": "c", "name": "new"}]) is None
+
+
+@pytest.mark.parametrize(
+    "if_none_match,matches",
+    (
+        (None, False),
+        ('"other"', False),
+        ('"other", "{etag}"', True),
+        ('W/"{etag}"', True),
+        ("*", True),
+    ),
+)
+def test_etag_matches_weakly(if_none_match, matches):
+    """Weak and listed ETags match, as for any conditional GET"""
+    etag = '"{}"'.format("abc")
+    header = if_none_match and if_none_match.format(etag=etag.strip('"'))
+
+    assert etag_matches(header, etag) is matches
@@ -0,0 +1,136 @@
+"""
+    Test module for the background migration jobs
+"""
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.utils import timezone
+
+from playlistmover.playlistmover.logic.clients import Client
+from playlistmover.playlistmover.logic.jobs import (
+    claim_job,
+    enqueue_job,
+    get_job_progress,
+    work,
+)
+from playlistmover.playlistmover.models import MigrationJob, MigrationJobPlaylist
+from playlistmover.playlistmover.tests.conftest import CONTEXT
+from playlistmover.playlistmover.tests.fake_spotify import FakeSpotify
+
+SESSION = "this_is_dummy_session"
+
+
+def get_playlists(*sizes):
+    """Playlist data with the given numbers of songs"""
+    return [
+        {
+            "title": "playlist-{}".format(index),
+            "songs": [
+                {
+                    "title": "Song {}".format(song),
+                    "artists": [],
+                    "images": [],
+                    "uri": "spotify:track:{}".format(song),
+                }
+                for song in range(size)
+            ],
+            "images": [],
+        }
+        for index, size in enumerate(sizes)
+    ]
+
+
+@pytest.mark.django_db
+def test_jobs_are_claimed_once_in_queue_order():
+    """Each queued job goes to a single worker, oldest first"""
+    first = enqueue_job("SPOTIFY", SESSION, get_playlists(1))
+    second = enqueue_job("SPOTIFY", SESSION, get_playlists(2))
+
+    claimed = [claim_job("worker-a"), claim_job("worker-b"), claim_job("worker-a")]
+
+    assert [job.id if job else None for job in claimed] == [first.id, second.id, None]
+    assert claimed[0].status == MigrationJob.RUNNING
+    assert claimed[1].worker == "worker-b"
+
+
+@pytest.mark.django_db
+def test_jobs_with_an_expired_lease_are_claimed_again(settings):
+    """A running job is taken back once its worker stops renewing the lease"""
+    settings.JOB_LEASE_SECONDS = 60
+    job = enqueue_job("SPOTIFY", SESSION, get_playlists(1))
+    started_at = claim_job("worker-a").started_at
+
+    assert claim_job("worker-b") is None
+    MigrationJob.objects.filter(id=job.id).update(
+        heartbeat_at=timezone.now() - timedelta(seconds=61)
+    )
+    reclaimed = claim_job("worker-b")
+
+    assert reclaimed.id == job.id
+    assert reclaimed.worker == "worker-b"
+    assert reclaimed.started_at == started_at
+    assert claim_job("worker-a") is None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reclaimed_job_only_creates_unfinished_playlists(spotify_client):
+    """Playlists finished before the job was taken back are not created again"""
+    fake_spotify = FakeSpotify()
+    client = spotify_client(fake_spotify)
+    session_key = client.authenticate(CONTEXT, CONTEXT["redirect_uri"]).session_key
+    job = enqueue_job("SPOTIFY", session_key, get_playlists(2, 3))
+    MigrationJobPlaylist.objects.filter(job=job, position=0).update(
+        status=MigrationJob.DONE
+    )
+    MigrationJob.objects.filter(id=job.id).update(
+        status=MigrationJob.RUNNING, worker="worker-a", heartbeat_at=None
+    )
+
+    with mock.patch.object(Client, "get_client", return_value=client):
+        work(poll_interval=0, max_jobs=1)
+
+    progress = get_job_progress(job.public_id)
+    assert progress["status"] == MigrationJob.DONE
+    assert progress["playlists"][1]["report"]["added"] == 3
+    assert [
+        playlist["name"] for playlist in fake_spotify.created_playlists.values()
+    ] == ["playlist-1"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_worker_runs_job_and_reports_progress(spotify_client):
+    """A worker creates the playlists of a job and records their outcome"""
+    fake_spotify = FakeSpotify()
+    client = spotify_client(fake_spotify)
+    session_key = client.authenticate(CONTEXT, CONTEXT["redirect_uri"]).session_key
+    job = enqueue_job("SPOTIFY", session_key, get_playlists(150, 3))
+
+    assert get_job_progress(job.public_id)["progress"]["eta_seconds"] is None
+    with mock.patch.object(Client, "get_client", return_value=client):
+        work(poll_interval=0, max_jobs=1)
+
+    progress = get_job_progress(job.public_id)
+    assert progress["status"] == MigrationJob.DONE
+    assert [
+        (playlist["status"], playlist["report"]["added"])
+        for playlist in progress["playlists"]
+    ] == [(MigrationJob.DONE, 150), (MigrationJob.DONE, 3)]
+    assert progress["progress"]["finished_tracks"] == 153
+    assert progress["progress"]["tracks_per_second"] > 0
+    assert progress["progress"]["eta_seconds"] == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_failed_authentication_fails_every_playlist():
+    """Playlists that never started fail with the job"""
+    job = enqueue_job("SPOTIFY", SESSION, get_playlists(1, 1))
+
+    work(poll_interval=0, max_jobs=1)
+
+    progress = get_job_progress(job.public_id)
+    assert progress["status"] == MigrationJob.FAILED
+    assert progress["error"] == "Session is invalid or has expired."
+    assert {playlist["status"] for playlist in progress["playlists"]} == {
+        MigrationJob.FAILED
+    }
@@ -0,0 +1,50 @@
+"""
+    Test module for the fuzzy matching engine
+"""
+from playlistmover.playlistmover.logic.match_index import MatchIndex
+from playlistmover.playlistmover.logic.matching import MatchEngine
+
+
+def test_songs_match_closest_candidate_above_threshold():
+    """Each song gets its most similar candidate, or None below the threshold"""
+    songs = [
+        {"title": "Crazy in Love (feat. Jay-Z)", "artists": ["Beyonce"]},
+        {"title": "Bohemian Rhapsody - Remastered", "artists": ["Queen"]},
+        {"title": "Completely Unrelated", "artists": ["Nobody"]},
+    ]
+    candidates = [
+        {"title": "Bohemian Rhapsody", "artists": ["Queen"], "uri": "queen"},
+        {"title": "Crazy In Love", "artists": ["Beyoncé", "JAY-Z"], "uri": "wrong"},
+        {"title": "Crazy in Love", "artists": ["Beyoncé"], "uri": "beyonce"},
+        {"title": "Bohemian Rhapsody", "artists": ["Cover Band"], "uri": "cover"},
+    ]
+
+    matches = MatchEngine(threshold=0.75).match(songs, candidates)
+
+    assert [candidates[match[0]]["uri"] if match else None for match in matches] == [
+        "beyonce",
+        "queen",
+        None,
+    ]
+    assert matches[0][1] == 1.0
+
+
+def test_songs_without_artists_match_on_title():
+    """Missing artists do not lower the score of an identical title"""
+    matches = MatchEngine().match(
+        [{"title": "Intro", "artists": []}], [{"title": "intro", "artists": ["X"]}]
+    )
+
+    assert matches == [(0, 1.0)]
+
+
+def test_song_versions_keep_distinct_index_keys():
+    """Version suffixes are ignored by fuzzy matching but not by the index"""
+    titles = ["Song - Live", "Song - Acoustic", "Song - Remastered"]
+    songs = [{"title": title, "artists": ["Artist"]} for title in titles]
+
+    keys = {MatchIndex.get_song_key(song) for song in songs}
+    matches = MatchEngine().match(songs, [{"title": "Song", "artists": ["Artist"]}])
+
+    assert len(keys) == len(titles)
+    assert matches == [(0, 1.0)] * len(titles)
@@ -0,0 +1,90 @@
+"""
+    Test module for the metrics of outbound requests
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from playlistmover.playlistmover.logic.metrics import (
+    Histogram,
+    UpstreamMetrics,
+    bind_context,
+    get_endpoint,
+    record_call,
+    track_request,
+)
+
+
+def test_get_endpoint_templates_ids():
+    """The segment after each id segment is replaced, the query dropped"""
+    assert get_endpoint(
+        "https://api.spotify.com/v1/playlists/abc123/tracks?offset=100",
+        ("users", "playlists"),
+    ) == ("api.spotify.com", "/v1/playlists/{id}/tracks")
+    assert get_endpoint("https://api.spotify.com/v1/me/playlists", ("users",)) == (
+        "api.spotify.com",
+        "/v1/me/playlists",
+    )
+
+
+def test_histogram_counts_are_cumulative():
+    """Every value is counted in its bucket and the ones above it"""
+    histogram = Histogram(buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value)
+
+    assert histogram.get_cumulative_counts() == [("0.1", 2), ("1.0", 3), ("+Inf", 4)]
+    assert histogram.count == 4 and histogram.sum == 3.65
+
+
+def test_render_prometheus_text():
+    """Latencies, statuses and bytes are rendered per endpoint"""
+    metrics = UpstreamMetrics()
+    key = ("SPOTIFY", "GET", "api.spotify.com", "/v1/me")
+    metrics.observe(key, "200", 0.02, 0, 120)
+    metrics.observe(key, "429", 0.01, 0, 30)
+
+    text = metrics.render()
+
+    labels = 'platform="SPOTIFY",method="GET",host="api.spotify.com",endpoint="/v1/me"'
+    assert "# TYPE playlistmover_upstream_request_duration_seconds histogram" in text
+    assert (
+        'playlistmover_upstream_request_duration_seconds_bucket{{{},le="0.01"}} 1'.format(
+            labels
+        )
+        in text
+    )
+    assert (
+        "playlistmover_upstream_request_duration_seconds_count{{{}}} 2".format(labels)
+        in text
+    )
+    assert (
+        'playlistmover_upstream_requests_total{{{},status="429"}} 1'.format(labels)
+        in text
+    )
+    assert (
+        "playlistmover_upstream_received_bytes_total{{{}}} 150".format(labels) in text
+    )
+
+
+def test_bound_functions_add_to_request_timings():
+    """Calls recorded in executor threads are timed for the calling request"""
+
+    def call(index: int):
+        record_call(
+            "SPOTIFY",
+            "GET",
+            "https://api.spotify.com/v1/playlists/{}".format(index),
+            "200",
+            0.01,
+            0,
+            10,
+            ("playlists",),
+        )
+
+    with track_request() as timings:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(bind_context(call), range(4)))
+            # executor threads do not inherit the context of the caller
+            executor.submit(call, 4).result()
+
+    assert timings.calls == {("GET", "/v1/playlists/{id}"): [4, 0.04]}
+    assert 'desc="GET /v1/playlists/{id} x4";dur=40.0' in timings.get_server_timing()
@@ -0,0 +1,109 @@
+"""
+    Test module for the normalized layout of playlists
+"""
+import json
+
+import pytest
+
+from playlistmover.playlistmover.compiled_serializers import (
+    encode_playlists,
+    validate_playlists,
+)
+from playlistmover.playlistmover.logic.exceptions import BadRequestException
+from playlistmover.playlistmover.logic.interning import Interner
+from playlistmover.playlistmover.models import Playlist, PlaylistSummary, Song
+from playlistmover.playlistmover.normalized import (
+    denormalize_playlists,
+    get_layout,
+    normalize_playlists,
+)
+from playlistmover.playlistmover.serializers import (
+    PlaylistSerializer,
+    PlaylistSummarySerializer,
+    SongSerializer,
+)
+
+
+def make_playlists():
+    """Two playlists whose songs share an album and an artist"""
+    interner = Interner()
+    album = interner.images(
+        {"url": "http://image/{}".format(size), "height": size, "width": size}
+        for size in (640, 64)
+    )
+    return [
+        Playlist(
+            "first",
+            [
+                Song("a", interner.artists(["Artist", "Guest"]), album, "uri:a"),
+                Song("b", interner.artists(["Artist"]), album, isrc="USRC10000001"),
+            ],
+            album,
+        ),
+        Playlist("second", [Song("c", interner.artists(["Guest"]), ())], ()),
+    ]
+
+
+def test_artists_and_images_are_listed_once():
+    """Songs refer to the artist and image tables by index"""
+    normalized = normalize_playlists(make_playlists())
+
+    assert normalized["artists"] == ["Artist", "Guest"]
+    assert [image["width"] for image in normalized["images"]] == [640, 64]
+    first, second = normalized["playlists"]
+    assert first["images"] == [0, 1]
+    assert [song["artists"] for song in first["songs"]] == [[0, 1], [0]]
+    assert [song["images"] for song in first["songs"]] == [[0, 1], [0, 1]]
+    assert second["songs"][0] == {
+        "title": "c",
+        "artists": [1],
+        "images": [],
+        "uri": None,
+        "isrc": None,
+    }
+
+
+def test_round_trip_matches_nested_layout():
+    """A normalized body validates to the same data as the nested one"""
+    playlists = make_playlists()
+    normalized = json.loads(json.dumps(normalize_playlists(playlists)))
+    nested = json.loads(json.dumps(encode_playlists(playlists)))
+
+    assert denormalize_playlists(normalized) == nested
+    assert validate_playlists(denormalize_playlists(normalized)) == (
+        validate_playlists(nested)
+    )
+
+
+def test_fields_match_the_serializers():
+    """Normalized objects have the fields of the nested layout, in its order"""
+    playlist = normalize_playlists(make_playlists())["playlists"][0]
+    summary = normalize_playlists([PlaylistSummary("mix", 3, ())])["playlists"][0]
+
+    assert list(playlist) == list(PlaylistSerializer().fields)
+    assert list(playlist["songs"][0]) == list(SongSerializer().fields)
+    assert list(summary) == list(PlaylistSummarySerializer().fields)
+
+
+@pytest.mark.parametrize(
+    "data",
+    (
+        {"artists": [], "images": [], "playlists": {}},
+        {"images": [], "playlists": [{"title": "t", "images": [0]}]},
+        {"images": [{}], "playlists": [{"title": "t", "images": [-1]}]},
+        {"images": [{}], "playlists": [{"title": "t", "images": [True]}]},
+        {"playlists": [{"title": "t", "songs": [{"artists": None}], "images": []}]},
+        {"playlists": ["not a playlist"]},
+    ),
+)
+def test_invalid_references_are_rejected(data):
+    """Indexes outside the tables and malformed tables are bad requests"""
+    with pytest.raises(BadRequestException):
+        denormalize_playlists(data)
+
+
+def test_unknown_layout_is_rejected():
+    """Only the nested and normalized layouts exist"""
+    assert get_layout(None) == "nested"
+    with pytest.raises(BadRequestException):
+        get_layout("flat")
@@ -0,0 +1,84 @@
+"""
+    Test module for the projection of fetched playlists
+"""
+import pytest
+
+from playlistmover.playlistmover.compiled_serializers import encode_playlists
+from playlistmover.playlistmover.logic.exceptions import BadRequestException
+from playlistmover.playlistmover.logic.projection import Projection
+from playlistmover.playlistmover.tests.conftest import CODE, STATE
+from playlistmover.playlistmover.tests.fake_spotify import FakeSpotify
+
+CONTEXT = {"code": CODE, "state": STATE}
+
+
+@pytest.mark.parametrize(
+    "query_params",
+    ({"images": "medium"}, {"summary": "yes"}),
+)
+def test_invalid_projection_is_rejected(query_params):
+    """Unknown image variants and summary flags are bad requests"""
+    with pytest.raises(BadRequestException):
+        Projection.from_query_params(query_params)
+
+
+@pytest.mark.django_db
+def test_without_images_narrows_upstream_fields(spotify_client):
+    """No image is requested from the platform when none is wanted"""
+    fake_spotify = FakeSpotify(playlists=2, tracks=3, page_size=2)
+    client = spotify_client(fake_spotify)
+
+    playlists = client.get_playlists(
+        CONTEXT, "http://localhost", Projection(images="none")
+    )
+
+    assert fake_spotify.fields
+    assert not any("images" in fields for fields in fake_spotify.fields)
+    assert all(not playlist.images for playlist in playlists)
+    assert all(not song.images for song in playlists[0].songs)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("images,size", (("largest", 640), ("smallest", 64)))
+def test_single_image_variant_is_kept(images, size, spotify_client):
+    """Only the largest or smallest variant of each image set is kept"""
+    client = spotify_client(FakeSpotify(playlists=1, tracks=2))
+
+    (playlist,) = client.get_playlists(
+        CONTEXT, "http://localhost", Projection(images=images)
+    )
+
+    assert [image.width for image in playlist.images] == [size]
+    assert [image.width for image in playlist.songs[0].images] == [size]
+
+
+@pytest.mark.django_db
+def test_summary_only_reads_the_listing(spotify_client):
+    """Summaries come from the listing without any per-playlist request"""
+    fake_spotify = FakeSpotify(playlists=3, tracks=5, page_size=2)
+    client = spotify_client(fake_spotify)
+    projection = Projection(images="smallest", summary=True)
+
+    summaries = client.get_playlists(CONTEXT, "http://localhost", projection)
+
+    assert fake_spotify.calls["GET v1/users/{id}/playlists"] == 2
+    assert "GET v1/playlists/{id}" not in fake_spotify.calls
+    assert encode_playlists(summaries, projection.serializer_class)[0] == {
+        "title": "Playlist 0",
+        "tracks": 5,
+        "images": [{"url": "http://mosaic/0/64", "height": 64, "width": 64}],
+    }
+
+
+@pytest.mark.django_db
+def test_projections_are_cached_separately(spotify_client):
+    """A playlist cached without images is not served when images are wanted"""
+    fake_spotify = FakeSpotify(playlists=1, tracks=1)
+    client = spotify_client(fake_spotify)
+
+    client.get_playlists(CONTEXT, "http://localhost", Projection(images="none"))
+    client.get_playlists(CONTEXT, "http://localhost", Projection(images="none"))
+    (playlist,) = client.get_playlists(CONTEXT, "http://localhost")
+
+    assert fake_spotify.calls["GET v1/playlists/{id}"] == 2
+    assert len(playlist.images) == 3
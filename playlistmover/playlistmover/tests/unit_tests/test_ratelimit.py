@@ -0,0 +1,218 @@
+"""
+    Test module for the outbound request scheduler
+"""
+import asyncio
+import threading
+from unittest import mock
+
+import pytest
+
+from playlistmover.playlistmover.logic.clients import SpotifyClient
+from playlistmover.playlistmover.logic.exceptions import TooManyRequestsException
+from playlistmover.playlistmover.logic.ratelimit import (
+    RequestScheduler,
+    TokenBucket,
+    get_retry_delay,
+)
+
+
+class FakeClock:
+    """Manually advanced clock"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        """Move the clock forward"""
+        self.now += seconds
+
+
+class QueueingClock(FakeClock):
+    """
+    Clock frozen until every named thread has read it while queued for
+    admission, then advancing a second per reading once `ticking`
+    """
+
+    def __init__(self, names):
+        super().__init__()
+        self.waiting = set(names)
+        self.queued = threading.Event()
+        self.ticking = False
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.waiting.discard(threading.current_thread().name)
+            if not self.waiting:
+                self.queued.set()
+            if self.ticking:
+                self.advance(1)
+            return self.now
+
+
+def test_token_bucket_refills_at_rate():
+    """Tokens run out after the burst and refill continuously"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+
+    for _ in range(2):
+        assert bucket.wait_time() == 0
+        bucket.consume()
+
+    assert bucket.wait_time() == pytest.approx(0.5)
+    clock.advance(0.5)
+    assert bucket.wait_time() == 0
+
+
+def test_token_bucket_pause():
+    """A paused bucket hands out no tokens until the pause ends"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=None, capacity=1, clock=clock)
+
+    bucket.pause(3)
+
+    assert bucket.wait_time() == 3
+    clock.advance(3)
+    assert bucket.wait_time() == 0
+
+
+def test_scheduler_serves_users_round_robin():
+    """A user with a backlog does not delay other users queued behind it"""
+    users = {"busy-0": "busy", "busy-1": "busy", "busy-2": "busy", "quiet": "quiet"}
+    clock = QueueingClock(users)
+    scheduler = RequestScheduler(rate=1000, burst=1, clock=clock)
+    admitted = []
+    scheduler.acquire("platform", "busy")
+
+    def send(user):
+        scheduler.acquire("platform", user)
+        admitted.append(user)
+
+    threads = [
+        threading.Thread(target=send, args=(user,), name=name)
+        for name, user in users.items()
+    ]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    assert clock.queued.wait(timeout=5), "requests were not queued"
+    clock.ticking = True
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert sorted(admitted) == ["busy", "busy", "busy", "quiet"]
+    assert admitted.index("quiet") <= 1
+
+
+def test_async_requests_share_the_round_robin_queue():
+    """Async requests with a backlog do not delay blocking requests of others"""
+    clock = QueueingClock(["busy", "quiet"])
+    scheduler = RequestScheduler(rate=1000, burst=1, clock=clock)
+    admitted = []
+    scheduler.acquire("platform", "busy")
+
+    async def send_async():
+        await scheduler.acquire_async("platform", "busy")
+        admitted.append("busy")
+
+    async def send_all_async():
+        await asyncio.gather(*(send_async() for _ in range(3)))
+
+    def send():
+        scheduler.acquire("platform", "quiet")
+        admitted.append("quiet")
+
+    threads = [
+        threading.Thread(target=asyncio.run, args=(send_all_async(),), name="busy"),
+        threading.Thread(target=send, name="quiet"),
+    ]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    assert clock.queued.wait(timeout=5), "requests were not queued"
+    clock.ticking = True
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert sorted(admitted) == ["busy", "busy", "busy", "quiet"]
+    assert admitted.index("quiet") <= 1
+
+
+def test_requests_without_user_only_count_against_the_platform():
+    """Logins made before the user is known are not limited to one user's rate"""
+    scheduler = RequestScheduler(
+        rate=None, burst=1, user_rate=1, user_burst=1, clock=FakeClock()
+    )
+
+    for _ in range(3):
+        scheduler.acquire("platform")
+
+    assert not scheduler._user_buckets
+
+
+def test_idle_user_buckets_are_dropped():
+    """Buckets of users back to full capacity do not accumulate"""
+    clock = FakeClock()
+    scheduler = RequestScheduler(
+        rate=None, burst=1, user_rate=10, user_burst=2, clock=clock
+    )
+    scheduler.acquire("platform", "idle")
+
+    clock.advance(0.2)
+    scheduler.acquire("platform", "active")
+
+    assert list(scheduler._user_buckets) == [("platform", "active")]
+
+
+def test_acquire_times_out():
+    """Requests waiting longer than the timeout raise a TooManyRequestsException"""
+    scheduler = RequestScheduler(
+        rate=1, burst=1, user_rate=None, user_burst=1, clock=FakeClock()
+    )
+    scheduler.acquire("platform", "user")
+
+    with pytest.raises(TooManyRequestsException):
+        scheduler.acquire("platform", "user", timeout=0.01)
+    with pytest.raises(TooManyRequestsException):
+        asyncio.run(scheduler.acquire_async("platform", "user", timeout=0.01))
+
+    assert not scheduler._queues["platform"]
+
+
+def test_retry_after_is_capped(settings):
+    """Retry-After delays are honored up to CLIENT_RATE_LIMIT_MAX_DELAY"""
+    settings.CLIENT_RATE_LIMIT_MAX_DELAY = 2.0
+    settings.CLIENT_RATE_LIMIT_BACKOFF = 0.5
+    response = mock.Mock(status_code=429, headers={"Retry-After": "86400"})
+
+    assert 2.0 <= get_retry_delay(response, 0) <= 2.5
+
+
+def test_rate_limited_requests_honor_retry_after():
+    """HTTP 429 responses pause the platform and are retried"""
+    rate_limited = mock.Mock(status_code=429, headers={"Retry-After": "0.01"})
+    success = mock.Mock(status_code=200, headers={})
+    session = mock.Mock()
+    session.request.side_effect = [rate_limited, success]
+    scheduler = mock.Mock(spec=RequestScheduler)
+    client = SpotifyClient()
+    client.session, client.scheduler = session, scheduler
+
+    assert client.send_get_request("/v1/me") is success
+    assert scheduler.acquire.call_count == 2
+    delay = scheduler.pause.call_args[0][1]
+    assert 0.01 <= delay <= 0.51
+
+
+def test_rate_limit_exhausted_raises():
+    """Persistent HTTP 429 responses raise a TooManyRequestsException"""
+    session = mock.Mock()
+    session.request.return_value = mock.Mock(status_code=429, headers={})
+    client = SpotifyClient()
+    client.session, client.scheduler = session, mock.Mock(spec=RequestScheduler)
+
+    with pytest.raises(TooManyRequestsException):
+        client.send_get_request("/v1/me")
@@ -0,0 +1,67 @@
+"""
+    Test module for the registry of platform clients
+"""
+from importlib.metadata import EntryPoint
+from unittest import mock
+
+import pytest
+
+from playlistmover.playlistmover.logic import registry
+from playlistmover.playlistmover.logic.async_clients import (
+    AsyncClient,
+    AsyncSpotifyClient,
+)
+from playlistmover.playlistmover.logic.clients import Client, SpotifyClient
+from playlistmover.playlistmover.logic.clients_enums import ClientEnum
+from playlistmover.playlistmover.logic.exceptions import BadRequestException
+
+SPOTIFY_CLIENT = "playlistmover.playlistmover.logic.clients.SpotifyClient"
+
+
+def test_clients_are_per_request_copies_of_a_process_client():
+    """Requests share the stores and pools of a client, not its credentials"""
+    first = Client.get_client(ClientEnum.SPOTIFY)
+    second = Client.get_client(ClientEnum.SPOTIFY)
+    first.headers["Authorization"] = "Bearer token"
+
+    assert isinstance(first, SpotifyClient) and first is not second
+    assert first.session is second.session
+    assert first.token_store is second.token_store
+    assert first.playlist_cache is second.playlist_cache
+    assert second.headers == {} and first.tracks is not second.tracks
+    assert isinstance(AsyncClient.get_client(ClientEnum.SPOTIFY), AsyncSpotifyClient)
+
+
+def test_plugins_are_imported_on_first_use():
+    """A platform's client class is imported once, when first asked for"""
+    client_registry = registry.ClientRegistry(
+        {"SPOTIFY": SPOTIFY_CLIENT}, registry.CLIENTS_GROUP
+    )
+
+    with mock.patch.object(
+        registry, "import_string", wraps=registry.import_string
+    ) as import_string:
+        assert not import_string.called
+        clients = [client_registry.get_client(ClientEnum.SPOTIFY) for _ in range(3)]
+
+    import_string.assert_called_once_with(SPOTIFY_CLIENT)
+    assert all(isinstance(client, SpotifyClient) for client in clients)
+
+
+def test_plugins_are_discovered_from_entry_points():
+    """Installed packages can provide the clients of other platforms"""
+    entry_point = EntryPoint(
+        name="APPLE_MUSIC",
+        value="playlistmover.playlistmover.logic.clients:SpotifyClient",
+        group=registry.CLIENTS_GROUP,
+    )
+    client_registry = registry.ClientRegistry({}, registry.CLIENTS_GROUP)
+
+    with mock.patch.object(registry, "entry_points", return_value=[entry_point]):
+        client_class = client_registry.get_client_class(ClientEnum.APPLE_MUSIC)
+
+        with pytest.raises(BadRequestException) as error:
+            client_registry.get_client(ClientEnum.YOUTUBE_MUSIC)
+
+    assert client_class is SpotifyClient
+    assert str(error.value) == "`YOUTUBE_MUSIC` not supported."
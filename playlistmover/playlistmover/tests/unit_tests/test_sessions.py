@@ -0,0 +1,59 @@
+"""
+    Test module for the shared HTTP session
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from playlistmover.playlistmover.logic.clients import Client
+from playlistmover.playlistmover.logic.sessions import build_session, get_session
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """Minimal HTTP/1.1 handler that keeps connections open"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Respond with an empty JSON object"""
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Silence request logging"""
+
+
+@pytest.fixture
+def local_server():
+    """Local keep-alive HTTP server"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:{}".format(server.server_port)
+    server.shutdown()
+    server.server_close()
+
+
+def test_clients_share_the_process_session():
+    """Every client instance uses the same pooled session"""
+    assert Client().session is Client().session is get_session()
+
+
+def test_connections_are_reused(local_server):
+    """Sequential requests to one host reuse a single connection"""
+    client = Client(local_server, session=build_session())
+
+    for _ in range(3):
+        client.get_json("/")
+
+    assert client.get_connection_stats() == {
+        "pools": 1,
+        "connections": 1,
+        "requests": 3,
+        "reused": 2,
+    }
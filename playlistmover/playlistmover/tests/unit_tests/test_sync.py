@@ -0,0 +1,140 @@
+"""
+    Test module for the incremental sync of playlists
+"""
+import pytest
+from rest_framework.exceptions import ValidationError
+
+from playlistmover.playlistmover.logic.clients import SpotifyClient
+from playlistmover.playlistmover.logic.exceptions import (
+    BadRequestException,
+    InternalServerException,
+)
+from playlistmover.playlistmover.logic.jobs import get_job_mode
+from playlistmover.playlistmover.logic.sync import (
+    SyncStore,
+    diff_tracks,
+    get_track_key,
+)
+from playlistmover.playlistmover.serializers import PlaylistSerializer
+from playlistmover.playlistmover.tests.conftest import CONTEXT
+from playlistmover.playlistmover.tests.fake_spotify import USER_ID, FakeSpotify
+
+
+def get_song(index: int) -> dict:
+    """Song already carrying a Spotify track uri"""
+    return {
+        "title": "Song {}".format(index),
+        "artists": [],
+        "images": [],
+        "uri": "spotify:track:{}".format(index),
+    }
+
+
+def sync(client: SpotifyClient, snapshot_id: str, *songs) -> dict:
+    """
+    Sync the source playlist with the given songs, by index or in full,
+    returning its report
+    """
+    playlists = PlaylistSerializer(
+        data=[
+            {
+                "title": "mix",
+                "songs": [
+                    get_song(song) if isinstance(song, int) else song for song in songs
+                ],
+                "images": [],
+                "id": "source-mix",
+                "snapshot_id": snapshot_id,
+            }
+        ],
+        many=True,
+    )
+    if not playlists.is_valid():
+        raise ValidationError(playlists.errors)
+    return client.create_playlists({"context": CONTEXT}, playlists, sync=True)[0]
+
+
+def test_diff_tracks():
+    """Songs missing from the synced tracks are added, the others removed"""
+    songs = [get_song(1), {"title": "Song", "artists": ["A"]}, get_song(1)]
+    synced = {"spotify:track:0": "spotify:track:0", "spotify:track:1": None}
+
+    added, removed = diff_tracks(synced, songs)
+
+    assert list(added) == [get_track_key(songs[1])]
+    assert removed == ["spotify:track:0"]
+
+
+@pytest.mark.parametrize(
+    "mode,playlists",
+    (("merge", [{"id": "a"}]), ("sync", [{"id": "a"}, {"title": "no id"}])),
+)
+def test_invalid_sync_requests_are_rejected(mode, playlists):
+    """Unknown modes and synced playlists without source id are bad requests"""
+    with pytest.raises(BadRequestException):
+        get_job_mode(mode, playlists)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_resync_only_transfers_changed_tracks(spotify_client):
+    """Syncs after the first one only write the tracks that changed"""
+    fake_spotify = FakeSpotify()
+    client = spotify_client(fake_spotify)
+
+    first = sync(client, "1", *range(150))
+    unchanged = sync(client, "1", *range(150))
+    fake_spotify.calls.clear()
+    changed = sync(client, "2", *range(1, 150), 150, 151)
+
+    assert (first["added"], first["requests"]) == (150, 3)
+    assert (unchanged["added"], unchanged["removed"], unchanged["requests"]) == (
+        0,
+        0,
+        0,
+    )
+    assert (changed["added"], changed["removed"], changed["requests"]) == (2, 1, 2)
+    assert changed["id"] == first["id"]
+    assert fake_spotify.calls["DELETE v1/playlists/{id}/tracks"] == 1
+    assert fake_spotify.created_playlists[first["id"]]["uris"] == [
+        "spotify:track:{}".format(index) for index in range(1, 152)
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_resync_searches_unmatched_tracks_again(spotify_client):
+    """Tracks without a match are not saved, and are searched for again"""
+    fake_spotify = FakeSpotify()
+    client = spotify_client(fake_spotify)
+    song = {"title": "Song", "artists": ["Artist"], "images": []}
+    fake_spotify._search = lambda _: (200, {"tracks": {"items": []}}, {})
+
+    first = sync(client.for_request(), "1", 0, song)
+    synced = SyncStore("SPOTIFY").get(USER_ID, "source-mix")
+    del fake_spotify._search
+    again = sync(client.for_request(), "1", 0, song)
+
+    assert (first["added"], first["unmatched"], first["searches"]) == (1, 1, 1)
+    assert synced.tracks == {"spotify:track:0": "spotify:track:0"}
+    assert (again["added"], again["unmatched"], again["searches"]) == (1, 0, 1)
+    assert fake_spotify.created_playlists[first["id"]]["uris"] == [
+        "spotify:track:0",
+        "spotify:track:Song",
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_failed_first_sync_deletes_the_playlist(spotify_client, monkeypatch):
+    """A playlist created by a first sync that fails is not left behind"""
+    fake_spotify = FakeSpotify()
+    client = spotify_client(fake_spotify)
+
+    def fail(*_):
+        raise InternalServerException("Tracks could not be added.")
+
+    monkeypatch.setattr(client, "_add_tracks", fail)
+
+    with pytest.raises(InternalServerException):
+        sync(client, "1", 0, 1)
+
+    assert not fake_spotify.created_playlists
+    assert SyncStore("SPOTIFY").get(USER_ID, "source-mix") is None
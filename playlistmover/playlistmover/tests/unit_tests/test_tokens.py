@@ -0,0 +1,112 @@
+"""
+    Test module for the OAuth token store
+"""
+import dataclasses
+import datetime
+
+import pytest
+from django.utils import timezone
+
+from playlistmover.playlistmover.logic.cache import TTLCache
+from playlistmover.playlistmover.logic.exceptions import UnauthorizedException
+from playlistmover.playlistmover.logic.tokens import (
+    TokenStore,
+    purge_expired_sessions,
+)
+from playlistmover.playlistmover.models import OAuthToken
+from playlistmover.playlistmover.tests.conftest import CODE, STATE
+from playlistmover.playlistmover.tests.fake_spotify import FakeSpotify
+
+
+@pytest.mark.django_db
+def test_session_skips_token_exchange_and_profile(
+    django_assert_num_queries, spotify_client
+):
+    """Follow-up requests of a session reuse its tokens and user id"""
+    fake_spotify = FakeSpotify(playlists=1)
+    token_store = TokenStore("SPOTIFY", TTLCache(maxsize=16, ttl=60))
+    context = {"code": CODE, "state": STATE}
+
+    first = spotify_client(fake_spotify, token_store=token_store)
+    first.get_playlists(context, "http://localhost")
+    second = spotify_client(fake_spotify, token_store=token_store)
+    with django_assert_num_queries(0):
+        second.get_playlists({"session": first.credentials.session_key}, "")
+
+    assert fake_spotify.calls["POST api/token"] == 1
+    assert fake_spotify.calls["GET v1/me"] == 1
+    assert second.rate_limit_key == "fake-user"
+    token_store.cache.clear()
+    assert token_store.get(first.credentials.session_key) == first.credentials
+
+
+@pytest.mark.django_db
+def test_expiring_access_token_is_refreshed(spotify_client):
+    """Credentials about to expire are refreshed and stored again"""
+    fake_spotify = FakeSpotify(playlists=1)
+    token_store = TokenStore("SPOTIFY", TTLCache(maxsize=16, ttl=60))
+    client = spotify_client(fake_spotify, token_store=token_store)
+    client.get_playlists({"code": CODE, "state": STATE}, "http://localhost")
+    expiring = dataclasses.replace(
+        client.credentials,
+        access_token="expiring",
+        expires_at=timezone.now() + datetime.timedelta(seconds=10),
+    )
+    token_store.save(expiring)
+
+    client = spotify_client(fake_spotify, token_store=token_store)
+    client.get_playlists({"session": expiring.session_key}, "")
+
+    assert fake_spotify.calls["POST api/token"] == 2
+    assert fake_spotify.calls["GET v1/me"] == 1
+    refreshed = token_store.get(expiring.session_key)
+    assert refreshed.access_token != "expiring"
+    assert refreshed.expires_at > expiring.expires_at
+    assert refreshed.user_id == "fake-user"
+
+
+@pytest.mark.django_db
+def test_unknown_session_is_unauthorized(spotify_client):
+    """Sessions that were never stored are rejected"""
+    client = spotify_client(FakeSpotify(), token_store=TokenStore("SPOTIFY"))
+
+    with pytest.raises(UnauthorizedException):
+        client.get_playlists({"session": "unknown"}, "")
+
+
+@pytest.mark.django_db
+def test_tokens_are_encrypted_at_rest(spotify_client):
+    """Neither token is stored as handed out by the platform"""
+    token_store = TokenStore("SPOTIFY", TTLCache(maxsize=16, ttl=60))
+    client = spotify_client(FakeSpotify(playlists=1), token_store=token_store)
+    client.get_playlists({"code": CODE, "state": STATE}, "http://localhost")
+
+    token = OAuthToken.objects.get(session_key=client.credentials.session_key)
+
+    assert client.credentials.access_token not in token.access_token
+    assert client.credentials.refresh_token not in token.refresh_token
+    assert (
+        TokenStore("SPOTIFY", TTLCache(maxsize=16, ttl=60)).get(token.session_key)
+        == client.credentials
+    )
+
+
+@pytest.mark.django_db
+def test_expired_sessions_are_rejected_and_purged(settings, spotify_client):
+    """Sessions older than their time to live are unknown and purged"""
+    token_store = TokenStore("SPOTIFY", TTLCache(maxsize=16, ttl=60))
+    client = spotify_client(FakeSpotify(playlists=1), token_store=token_store)
+    client.get_playlists({"code": CODE, "state": STATE}, "http://localhost")
+    session_key = client.credentials.session_key
+    OAuthToken.objects.update(
+        created_at=timezone.now() - datetime.timedelta(seconds=120)
+    )
+
+    settings.TOKEN_SESSION_TTL = 300
+    token_store.cache.clear()
+    assert token_store.get(session_key) is not None
+    settings.TOKEN_SESSION_TTL = 60
+    token_store.cache.clear()
+    assert token_store.get(session_key) is None
+    assert purge_expired_sessions() == 1
+    assert not OAuthToken.objects.exists()
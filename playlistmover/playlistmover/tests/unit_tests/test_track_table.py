@@ -0,0 +1,50 @@
+"""
+    Test module for the deduplication of tracks across playlists
+"""
+import pytest
+
+from playlistmover.playlistmover.serializers import PlaylistSerializer
+from playlistmover.playlistmover.tests.conftest import CONTEXT
+from playlistmover.playlistmover.tests.fake_spotify import FakeSpotify
+
+
+@pytest.mark.django_db
+def test_tracks_shared_by_playlists_are_parsed_once(spotify_client):
+    """Playlists listing the same track share a single song"""
+    fake_spotify = FakeSpotify(playlists=3, tracks=4, shared_tracks=True)
+    client = spotify_client(fake_spotify)
+
+    playlists = client.get_playlists(CONTEXT, "http://localhost")
+
+    assert all(
+        playlist.songs[index] is playlists[0].songs[index]
+        for playlist in playlists
+        for index in range(4)
+    )
+    assert client.tracks.get_stats() == {
+        "tracks": 12,
+        "unique_tracks": 4,
+        "dedup_ratio": 0.667,
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+def test_tracks_shared_by_playlists_are_matched_once(spotify_client):
+    """A song found in several playlists is searched for a single time"""
+    fake_spotify = FakeSpotify()
+    client = spotify_client(fake_spotify)
+    song = {"title": "Song", "artists": ["Artist"], "images": []}
+    playlists = PlaylistSerializer(
+        data=[
+            {"title": "mix-{}".format(index), "songs": [song, song], "images": []}
+            for index in range(4)
+        ],
+        many=True,
+    )
+    assert playlists.is_valid()
+
+    reports = client.create_playlists({"context": CONTEXT}, playlists)
+
+    assert fake_spotify.calls["GET v1/search"] == 1
+    assert sum(report["searches"] for report in reports) == 1
+    assert [report["added"] for report in reports] == [2, 2, 2, 2]
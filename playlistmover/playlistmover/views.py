@@ -1,19 +1,169 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
 from django.shortcuts import redirect
+from django.urls import reverse
+from django.views import View
+from rest_framework.exceptions import APIException, NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.status import HTTP_202_ACCEPTED, HTTP_500_INTERNAL_SERVER_ERROR
 from rest_framework.views import APIView
+from playlistmover.playlistmover.compiled_serializers import (
+    encode_playlist,
+    encode_playlists,
+    validate_playlists,
+)
 from playlistmover.playlistmover.logic.clients_enums import ClientEnum
+from playlistmover.playlistmover.models import MigrationJob, Playlist
 
-from playlistmover.playlistmover.serializers import PlaylistSerializer
-from playlistmover.playlistmover.logic.clients import Client
-
-from playlistmover.playlistmover.serializers import PlaylistSerializer
 
-from playlistmover.playlistmover.serializers import PlaylistSerializer
 from playlistmover.playlistmover.logic.exceptions import (
     BadRequestException,
+    get_exception_message,
     get_exception_response,
+    get_exception_status,
+)
+from playlistmover.playlistmover.logic.etags import etag_matches, get_listing_etag
+from playlistmover.playlistmover.logic.jobs import (
+    enqueue_job,
+    get_job_mode,
+    get_job_progress,
+)
+from playlistmover.playlistmover.logic.metrics import (
+    PROMETHEUS_CONTENT_TYPE,
+    get_metrics,
+    is_metrics_client,
+)
+from playlistmover.playlistmover.logic.projection import Projection
+from playlistmover.playlistmover.logic.registry import get_registry
+from playlistmover.playlistmover.logic.validator import (
+    SESSION_HEADER,
+    get_auth_context,
+    request_validator,
+)
+from playlistmover.playlistmover.normalized import (
+    NORMALIZED_LAYOUT,
+    denormalize_playlists,
+    get_layout,
+    normalize_playlists,
 )
-from playlistmover.playlistmover.logic.validator import request_validator
+from playlistmover.playlistmover.parsers import MessagePackParser
+from playlistmover.playlistmover.renderers import MessagePackRenderer, NDJSONRenderer
+
+
+# the tracks parsed for a response and the share of them shared across playlists
+TRACKS_HEADER = "X-Playlistmover-Tracks"
+
+# MessagePack is negotiated through the Accept and Content-Type headers
+RENDERER_CLASSES = [*api_settings.DEFAULT_RENDERER_CLASSES, MessagePackRenderer]
+PARSER_CLASSES = [*api_settings.DEFAULT_PARSER_CLASSES, MessagePackParser]
+
+
+def stream_playlists(
+    playlists: Iterable[Playlist], projection: Projection
+) -> Iterator[bytes]:
+    """
+    Render each playlist as a line of JSON as soon as it has been fetched.
+    Errors raised mid-stream are reported on a final line.
+    """
+    try:
+        for playlist in playlists:
+            yield NDJSONRenderer.render_line(
+                encode_playlist(playlist, projection.serializer_class)
+            )
+    except Exception as exception:
+        if get_exception_status(exception) == HTTP_500_INTERNAL_SERVER_ERROR:
+            raise
+        yield NDJSONRenderer.render_line(
+            {"success": False, "error": get_exception_message(exception)}
+        )
+
+
+def get_playlists_body(
+    playlists: Iterable[Playlist], projection: Projection, layout: str
+) -> Dict[str, Any]:
+    """
+    Playlists of a response body, encoded in the requested layout
+    """
+    if layout == NORMALIZED_LAYOUT:
+        return normalize_playlists(playlists)
+    return {"playlists": encode_playlists(playlists, projection.serializer_class)}
+
+
+def get_playlists_etag(
+    listing: List[Dict[str, Any]],
+    session_key: str,
+    projection: Projection,
+    layout: str,
+    media_type: str,
+) -> Optional[str]:
+    """
+    ETag of the playlists response of a listing, which changes with the
+    listed playlists, the session returned and the representation asked for
+    """
+    return get_listing_etag(
+        listing, session_key, projection.images, projection.summary, layout, media_type
+    )
+
+
+def get_playlists_headers(music_client: Any, etag: Optional[str]) -> Dict[str, str]:
+    """
+    Headers of a playlists response: its ETag and the track dedup stats
+    """
+    stats = music_client.tracks.get_stats()
+    headers = {
+        TRACKS_HEADER: "total={}, unique={}, dedup-ratio={}".format(
+            stats["tracks"], stats["unique_tracks"], stats["dedup_ratio"]
+        )
+    }
+    if etag:
+        headers["ETag"] = etag
+    return headers
+
+
+def get_not_modified_response(request, etag: Optional[str]) -> Optional[HttpResponse]:
+    """
+    Empty response when the request's `If-None-Match` header matches the ETag
+    """
+    if etag is not None and etag_matches(request.headers.get("If-None-Match"), etag):
+        return HttpResponseNotModified(headers={"ETag": etag})
+    return None
+
+
+def get_playlists_data(request_data: Dict[str, Any]) -> Any:
+    """
+    Nested playlists data of a request, whatever its layout
+    """
+    if get_layout(request_data.get("layout")) == NORMALIZED_LAYOUT:
+        return denormalize_playlists(request_data)
+    return request_data["playlists"]
+
+
+def get_job_response(job: MigrationJob) -> Response:
+    """
+    Response acknowledging a queued migration job, with the session it runs as
+    """
+    return Response(
+        {
+            "success": True,
+            "job_id": str(job.public_id),
+            "status": job.status,
+            "session": job.session_key,
+        },
+        status=HTTP_202_ACCEPTED,
+        headers={"Location": reverse("job", args=[job.public_id])},
+    )
 
 
 class PlaylistApiView(APIView):
@@ -22,38 +172,96 @@ class PlaylistApiView(APIView):
     third-party music platforms for the caller.
     """
 
+    renderer_classes = [*RENDERER_CLASSES, NDJSONRenderer]
+    parser_classes = PARSER_CLASSES
+
     @request_validator("getPlaylists")
     def get(self, request, format=None):
         """
         Returns List of playlists from account and platform specified in the request.
+        Playlists are streamed one per line when `application/x-ndjson` is accepted.
+        The session returned, in the body or in the `X-Playlistmover-Session`
+        header of streamed responses, authenticates follow-up requests of the
+        account sent in that header.
+        `images` keeps all, the largest, the smallest or none of the image
+        variants, and `summary` returns each playlist's track count in place
+        of its songs. `layout=normalized` lists each artist and image once.
+        Buffered responses carry an ETag derived from the playlist listing,
+        and requests whose `If-None-Match` header matches it are answered with
+        HTTP 304 before any playlist is fetched.
         """
         try:
-            query_params = request.query_params
+            query_params = get_auth_context(request, request.query_params)
             platform = ClientEnum(query_params["platform"])
-            redirect_uri = request.query_params["redirect_uri"]
-            music_client = Client.get_client(platform)
-            playlists = music_client.get_playlists(query_params, redirect_uri)
-            serialised_playlist = PlaylistSerializer(playlists, many=True)
-            return Response({"success": True, "playlists": serialised_playlist.data})
+            redirect_uri = query_params["redirect_uri"]
+            projection = Projection.from_query_params(query_params)
+            layout = get_layout(query_params.get("layout"))
+            music_client = get_registry().get_client(platform)
+            if request.accepted_renderer.format == NDJSONRenderer.format:
+                if layout == NORMALIZED_LAYOUT:
+                    raise BadRequestException(
+                        "Normalized playlists cannot be streamed."
+                    )
+                playlists = music_client.iter_playlists(
+                    query_params, redirect_uri, projection
+                )
+                return StreamingHttpResponse(
+                    stream_playlists(playlists, projection),
+                    content_type=NDJSONRenderer.media_type,
+                    headers={SESSION_HEADER: music_client.credentials.session_key},
+                )
+            listing = music_client.get_playlist_listing(
+                query_params, redirect_uri, projection
+            )
+            session_key = music_client.credentials.session_key
+            etag = get_playlists_etag(
+                listing,
+                session_key,
+                projection,
+                layout,
+                request.accepted_renderer.media_type,
+            )
+            not_modified = get_not_modified_response(request, etag)
+            if not_modified is not None:
+                return not_modified
+            playlists = list(music_client.iter_listed_playlists(listing))
+            return Response(
+                {
+                    "success": True,
+                    "session": session_key,
+                    **get_playlists_body(playlists, projection, layout),
+                },
+                headers=get_playlists_headers(music_client, etag),
+            )
         except Exception as exception:
             return get_exception_response(exception)
 
     @request_validator("postPlaylists")
     def post(self, request, format=None):
         """
-        Creates List of playlists on account and platform specified in the request.
+        Queues the creation of List of playlists on account and platform specified
+        in the request, nested or in the normalized layout. Returns the id of the
+        job whose progress can be followed. With `mode=sync`, playlists synced
+        before only get the tracks added to or removed from their source.
+        The account is authenticated before the job is queued, and the job runs
+        as the session returned.
         """
         try:
             request_data = request.data
-            playlists_data = request_data["playlists"]
-            playlists = PlaylistSerializer(data=playlists_data, many=True)
-            if playlists.is_valid():
-                platform = ClientEnum(request_data["context"]["platform"])
-                music_client = Client.get_client(platform)
-                created_playists = music_client.create_playlists(
-                    request_data, playlists
+            playlists_data = get_playlists_data(request_data)
+            playlists = validate_playlists(playlists_data)
+            if playlists is not None:
+                context = get_auth_context(request, request_data["context"])
+                platform = ClientEnum(context["platform"])
+                mode = get_job_mode(request_data.get("mode"), playlists)
+                music_client = get_registry().get_client(platform)
+                credentials = music_client.authenticate(
+                    context, context["redirect_uri"]
                 )
-                return Response({"success": True, "playlists": created_playists})
+                job = enqueue_job(
+                    platform.value, credentials.session_key, playlists, mode
+                )
+                return get_job_response(job)
             raise BadRequestException("`playlists` object in request is invalid")
         except Exception as exception:
             return get_exception_response(exception)
@@ -72,8 +280,206 @@ class AuthorizationRedirectView(APIView):
         try:
             platform = ClientEnum(request.query_params["platform"])
             redirect_uri = request.query_params["redirect_uri"]
-            music_client = Client.get_client(platform)
+            music_client = get_registry().get_client(platform)
+            url = music_client.get_authorization_url(redirect_uri)
+            return Response({"success": True, "auth_url": url})
+        except Exception as exception:
+            return get_exception_response(exception)
+
+
+class JobApiView(APIView):
+    """
+    API View reporting the progress of a migration job.
+    """
+
+    renderer_classes = RENDERER_CLASSES
+
+    def get(self, request, job_id, format=None):
+        """
+        Returns the state of the job and of each of its playlists.
+        """
+        try:
+            return Response({"success": True, "job": get_job_progress(job_id)})
+        except Exception as exception:
+            return get_exception_response(exception)
+
+
+class MetricsView(View):
+    """
+    Metrics of the requests made to music platforms, for Prometheus to scrape.
+    Hidden from the clients outside of METRICS_ALLOWED_IPS.
+    """
+
+    def get(self, request):
+        """
+        Metrics in the Prometheus text format, or 404 for other clients
+        """
+        if not is_metrics_client(request):
+            raise Http404()
+        return HttpResponse(
+            get_metrics().render(), content_type=PROMETHEUS_CONTENT_TYPE
+        )
+
+
+class AsyncApiView(View):
+    """
+    Base class for async API views served natively under ASGI. Requests are
+    wrapped to expose `query_params` and `data` like in DRF views, and DRF
+    responses returned by handlers, and the DRF errors raised while parsing
+    the request, are rendered as JSON, or as MessagePack when the request
+    accepts it.
+    """
+
+    parsers = [JSONParser(), MessagePackParser()]
+    renderers = [JSONRenderer(), MessagePackRenderer()]
+
+    def get_renderer(self, request: Request) -> tuple:
+        """
+        Renderer and media type negotiated from the Accept header, JSON when
+        none of the renderers is acceptable
+        """
+        try:
+            return DefaultContentNegotiation().select_renderer(request, self.renderers)
+        except NotAcceptable:
+            return self.renderers[0], self.renderers[0].media_type
+
+    async def dispatch(self, request, *args, **kwargs):
+        request = Request(request, parsers=self.parsers)
+        try:
+            response = await super().dispatch(request, *args, **kwargs)
+        except APIException as exception:
+            # malformed bodies and the like, answered as DRF views do
+            response = Response(
+                {"detail": exception.detail}, status=exception.status_code
+            )
+        if isinstance(response, Response):
+            renderer, media_type = self.get_renderer(request)
+            return HttpResponse(
+                renderer.render(response.data),
+                status=response.status_code,
+                content_type=media_type,
+                headers={
+                    header: value
+                    for header, value in response.items()
+                    if header.lower() != "content-type"
+                },
+            )
+        return response
+
+
+class AsyncPlaylistApiView(AsyncApiView):
+    """
+    Async API View to manage retrieving and creating playlists from
+    third-party music platforms for the caller.
+    """
+
+    @request_validator("getPlaylists")
+    async def get(self, request, format=None):
+        """
+        Returns List of playlists from account and platform specified in the request.
+        The session returned authenticates follow-up requests of the account
+        sent in the `X-Playlistmover-Session` header. Requests whose
+        `If-None-Match` header matches the ETag of the playlist listing are
+        answered with HTTP 304.
+        """
+        try:
+            query_params = get_auth_context(request, request.query_params)
+            platform = ClientEnum(query_params["platform"])
+            redirect_uri = query_params["redirect_uri"]
+            projection = Projection.from_query_params(query_params)
+            layout = get_layout(query_params.get("layout"))
+            music_client = get_registry(asynchronous=True).get_client(platform)
+            listing = await music_client.get_playlist_listing(
+                query_params, redirect_uri, projection
+            )
+            session_key = music_client.credentials.session_key
+            etag = get_playlists_etag(
+                listing,
+                session_key,
+                projection,
+                layout,
+                self.get_renderer(request)[1],
+            )
+            not_modified = get_not_modified_response(request, etag)
+            if not_modified is not None:
+                return not_modified
+            playlists = [
+                playlist
+                async for playlist in music_client.iter_listed_playlists(listing)
+            ]
+            return Response(
+                {
+                    "success": True,
+                    "session": session_key,
+                    **get_playlists_body(playlists, projection, layout),
+                },
+                headers=get_playlists_headers(music_client, etag),
+            )
+        except Exception as exception:
+            return get_exception_response(exception)
+
+    @request_validator("postPlaylists")
+    async def post(self, request, format=None):
+        """
+        Queues the creation of List of playlists on account and platform specified
+        in the request, nested or in the normalized layout. Returns the id of the
+        job whose progress can be followed. With `mode=sync`, playlists synced
+        before only get the tracks added to or removed from their source.
+        The account is authenticated before the job is queued, and the job runs
+        as the session returned.
+        """
+        try:
+            request_data = request.data
+            playlists_data = get_playlists_data(request_data)
+            playlists = validate_playlists(playlists_data)
+            if playlists is not None:
+                context = get_auth_context(request, request_data["context"])
+                platform = ClientEnum(context["platform"])
+                mode = get_job_mode(request_data.get("mode"), playlists)
+                music_client = get_registry(asynchronous=True).get_client(platform)
+                credentials = await music_client.authenticate(
+                    context, context["redirect_uri"]
+                )
+                job = await sync_to_async(enqueue_job)(
+                    platform.value, credentials.session_key, playlists, mode
+                )
+                return get_job_response(job)
+            raise BadRequestException("`playlists` object in request is invalid")
+        except Exception as exception:
+            return get_exception_response(exception)
+
+
+class AsyncAuthorizationRedirectView(AsyncApiView):
+    """
+    Async API View for providing authentication to the third-party music platform.
+    """
+
+    @request_validator("getAuth")
+    async def get(self, request, format=None):
+        """
+        Initialise and return platform account authentication url.
+        """
+        try:
+            platform = ClientEnum(request.query_params["platform"])
+            redirect_uri = request.query_params["redirect_uri"]
+            music_client = get_registry(asynchronous=True).get_client(platform)
             url = music_client.get_authorization_url(redirect_uri)
             return Response({"success": True, "auth_url": url})
         except Exception as exception:
             return get_exception_response(exception)
+
+
+class AsyncJobApiView(AsyncApiView):
+    """
+    Async API View reporting the progress of a migration job.
+    """
+
+    async def get(self, request, job_id, format=None):
+        """
+        Returns the state of the job and of each of its playlists.
+        """
+        try:
+            job = await sync_to_async(get_job_progress)(job_id)
+            return Response({"success": True, "job": job})
+        except Exception as exception:
+            return get_exception_response(exception)
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 
 from pathlib import Path
 import os
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 
@@ -30,49 +31,96 @@ SECRET_KEY = os.getenv("PLAYLISTMOVER_SECRET_KEY")
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv("PLAYLISTMOVER_MODE") == "DEBUG"
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [
+    host for host in os.getenv("PLAYLISTMOVER_ALLOWED_HOSTS", "").split(",") if host
+]
+
+# Serve the API from async views that await upstream requests on the event loop.
+# Enabled by default when running under ASGI.
+ASYNC_VIEWS = os.getenv("PLAYLISTMOVER_ASYNC_VIEWS") == "1"
+
+# Runtime profile. `full` also serves the admin, `api` only loads the apps and
+# middleware the JSON endpoints need, so workers boot faster.
+PROFILE = os.getenv("PLAYLISTMOVER_PROFILE", "full")
+if PROFILE not in ("full", "api"):
+    raise ImproperlyConfigured("PLAYLISTMOVER_PROFILE must be `full` or `api`.")
+API_ONLY = PROFILE == "api"
 
 
 # Application definition
 
+# Without the admin, the `api` profile needs neither users, sessions, messages,
+# static files nor templates, and never authenticates requests against them
 INSTALLED_APPS = [
-    "django.contrib.admin",
-    "django.contrib.auth",
-    "django.contrib.contenttypes",
-    "django.contrib.sessions",
-    "django.contrib.messages",
-    "django.contrib.staticfiles",
-    "playlistmover",
+    *(
+        []
+        if API_ONLY
+        else [
+            "django.contrib.admin",
+            "django.contrib.auth",
+            "django.contrib.contenttypes",
+            "django.contrib.sessions",
+            "django.contrib.messages",
+            "django.contrib.staticfiles",
+        ]
+    ),
+    "playlistmover.playlistmover",
     "rest_framework",
 ]
 
 MIDDLEWARE = [
+    # compresses responses for clients sending `Accept-Encoding: gzip`,
+    # streamed playlists included, so it has to wrap every other middleware
+    "django.middleware.gzip.GZipMiddleware",
+    # times the requests made to music platforms while serving each request
+    "playlistmover.playlistmover.middleware.server_timing_middleware",
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    *([] if API_ONLY else ["django.contrib.sessions.middleware.SessionMiddleware"]),
     "django.middleware.common.CommonMiddleware",
-    "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware",
-    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    *(
+        []
+        if API_ONLY
+        else [
+            "django.middleware.csrf.CsrfViewMiddleware",
+            "django.contrib.auth.middleware.AuthenticationMiddleware",
+            "django.contrib.messages.middleware.MessageMiddleware",
+            "django.middleware.clickjacking.XFrameOptionsMiddleware",
+        ]
+    ),
 ]
 
 ROOT_URLCONF = "playlistmover.urls"
 
-TEMPLATES = [
-    {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
-        "DIRS": [],
-        "APP_DIRS": True,
-        "OPTIONS": {
-            "context_processors": [
-                "django.template.context_processors.debug",
-                "django.template.context_processors.request",
-                "django.contrib.auth.context_processors.auth",
-                "django.contrib.messages.context_processors.messages",
-            ],
+TEMPLATES = (
+    []
+    if API_ONLY
+    else [
+        {
+            "BACKEND": "django.template.backends.django.DjangoTemplates",
+            "DIRS": [],
+            "APP_DIRS": True,
+            "OPTIONS": {
+                "context_processors": [
+                    "django.template.context_processors.debug",
+                    "django.template.context_processors.request",
+                    "django.contrib.auth.context_processors.auth",
+                    "django.contrib.messages.context_processors.messages",
+                ],
+            },
         },
-    },
-]
+    ]
+)
+
+REST_FRAMEWORK = (
+    {
+        "DEFAULT_RENDERER_CLASSES": ["rest_framework.renderers.JSONRenderer"],
+        "DEFAULT_AUTHENTICATION_CLASSES": [],
+        "DEFAULT_PERMISSION_CLASSES": [],
+        "UNAUTHENTICATED_USER": None,
+    }
+    if API_ONLY
+    else {}
+)
 
 WSGI_APPLICATION = "playlistmover.wsgi.application"
 
@@ -128,3 +176,120 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+
+# Third-party music platform clients
+
+# Client class of each platform, imported the first time the platform is used.
+# Installed packages can add platforms through the `playlistmover.clients` and
+# `playlistmover.async_clients` entry point groups.
+CLIENT_PLUGINS = {
+    "SPOTIFY": "playlistmover.playlistmover.logic.clients.SpotifyClient",
+}
+
+ASYNC_CLIENT_PLUGINS = {
+    "SPOTIFY": "playlistmover.playlistmover.logic.async_clients.AsyncSpotifyClient",
+}
+
+# Base urls of the Spotify Web API and accounts service, which can point to a
+# local stand-in such as the one of the test suite and benchmarks
+SPOTIFY_API_URL = os.getenv("PLAYLISTMOVER_SPOTIFY_API_URL", "https://api.spotify.com")
+
+SPOTIFY_ACCOUNTS_URL = os.getenv(
+    "PLAYLISTMOVER_SPOTIFY_ACCOUNTS_URL", "https://accounts.spotify.com"
+)
+
+# Maximum number of concurrent outbound requests a single client call may make
+CLIENT_MAX_WORKERS = int(os.getenv("PLAYLISTMOVER_CLIENT_MAX_WORKERS", "8"))
+
+# Keep-alive connections kept open per upstream host by the shared HTTP session.
+# Should be at least CLIENT_MAX_WORKERS so concurrent fetches never drop sockets.
+HTTP_POOL_SIZE = int(os.getenv("PLAYLISTMOVER_HTTP_POOL_SIZE", "10"))
+
+HTTP_CONNECT_TIMEOUT = float(os.getenv("PLAYLISTMOVER_HTTP_CONNECT_TIMEOUT", "3.05"))
+
+HTTP_READ_TIMEOUT = float(os.getenv("PLAYLISTMOVER_HTTP_READ_TIMEOUT", "10"))
+
+# Connections the async HTTP client of each event loop keeps open across hosts
+ASYNC_HTTP_POOL_SIZE = int(os.getenv("PLAYLISTMOVER_ASYNC_HTTP_POOL_SIZE", "100"))
+
+# Retries for GET requests that fail with a 5xx status or a connection error
+HTTP_MAX_RETRIES = int(os.getenv("PLAYLISTMOVER_HTTP_MAX_RETRIES", "2"))
+
+HTTP_RETRY_BACKOFF = float(os.getenv("PLAYLISTMOVER_HTTP_RETRY_BACKOFF", "0.3"))
+
+# Outbound requests per second (and burst size) allowed to each platform,
+# and to each user on a platform
+CLIENT_RATE_LIMIT = float(os.getenv("PLAYLISTMOVER_CLIENT_RATE_LIMIT", "20"))
+
+CLIENT_RATE_BURST = int(os.getenv("PLAYLISTMOVER_CLIENT_RATE_BURST", "40"))
+
+CLIENT_USER_RATE_LIMIT = float(os.getenv("PLAYLISTMOVER_CLIENT_USER_RATE_LIMIT", "10"))
+
+CLIENT_USER_RATE_BURST = int(os.getenv("PLAYLISTMOVER_CLIENT_USER_RATE_BURST", "20"))
+
+# Attempts made for a request the platform answers with HTTP 429, and the base
+# delay of the jittered exponential backoff used when no Retry-After is sent
+CLIENT_RATE_LIMIT_ATTEMPTS = int(
+    os.getenv("PLAYLISTMOVER_CLIENT_RATE_LIMIT_ATTEMPTS", "3")
+)
+
+CLIENT_RATE_LIMIT_BACKOFF = float(
+    os.getenv("PLAYLISTMOVER_CLIENT_RATE_LIMIT_BACKOFF", "0.5")
+)
+
+# Longest Retry-After delay honored, and seconds a request may wait for the
+# rate limits before failing with HTTP 429, enough to sit out such a delay
+CLIENT_RATE_LIMIT_MAX_DELAY = float(
+    os.getenv("PLAYLISTMOVER_CLIENT_RATE_LIMIT_MAX_DELAY", "30")
+)
+
+CLIENT_RATE_LIMIT_TIMEOUT = float(
+    os.getenv("PLAYLISTMOVER_CLIENT_RATE_LIMIT_TIMEOUT", "60")
+)
+
+# Parsed playlists kept in memory per process, keyed by playlist id and snapshot
+PLAYLIST_CACHE_SIZE = int(os.getenv("PLAYLISTMOVER_PLAYLIST_CACHE_SIZE", "1024"))
+
+PLAYLIST_CACHE_TTL = float(os.getenv("PLAYLISTMOVER_PLAYLIST_CACHE_TTL", "3600"))
+
+# Fuzzy matching of songs without an exact match to search results: minimum
+# similarity score, weight of the title against the artists, results per search
+MATCH_THRESHOLD = float(os.getenv("PLAYLISTMOVER_MATCH_THRESHOLD", "0.75"))
+
+MATCH_TITLE_WEIGHT = float(os.getenv("PLAYLISTMOVER_MATCH_TITLE_WEIGHT", "0.7"))
+
+MATCH_SEARCH_LIMIT = int(os.getenv("PLAYLISTMOVER_MATCH_SEARCH_LIMIT", "5"))
+
+# Background migration jobs: worker processes started by `manage.py runworkers`,
+# seconds between polls of an empty queue, and seconds a running job is leased
+# to its worker, renewed three times per lease, before another worker takes it
+JOB_WORKERS = int(os.getenv("PLAYLISTMOVER_JOB_WORKERS", "2"))
+
+JOB_POLL_INTERVAL = float(os.getenv("PLAYLISTMOVER_JOB_POLL_INTERVAL", "1"))
+
+JOB_LEASE_SECONDS = float(os.getenv("PLAYLISTMOVER_JOB_LEASE_SECONDS", "60"))
+
+# OAuth credentials of each session: entries and seconds kept in process in
+# front of the database, seconds before expiry an access token is refreshed,
+# seconds a session lasts, purged by `manage.py purgesessions` once expired,
+# and the secret the stored tokens are encrypted with, the secret key if unset
+TOKEN_CACHE_SIZE = int(os.getenv("PLAYLISTMOVER_TOKEN_CACHE_SIZE", "1024"))
+
+TOKEN_CACHE_TTL = float(os.getenv("PLAYLISTMOVER_TOKEN_CACHE_TTL", "3600"))
+
+TOKEN_REFRESH_MARGIN = float(os.getenv("PLAYLISTMOVER_TOKEN_REFRESH_MARGIN", "60"))
+
+TOKEN_SESSION_TTL = float(os.getenv("PLAYLISTMOVER_TOKEN_SESSION_TTL", "2592000"))
+
+TOKEN_ENCRYPTION_KEY = os.getenv("PLAYLISTMOVER_TOKEN_ENCRYPTION_KEY")
+
+# Client addresses allowed to scrape `/metrics` and to get the `Server-Timing`
+# header, which both name the endpoints called upstream
+METRICS_ALLOWED_IPS = [
+    address
+    for address in os.getenv(
+        "PLAYLISTMOVER_METRICS_ALLOWED_IPS", "127.0.0.1,::1"
+    ).split(",")
+    if address
+]
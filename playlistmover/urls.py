@@ -13,12 +13,34 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
-from playlistmover.playlistmover.views import PlaylistApiView, AuthorizationRedirectView
+
+from playlistmover.playlistmover.views import (
+    AsyncAuthorizationRedirectView,
+    AsyncJobApiView,
+    AsyncPlaylistApiView,
+    AuthorizationRedirectView,
+    JobApiView,
+    MetricsView,
+    PlaylistApiView,
+)
+
+if settings.ASYNC_VIEWS:
+    PlaylistView, AuthView = AsyncPlaylistApiView, AsyncAuthorizationRedirectView
+    JobView = AsyncJobApiView
+else:
+    PlaylistView, AuthView = PlaylistApiView, AuthorizationRedirectView
+    JobView = JobApiView
 
 urlpatterns = [
-    path("admin/", admin.site.urls),
-    path("api/playlists", PlaylistApiView.as_view(), name="playlists"),
-    path("api/auth", AuthorizationRedirectView.as_view(), name="auth-redirect"),
+    path("api/playlists", PlaylistView.as_view(), name="playlists"),
+    path("api/auth", AuthView.as_view(), name="auth-redirect"),
+    path("api/jobs/<uuid:job_id>", JobView.as_view(), name="job"),
+    path("metrics", MetricsView.as_view(), name="metrics"),
 ]
+
+# the admin site is only set up by the full profile, which installs its app
+if not settings.API_ONLY:
+    urlpatterns.append(path("admin/", admin.site.urls))